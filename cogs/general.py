@@ -39,9 +39,15 @@ class General(commands.Cog):
                 name="⚔️ Matches - Super Easy!",
                 value=(
                     "`/match` - Create a match (simple!)\n"
+                    "`/match_series` - Repeat a match weekly/daily\n"
+                    "`/series` / `/cancel_series` - Recurring matches\n"
                     "`/matches` - See current matches\n"
+                    "`/my_matches` - See your matches\n"
                     "`/end_match` - End a match\n"
-                    "`/cancel_match` - Cancel a match"
+                    "`/match_result` - Record the winner\n"
+                    "`/leaderboard` - Standings\n"
+                    "`/cancel_match` - Cancel a match\n"
+                    "`/match_history` - Past matches"
                 ),
                 inline=False
             )
@@ -52,6 +58,7 @@ class General(commands.Cog):
                 value=(
                     "`/set_channel` - Set bot channels\n"
                     "`/set_language` - Change language\n"
+                    "`/set_retention` - Match retention\n"
                     "`/settings` - View settings\n"
                     "`/dm` - Send private message"
                 ),
@@ -320,6 +327,22 @@ class General(commands.Cog):
                 inline=True
             )
             
+            # Storage timings (time spent queued vs. inside the database)
+            db_timings = self.bot.db.get_total_timings()
+            embed.add_field(
+                name="💾 Database",
+                value=f"**Calls:** {db_timings['calls']}\n**Queue wait:** `{db_timings['avg_wait_ms']:.1f}ms` avg / `{db_timings['max_wait_ms']:.1f}ms` max\n**Execution:** `{db_timings['avg_exec_ms']:.1f}ms` avg / `{db_timings['max_exec_ms']:.1f}ms` max",
+                inline=False
+            )
+            
+            # Match embed render cache
+            cache_stats = self.bot.embed_builder.get_cache_stats()
+            embed.add_field(
+                name="🖼️ Embed Cache",
+                value=f"**Hits:** {cache_stats['hits']}\n**Misses:** {cache_stats['misses']}\n**Cached:** {cache_stats['size']}",
+                inline=True
+            )
+            
             # Status indicator
             if api_latency < 100:
                 status = "🟢 Excellent"
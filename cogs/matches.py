@@ -2,9 +2,136 @@ import discord
 from discord import app_commands
 from discord.ext import commands
 from datetime import datetime, timedelta
+import asyncio
 import pytz
 import re
-from utils.translation_buttons import TranslationView
+
+from utils.dm_dispatcher import SENT
+from utils.match_archive import archive_entry
+from utils.participants import parse_mentions, participant_summary
+from utils.records import Match, MatchSeries
+
+MATCHES_PER_PAGE = 10
+LEADERBOARD_PER_PAGE = 10
+MAX_CONFLICT_LINES = 15
+HISTORY_STATUS_ICONS = {'ended': '✅', 'cancelled': '❌', 'expired': '⌛'}
+
+
+class MatchListView(discord.ui.View):
+    """Previous/next buttons that page through /matches (only for whoever ran it)"""
+    
+    def __init__(self, cog, guild, user_id):
+        super().__init__(timeout=300)
+        self.cog = cog
+        self.guild = guild
+        self.user_id = user_id
+        self.page = 0
+        self._update_buttons()
+    
+    @property
+    def page_count(self):
+        total = self.cog.bot.match_index.count(self.guild.id)
+        return max(1, (total + MATCHES_PER_PAGE - 1) // MATCHES_PER_PAGE)
+    
+    def _update_buttons(self):
+        self.previous_page.disabled = self.page <= 0
+        self.next_page.disabled = self.page >= self.page_count - 1
+    
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if interaction.user.id != self.user_id:
+            await interaction.response.send_message("Only the person who ran /matches can change its page.", ephemeral=True)
+            return False
+        return True
+    
+    async def _show(self, interaction):
+        # Matches may have been added or removed since the last page was shown
+        self.page = min(self.page, self.page_count - 1)
+        self._update_buttons()
+        embed = self.cog._build_matches_page(self.guild, self.page)
+        await interaction.response.edit_message(embed=embed, view=self)
+    
+    @discord.ui.button(label="◀️ Previous", style=discord.ButtonStyle.secondary)
+    async def previous_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.page = max(0, self.page - 1)
+        await self._show(interaction)
+    
+    @discord.ui.button(label="Next ▶️", style=discord.ButtonStyle.secondary)
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.page += 1
+        await self._show(interaction)
+
+
+class LeaderboardView(discord.ui.View):
+    """Previous/next buttons that page through /leaderboard"""
+    
+    def __init__(self, cog, guild, kind, user, total):
+        super().__init__(timeout=300)
+        self.cog = cog
+        self.guild = guild
+        self.kind = kind
+        self.user = user
+        self.page = 0
+        self._update_buttons(total)
+    
+    def _update_buttons(self, total):
+        page_count = max(1, (total + LEADERBOARD_PER_PAGE - 1) // LEADERBOARD_PER_PAGE)
+        self.page = min(self.page, page_count - 1)
+        self.previous_page.disabled = self.page <= 0
+        self.next_page.disabled = self.page >= page_count - 1
+    
+    async def _show(self, interaction):
+        embed, total = await self.cog._build_leaderboard_page(self.guild, self.kind, self.page, self.user)
+        self._update_buttons(total)
+        await interaction.response.edit_message(embed=embed, view=self)
+    
+    @discord.ui.button(label="◀️ Previous", style=discord.ButtonStyle.secondary)
+    async def previous_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.page = max(0, self.page - 1)
+        await self._show(interaction)
+    
+    @discord.ui.button(label="Next ▶️", style=discord.ButtonStyle.secondary)
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.page += 1
+        await self._show(interaction)
+
+
+async def series_autocomplete(interaction: discord.Interaction, current: str):
+    """Suggest the server's recurring series by team or ID"""
+    cog = interaction.client.get_cog('Matches')
+    guild = interaction.guild
+    if cog is None or guild is None:
+        return []
+    
+    query = current.strip().lower()
+    choices = []
+    for series_id, series in cog.bot.series.guild_series(guild.id).items():
+        name = f"{series.template.team1_mentions} vs {series.template.team2_mentions} • {cog._describe_series(series, plain=True)} • {series_id}"
+        if query and query not in name.lower():
+            continue
+        if len(name) > 100:
+            name = name[:99 - len(series_id) - 3] + "… • " + series_id
+        choices.append(app_commands.Choice(name=name[:100], value=series_id))
+        if len(choices) >= 25:
+            break
+    return choices
+
+
+async def match_autocomplete(interaction: discord.Interaction, current: str):
+    """Suggest matches from the in-memory index by team, time or ID prefix"""
+    cog = interaction.client.get_cog('Matches')
+    guild = interaction.guild
+    if cog is None or guild is None:
+        return []
+    
+    def display_name(user_id):
+        member = guild.get_member(user_id)
+        return member.display_name if member else None
+    
+    return [
+        app_commands.Choice(name=cog._match_choice_name(guild, match_id, match_data), value=match_id)
+        for match_id, match_data in cog.bot.match_index.search(guild.id, current, limit=25, names=display_name)
+    ]
+
 
 class Matches(commands.Cog):
     """Match scheduling and management commands"""
@@ -22,18 +149,18 @@ class Matches(commands.Cog):
     async def create_match(self, interaction: discord.Interaction, team1: str, team2: str, day: int, time: str):
         """Create a match: team vs team on specific day and time"""
         try:
-            # Parse both teams
-            team1_ids = self._parse_participants(team1, interaction.guild)
-            team2_ids = self._parse_participants(team2, interaction.guild)
+            # Parse both teams; roles are kept as roles and resolved when DMs go out
+            team1_ids, team1_roles = parse_mentions(team1, interaction.guild)
+            team2_ids, team2_roles = parse_mentions(team2, interaction.guild)
             
-            if not team1_ids:
+            if not team1_ids and not team1_roles:
                 embed = self.bot.embed_builder.create_error_embed(
                     "❌ الفريق الأول فارغ! منشن اللاعبين مثل: @player1 @player2",
                     interaction.user
                 )
                 return await interaction.response.send_message(embed=embed, ephemeral=True)
                 
-            if not team2_ids:
+            if not team2_ids and not team2_roles:
                 embed = self.bot.embed_builder.create_error_embed(
                     "❌ الفريق الثاني فارغ! منشن اللاعبين مثل: @player1 @player2",
                     interaction.user
@@ -58,46 +185,55 @@ class Matches(commands.Cog):
                 return await interaction.response.send_message(embed=embed, ephemeral=True)
             
             # Combine both teams
-            all_participants = list(team1_ids) + list(team2_ids)
+            all_participants = self.bot.participants.expand(
+                interaction.guild, team1_ids + team2_ids, team1_roles + team2_roles
+            )
+            
+            # Look up overlapping bookings for every player before this match is indexed
+            conflicts = self.bot.match_index.conflicts(
+                all_participants, match_datetime.timestamp(), roles_of=self._member_role_ids
+            )
             
             # Create match data with team vs team format
-            match_data = {
-                'title': f"فريق ضد فريق",
-                'description': f"الفريق الأول: {team1}\nالفريق الثاني: {team2}",
-                'time': match_datetime.isoformat(),
-                'creator_id': interaction.user.id,
-                'participants': all_participants,
-                'team1': list(team1_ids),
-                'team2': list(team2_ids),
-                'team1_mentions': team1,
-                'team2_mentions': team2,
-                'created_at': datetime.now(pytz.UTC).isoformat(),
-                'reminded_10': False,
-                'reminded_3': False
-            }
+            match_data = Match(
+                title=f"فريق ضد فريق",
+                description=f"الفريق الأول: {team1}\nالفريق الثاني: {team2}",
+                start=int(match_datetime.timestamp()),
+                creator_id=interaction.user.id,
+                team1=team1_ids,
+                team2=team2_ids,
+                team1_roles=team1_roles,
+                team2_roles=team2_roles,
+                team1_mentions=team1,
+                team2_mentions=team2
+            )
             
             # Save match to database
-            match_id = self.bot.database.create_match(interaction.guild.id, match_data)
+            match_id = await self.bot.db.create_match(interaction.guild.id, match_data)
             
             # Get guild language setting
-            language = self.bot.database.get_guild_setting(interaction.guild.id, 'language', 'en')
+            language = await self.bot.db.get_guild_setting(interaction.guild.id, 'language', 'en')
             
             # Create match embed
-            embed = self.bot.embed_builder.create_match_embed(match_data, match_id, language)
+            embed = self.bot.embed_builder.render_match_embed('match', interaction.guild.id, match_id, match_data, language)
             
             await interaction.response.send_message(embed=embed)
             
-            # Send DM notifications to participants
-            await self._send_match_notifications(interaction.guild, match_data, all_participants, language)
+            # Warn the organizer about players who are already booked
+            if conflicts:
+                await interaction.followup.send(embed=self._build_conflicts_embed(interaction.guild, conflicts), ephemeral=True)
+            
+            # Queue DM notifications to participants
+            delivery = await self._send_match_notifications(interaction.guild, match_id, match_data, all_participants, language)
             
             # Log in bot activity channel if set
-            activity_channel_id = self.bot.database.get_guild_setting(interaction.guild.id, 'bot_activity_channel')
+            activity_channel_id = await self.bot.db.get_guild_setting(interaction.guild.id, 'bot_activity_channel')
             if activity_channel_id:
                 activity_channel = interaction.guild.get_channel(activity_channel_id)
                 if activity_channel:
                     log_embed = discord.Embed(
                         title="🤖 Bot Activity",
-                        description=f"Match created: **فريق ضد فريق**\nCreator: {interaction.user.mention}\nTeam 1: {team1}\nTeam 2: {team2}",
+                        description=f"Match created: **فريق ضد فريق**\nCreator: {interaction.user.mention}\nTeam 1: {team1}\nTeam 2: {team2}\nDMs: {delivery.summary()}",
                         color=0x5865f2,
                         timestamp=datetime.utcnow()
                     )
@@ -111,52 +247,157 @@ class Matches(commands.Cog):
     async def list_matches(self, interaction: discord.Interaction):
         """List all current matches in the server"""
         try:
-            matches = self.bot.database.get_guild_matches(interaction.guild.id)
+            view = MatchListView(self, interaction.guild, interaction.user.id)
+            embed = self._build_matches_page(interaction.guild, 0)
+            
+            if view.page_count > 1:
+                await interaction.response.send_message(embed=embed, view=view)
+            else:
+                await interaction.response.send_message(embed=embed)
+            
+        except Exception as e:
+            embed = self.bot.embed_builder.create_error_embed(f"Failed to list matches: {e}", interaction.user)
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+    
+    @app_commands.command(name="my_matches", description="🎮 See the matches you are playing in")
+    @app_commands.describe(all_servers="Send your matches from every server to your DMs")
+    async def my_matches(self, interaction: discord.Interaction, all_servers: bool = False):
+        """List the caller's matches from the participant index"""
+        try:
+            if not all_servers and interaction.guild is None:
+                embed = self.bot.embed_builder.create_error_embed(
+                    "Use this command in a server, or set all_servers to get your matches from every server.",
+                    interaction.user
+                )
+                return await interaction.response.send_message(embed=embed, ephemeral=True)
+            
+            if not all_servers:
+                entries = self.bot.match_index.user_matches(
+                    interaction.user.id, interaction.guild.id,
+                    role_ids=self._member_role_ids(interaction.user.id, interaction.guild)
+                )
+                embed = self._build_user_matches_embed(entries, show_guild=False)
+                return await interaction.response.send_message(embed=embed, ephemeral=True)
+            
+            # Cross-server list goes to DMs
+            entries = self.bot.match_index.user_matches(
+                interaction.user.id, role_ids=self._member_role_ids(interaction.user.id)
+            )
+            embed = self._build_user_matches_embed(entries, show_guild=True)
+            status = await self.bot.dm_dispatcher.deliver(interaction.user, {'embed': embed})
             
-            if not matches:
+            if status == SENT:
                 embed = discord.Embed(
-                    title="📅 Current Matches",
-                    description="No matches scheduled.",
-                    color=0x5865f2,
+                    title="📬 Sent to your DMs",
+                    description=f"Your matches from every server ({len(entries)}) have been sent to you.",
+                    color=0x4CAF50,
                     timestamp=datetime.utcnow()
                 )
             else:
-                embed = discord.Embed(
-                    title="📅 Current Matches",
-                    description=f"Found {len(matches)} scheduled matches:",
-                    color=0x5865f2,
-                    timestamp=datetime.utcnow()
+                embed = self.bot.embed_builder.create_error_embed(
+                    "Couldn't DM you - please allow direct messages from server members.",
+                    interaction.user
                 )
-                
-                # Sort matches by time
-                sorted_matches = sorted(matches.items(), key=lambda x: x[1]['time'])
-                
-                for i, (match_id, match_data) in enumerate(sorted_matches[:10], 1):  # Show max 10 matches
-                    match_time = datetime.fromisoformat(match_data['time'])
-                    creator = interaction.guild.get_member(match_data['creator_id'])
-                    creator_name = creator.mention if creator else f"<@{match_data['creator_id']}>"
-                    
-                    participant_count = len(match_data['participants'])
-                    time_str = f"<t:{int(match_time.timestamp())}:R>"
-                    
-                    embed.add_field(
-                        name=f"`#{i}` {match_data['title']}",
-                        value=f"**Time:** {time_str}\n**Creator:** {creator_name}\n**Participants:** {participant_count}",
-                        inline=True
-                    )
-                
-                if len(matches) > 10:
-                    embed.set_footer(text=f"Showing 10 of {len(matches)} matches")
-            
-            await interaction.response.send_message(embed=embed)
+            await interaction.response.send_message(embed=embed, ephemeral=True)
             
         except Exception as e:
-            embed = self.bot.embed_builder.create_error_embed(f"Failed to list matches: {e}", interaction.user)
+            embed = self.bot.embed_builder.create_error_embed(f"Failed to list your matches: {e}", interaction.user)
             await interaction.response.send_message(embed=embed, ephemeral=True)
     
-    @app_commands.command(name="end_match", description="End a match by number")
-    @app_commands.describe(match_number="Match number from /list_matches")
-    async def end_match(self, interaction: discord.Interaction, match_number: int):
+    def _build_conflicts_embed(self, guild, conflicts):
+        """Embed listing players whose existing matches overlap the new one"""
+        lines = []
+        for user_id, bookings in list(conflicts.items())[:MAX_CONFLICT_LINES]:
+            booked = []
+            for guild_id, match_id, match_data in bookings:
+                when = f"<t:{match_data.start}:t>"
+                if guild_id == guild.id:
+                    booked.append(f"`{match_id}` {when}")
+                else:
+                    booked.append(f"another server {when}")
+            lines.append(f"<@{user_id}>: {', '.join(booked)}")
+        
+        if len(conflicts) > MAX_CONFLICT_LINES:
+            lines.append(f"…and {len(conflicts) - MAX_CONFLICT_LINES} more players")
+        
+        return discord.Embed(
+            title="⚠️ Schedule Conflicts",
+            description=f"{len(conflicts)} players already have a match at that time:\n" + "\n".join(lines),
+            color=0xffa502,
+            timestamp=datetime.utcnow()
+        )
+    
+    def _build_user_matches_embed(self, entries, show_guild):
+        """Embed listing ``(guild_id, match_id, match_data)`` entries, at most one page of fields"""
+        if not entries:
+            return discord.Embed(
+                title="🎮 Your Matches",
+                description="You are not in any scheduled matches.",
+                color=0x5865f2,
+                timestamp=datetime.utcnow()
+            )
+        
+        embed = discord.Embed(
+            title="🎮 Your Matches",
+            description=f"You are in {len(entries)} scheduled matches:",
+            color=0x5865f2,
+            timestamp=datetime.utcnow()
+        )
+        
+        for guild_id, match_id, match_data in entries[:MATCHES_PER_PAGE]:
+            value = f"**Time:** <t:{match_data.start}:F>\n**Teams:** {match_data.team1_mentions} vs {match_data.team2_mentions}\n**ID:** `{match_id}`"
+            if show_guild:
+                guild = self.bot.get_guild(guild_id)
+                value = f"**Server:** {guild.name if guild else guild_id}\n" + value
+            embed.add_field(name=match_data.title, value=value, inline=False)
+        
+        if len(entries) > MATCHES_PER_PAGE:
+            embed.set_footer(text=f"Showing the next {MATCHES_PER_PAGE} of {len(entries)} matches")
+        
+        return embed
+    
+    def _build_matches_page(self, guild, page):
+        """Embed for one page of the guild's matches, read from the match index"""
+        total = self.bot.match_index.count(guild.id)
+        
+        if not total:
+            return discord.Embed(
+                title="📅 Current Matches",
+                description="No matches scheduled.",
+                color=0x5865f2,
+                timestamp=datetime.utcnow()
+            )
+        
+        embed = discord.Embed(
+            title="📅 Current Matches",
+            description=f"Found {total} scheduled matches:",
+            color=0x5865f2,
+            timestamp=datetime.utcnow()
+        )
+        
+        for number, match_id, match_data in self.bot.match_index.page(guild.id, page * MATCHES_PER_PAGE, MATCHES_PER_PAGE):
+            creator = guild.get_member(match_data.creator_id)
+            creator_name = creator.mention if creator else f"<@{match_data.creator_id}>"
+            
+            participant_count = participant_summary(match_data)
+            time_str = f"<t:{match_data.start}:R>"
+            
+            embed.add_field(
+                name=f"`#{number}` {'🔁 ' if match_data.series_id else ''}{match_data.title}",
+                value=f"**Time:** {time_str}\n**Creator:** {creator_name}\n**Participants:** {participant_count}",
+                inline=True
+            )
+        
+        if total > MATCHES_PER_PAGE:
+            page_count = (total + MATCHES_PER_PAGE - 1) // MATCHES_PER_PAGE
+            embed.set_footer(text=f"Page {page + 1}/{page_count} • {total} matches")
+        
+        return embed
+    
+    @app_commands.command(name="end_match", description="End a match")
+    @app_commands.describe(match="Match to end: search by team, time or ID (or a number from /matches)")
+    @app_commands.autocomplete(match=match_autocomplete)
+    async def end_match(self, interaction: discord.Interaction, match: str):
         """End a match by its number from the list"""
         try:
             # Check permissions
@@ -167,43 +408,42 @@ class Matches(commands.Cog):
                 )
                 return await interaction.response.send_message(embed=embed, ephemeral=True)
             
-            matches = self.bot.database.get_guild_matches(interaction.guild.id)
+            match_count = self.bot.match_index.count(interaction.guild.id)
             
-            if not matches:
+            if not match_count:
                 embed = self.bot.embed_builder.create_error_embed(
                     "No matches found to end!",
                     interaction.user
                 )
                 return await interaction.response.send_message(embed=embed, ephemeral=True)
             
-            # Sort matches by time to get the correct order
-            sorted_matches = sorted(matches.items(), key=lambda x: x[1]['time'])
+            # Get the match to end
+            match_id = self._resolve_match(interaction.guild.id, match)
+            match_data = await self.bot.db.get_match(interaction.guild.id, match_id) if match_id else None
             
-            if not 1 <= match_number <= len(sorted_matches):
+            if match_data is None:
                 embed = self.bot.embed_builder.create_error_embed(
-                    f"Invalid match number! Must be between 1 and {len(sorted_matches)}",
+                    f"Match not found! Pick one from the suggestions or use a number between 1 and {match_count}",
                     interaction.user
                 )
                 return await interaction.response.send_message(embed=embed, ephemeral=True)
             
-            # Get the match to end
-            match_id, match_data = sorted_matches[match_number - 1]
-            
             # Check if user is the creator or has admin permissions
-            if match_data['creator_id'] != interaction.user.id and not interaction.user.guild_permissions.administrator:
+            if match_data.creator_id != interaction.user.id and not interaction.user.guild_permissions.administrator:
                 embed = self.bot.embed_builder.create_error_embed(
                     "You can only end matches you created!",
                     interaction.user
                 )
                 return await interaction.response.send_message(embed=embed, ephemeral=True)
             
-            # Remove the match
-            self.bot.database.remove_match(interaction.guild.id, match_id)
+            # Record it in the match history, then remove it
+            await self._archive_match(interaction.guild.id, match_id, match_data, 'ended', interaction.user.id)
+            await self.bot.db.remove_match(interaction.guild.id, match_id)
             
             # Create success embed
             embed = discord.Embed(
                 title="✅ Match Ended",
-                description=f"**Match:** {match_data['title']}\n**Ended by:** {interaction.user.mention}",
+                description=f"**Match:** {match_data.title}\n**Ended by:** {interaction.user.mention}",
                 color=0x4CAF50,
                 timestamp=datetime.utcnow()
             )
@@ -214,9 +454,151 @@ class Matches(commands.Cog):
             embed = self.bot.embed_builder.create_error_embed(f"Failed to end match: {e}", interaction.user)
             await interaction.response.send_message(embed=embed, ephemeral=True)
     
-    @app_commands.command(name="cancel_match", description="Cancel a match by number")
-    @app_commands.describe(match_number="Match number from /list_matches")
-    async def cancel_match(self, interaction: discord.Interaction, match_number: int):
+    @app_commands.command(name="match_result", description="🏆 Record who won a match")
+    @app_commands.describe(
+        match="Match to finish: search by team, time or ID (or a number from /matches)",
+        winner="The team that won"
+    )
+    @app_commands.choices(winner=[
+        app_commands.Choice(name="Team 1", value=1),
+        app_commands.Choice(name="Team 2", value=2)
+    ])
+    @app_commands.autocomplete(match=match_autocomplete)
+    async def match_result(self, interaction: discord.Interaction, match: str, winner: app_commands.Choice[int]):
+        """Record the winning team, update standings and end the match"""
+        try:
+            # Check permissions
+            if not interaction.user.guild_permissions.manage_events:
+                embed = self.bot.embed_builder.create_error_embed(
+                    "You don't have permission to record match results!",
+                    interaction.user
+                )
+                return await interaction.response.send_message(embed=embed, ephemeral=True)
+            
+            match_count = self.bot.match_index.count(interaction.guild.id)
+            
+            if not match_count:
+                embed = self.bot.embed_builder.create_error_embed(
+                    "No matches found to record!",
+                    interaction.user
+                )
+                return await interaction.response.send_message(embed=embed, ephemeral=True)
+            
+            # Get the match
+            match_id = self._resolve_match(interaction.guild.id, match)
+            match_data = await self.bot.db.get_match(interaction.guild.id, match_id) if match_id else None
+            
+            if match_data is None:
+                embed = self.bot.embed_builder.create_error_embed(
+                    f"Match not found! Pick one from the suggestions or use a number between 1 and {match_count}",
+                    interaction.user
+                )
+                return await interaction.response.send_message(embed=embed, ephemeral=True)
+            
+            # Check if user is the creator or has admin permissions
+            if match_data.creator_id != interaction.user.id and not interaction.user.guild_permissions.administrator:
+                embed = self.bot.embed_builder.create_error_embed(
+                    "You can only record results for matches you created!",
+                    interaction.user
+                )
+                return await interaction.response.send_message(embed=embed, ephemeral=True)
+            
+            # Members who played on each side, with roles expanded as they are now
+            team1_members = self.bot.participants.expand(interaction.guild, match_data.team1, match_data.team1_roles)
+            team2_members = self.bot.participants.expand(interaction.guild, match_data.team2, match_data.team2_roles)
+            
+            # Update standings and remove the match, then record it in the match history
+            rating_change = await self.bot.standings.record_result(
+                interaction.guild.id, match_id, match_data, winner.value, team1_members, team2_members
+            )
+            if rating_change is None:
+                embed = self.bot.embed_builder.create_error_embed(
+                    "This match has already ended or its result was already recorded!",
+                    interaction.user
+                )
+                return await interaction.response.send_message(embed=embed, ephemeral=True)
+            
+            await self._archive_match(
+                interaction.guild.id, match_id, match_data, 'ended', interaction.user.id, winner=winner.value
+            )
+            
+            winning_team = match_data.team1_mentions if winner.value == 1 else match_data.team2_mentions
+            embed = discord.Embed(
+                title="🏆 Match Result",
+                description=f"**Match:** {match_data.title}\n**Winner:** {winning_team}\n**Team rating:** +{round(rating_change)}\n**Recorded by:** {interaction.user.mention}",
+                color=0xf1c40f,
+                timestamp=datetime.utcnow()
+            )
+            
+            await interaction.response.send_message(embed=embed)
+            
+        except Exception as e:
+            embed = self.bot.embed_builder.create_error_embed(f"Failed to record match result: {e}", interaction.user)
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+    
+    @app_commands.command(name="leaderboard", description="📊 See the server's standings")
+    @app_commands.describe(kind="Rank players or teams")
+    @app_commands.choices(kind=[
+        app_commands.Choice(name="Players", value="players"),
+        app_commands.Choice(name="Teams", value="teams")
+    ])
+    async def leaderboard(self, interaction: discord.Interaction, kind: app_commands.Choice[str] = None):
+        """Show the server's player or team standings"""
+        try:
+            kind = kind.value if kind else 'players'
+            embed, total = await self._build_leaderboard_page(interaction.guild, kind, 0, interaction.user)
+            
+            if total > LEADERBOARD_PER_PAGE:
+                view = LeaderboardView(self, interaction.guild, kind, interaction.user, total)
+                await interaction.response.send_message(embed=embed, view=view)
+            else:
+                await interaction.response.send_message(embed=embed)
+            
+        except Exception as e:
+            embed = self.bot.embed_builder.create_error_embed(f"Failed to load leaderboard: {e}", interaction.user)
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+    
+    async def _build_leaderboard_page(self, guild, kind, page, user):
+        """Embed for one page of a leaderboard, and the leaderboard's size"""
+        title = "📊 Player Standings" if kind == 'players' else "📊 Team Standings"
+        entries, total = await self.bot.standings.page(
+            guild.id, kind, page * LEADERBOARD_PER_PAGE, LEADERBOARD_PER_PAGE
+        )
+        
+        if not total:
+            embed = discord.Embed(
+                title=title,
+                description="No results recorded yet. Use `/match_result` when a match is over.",
+                color=0xf1c40f,
+                timestamp=datetime.utcnow()
+            )
+            return embed, total
+        
+        lines = []
+        for rank, key, standing in entries:
+            name = f"<@{key}>" if kind == 'players' else (standing.name[:80] or key)
+            lines.append(f"`#{rank}` {name} • **{round(standing.rating)}** ({standing.wins}W {standing.losses}L)")
+        
+        embed = discord.Embed(
+            title=title,
+            description="\n".join(lines),
+            color=0xf1c40f,
+            timestamp=datetime.utcnow()
+        )
+        
+        footer = f"Page {page + 1}/{max(1, (total + LEADERBOARD_PER_PAGE - 1) // LEADERBOARD_PER_PAGE)} • {total} {kind}"
+        if kind == 'players':
+            own = await self.bot.standings.rank(guild.id, kind, user.id)
+            if own is not None:
+                footer += f" • Your rank: #{own[0]}"
+        embed.set_footer(text=footer)
+        
+        return embed, total
+    
+    @app_commands.command(name="cancel_match", description="Cancel a match")
+    @app_commands.describe(match="Match to cancel: search by team, time or ID (or a number from /matches)")
+    @app_commands.autocomplete(match=match_autocomplete)
+    async def cancel_match(self, interaction: discord.Interaction, match: str):
         """Cancel a match and notify participants"""
         try:
             # Check permissions
@@ -227,30 +609,28 @@ class Matches(commands.Cog):
                 )
                 return await interaction.response.send_message(embed=embed, ephemeral=True)
             
-            matches = self.bot.database.get_guild_matches(interaction.guild.id)
+            match_count = self.bot.match_index.count(interaction.guild.id)
             
-            if not matches:
+            if not match_count:
                 embed = self.bot.embed_builder.create_error_embed(
                     "No matches found to cancel!",
                     interaction.user
                 )
                 return await interaction.response.send_message(embed=embed, ephemeral=True)
             
-            # Sort matches by time to get the correct order
-            sorted_matches = sorted(matches.items(), key=lambda x: x[1]['time'])
+            # Get the match to cancel
+            match_id = self._resolve_match(interaction.guild.id, match)
+            match_data = await self.bot.db.get_match(interaction.guild.id, match_id) if match_id else None
             
-            if not 1 <= match_number <= len(sorted_matches):
+            if match_data is None:
                 embed = self.bot.embed_builder.create_error_embed(
-                    f"Invalid match number! Must be between 1 and {len(sorted_matches)}",
+                    f"Match not found! Pick one from the suggestions or use a number between 1 and {match_count}",
                     interaction.user
                 )
                 return await interaction.response.send_message(embed=embed, ephemeral=True)
             
-            # Get the match to cancel
-            match_id, match_data = sorted_matches[match_number - 1]
-            
             # Check if user is the creator or has admin permissions
-            if match_data['creator_id'] != interaction.user.id and not interaction.user.guild_permissions.administrator:
+            if match_data.creator_id != interaction.user.id and not interaction.user.guild_permissions.administrator:
                 embed = self.bot.embed_builder.create_error_embed(
                     "You can only cancel matches you created!",
                     interaction.user
@@ -258,18 +638,19 @@ class Matches(commands.Cog):
                 return await interaction.response.send_message(embed=embed, ephemeral=True)
             
             # Get guild language setting
-            language = self.bot.database.get_guild_setting(interaction.guild.id, 'language', 'en')
+            language = await self.bot.db.get_guild_setting(interaction.guild.id, 'language', 'en')
             
             # Notify participants about cancellation
-            await self._send_cancellation_notifications(interaction.guild, match_data, language)
+            delivery = await self._send_cancellation_notifications(interaction.guild, match_id, match_data, language)
             
-            # Remove the match
-            self.bot.database.remove_match(interaction.guild.id, match_id)
+            # Record it in the match history, then remove it
+            await self._archive_match(interaction.guild.id, match_id, match_data, 'cancelled', interaction.user.id)
+            await self.bot.db.remove_match(interaction.guild.id, match_id)
             
             # Create success embed
             embed = discord.Embed(
                 title="❌ Match Cancelled",
-                description=f"**Match:** {match_data['title']}\n**Cancelled by:** {interaction.user.mention}\n**Participants notified:** {len(match_data['participants'])}",
+                description=f"**Match:** {match_data.title}\n**Cancelled by:** {interaction.user.mention}\n**Participants notified:** {delivery.summary()}",
                 color=0xf44336,
                 timestamp=datetime.utcnow()
             )
@@ -280,26 +661,347 @@ class Matches(commands.Cog):
             embed = self.bot.embed_builder.create_error_embed(f"Failed to cancel match: {e}", interaction.user)
             await interaction.response.send_message(embed=embed, ephemeral=True)
     
-    def _parse_participants(self, participants_str, guild):
-        """Parse participant mentions and role mentions"""
-        participant_ids = set()
+    @app_commands.command(name="match_series", description="🔁 Schedule a match that repeats")
+    @app_commands.describe(
+        team1="First team (mention players or roles)",
+        team2="Second team (mention players or roles)",
+        day="Day of the month of the first match (e.g. 25)",
+        time="Time (e.g. 8:30 PM or 20:30)",
+        repeat="How often it repeats",
+        every="Repeat every this many days or weeks",
+        until="Last day it may run (YYYY-MM-DD, UTC)"
+    )
+    @app_commands.choices(repeat=[
+        app_commands.Choice(name="Weekly", value="weekly"),
+        app_commands.Choice(name="Daily", value="daily")
+    ])
+    async def create_series(self, interaction: discord.Interaction, team1: str, team2: str, day: int, time: str,
+                            repeat: app_commands.Choice[str], every: app_commands.Range[int, 1, 52] = 1,
+                            until: str = None):
+        """Create a recurring match; only its next occurrence is scheduled at a time"""
+        try:
+            # Check permissions
+            if not interaction.user.guild_permissions.manage_events:
+                embed = self.bot.embed_builder.create_error_embed(
+                    "You don't have permission to schedule recurring matches!",
+                    interaction.user
+                )
+                return await interaction.response.send_message(embed=embed, ephemeral=True)
+            
+            team1_ids, team1_roles = parse_mentions(team1, interaction.guild)
+            team2_ids, team2_roles = parse_mentions(team2, interaction.guild)
+            
+            if (not team1_ids and not team1_roles) or (not team2_ids and not team2_roles):
+                embed = self.bot.embed_builder.create_error_embed(
+                    "❌ Both teams need players! Mention them like: @player1 @player2",
+                    interaction.user
+                )
+                return await interaction.response.send_message(embed=embed, ephemeral=True)
+            
+            match_datetime = self._parse_day_and_time(day, time)
+            if not match_datetime or match_datetime <= datetime.now(pytz.UTC):
+                embed = self.bot.embed_builder.create_error_embed(
+                    "❌ The first match must be a valid day and time in the future!",
+                    interaction.user
+                )
+                return await interaction.response.send_message(embed=embed, ephemeral=True)
+            
+            try:
+                until_ts = self._parse_date(until)
+            except ValueError:
+                embed = self.bot.embed_builder.create_error_embed(
+                    "Dates must look like 2024-05-31!",
+                    interaction.user
+                )
+                return await interaction.response.send_message(embed=embed, ephemeral=True)
+            if until_ts is not None:
+                until_ts += 24 * 3600 - 1  # Include the whole last day
+                if until_ts < match_datetime.timestamp():
+                    embed = self.bot.embed_builder.create_error_embed(
+                        "❌ The end date is before the first match!",
+                        interaction.user
+                    )
+                    return await interaction.response.send_message(embed=embed, ephemeral=True)
+            
+            template = Match(
+                title=f"فريق ضد فريق",
+                description=f"الفريق الأول: {team1}\nالفريق الثاني: {team2}",
+                start=int(match_datetime.timestamp()),
+                creator_id=interaction.user.id,
+                team1=team1_ids,
+                team2=team2_ids,
+                team1_roles=team1_roles,
+                team2_roles=team2_roles,
+                team1_mentions=team1,
+                team2_mentions=team2
+            )
+            series = MatchSeries(template, repeat.value, every, until_ts)
+            series_id, match_ids = await self.bot.series.create(interaction.guild.id, series)
+            
+            description = (
+                f"**Teams:** {team1} vs {team2}\n"
+                f"**Repeats:** {self._describe_series(series)}\n"
+                f"**First match:** <t:{template.start}:F>\n"
+                f"**Series ID:** `{series_id}`"
+            )
+            embed = discord.Embed(
+                title="🔁 Match Series Created",
+                description=description,
+                color=0x5865f2,
+                timestamp=datetime.utcnow()
+            )
+            await interaction.response.send_message(embed=embed)
+            
+            # Occurrences are ordinary matches from here on; announce the first like /match does
+            language = await self.bot.db.get_guild_setting(interaction.guild.id, 'language', 'en')
+            for match_id in match_ids:
+                match_data = await self.bot.db.get_match(interaction.guild.id, match_id)
+                if match_data is not None:
+                    await self._send_match_notifications(
+                        interaction.guild, match_id, match_data,
+                        self.bot.participants.resolve(interaction.guild, match_data), language
+                    )
+            
+        except Exception as e:
+            embed = self.bot.embed_builder.create_error_embed(f"Failed to create match series: {e}", interaction.user)
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+    
+    @app_commands.command(name="series", description="🔁 See recurring matches")
+    async def list_series(self, interaction: discord.Interaction):
+        """List the server's recurring match series"""
+        try:
+            guild_series = self.bot.series.guild_series(interaction.guild.id)
+            if not guild_series:
+                embed = discord.Embed(
+                    title="🔁 Recurring Matches",
+                    description="No recurring matches. Create one with `/match_series`.",
+                    color=0x5865f2,
+                    timestamp=datetime.utcnow()
+                )
+                return await interaction.response.send_message(embed=embed)
+            
+            embed = discord.Embed(
+                title="🔁 Recurring Matches",
+                description=f"Found {len(guild_series)} recurring matches:",
+                color=0x5865f2,
+                timestamp=datetime.utcnow()
+            )
+            
+            now = datetime.now(pytz.UTC).timestamp()
+            for series_id, series in list(guild_series.items())[:MATCHES_PER_PAGE]:
+                upcoming = [start for start in self.bot.series.occurrences(interaction.guild.id, series_id).values() if start > now]
+                next_match = f"<t:{min(upcoming)}:R>" if upcoming else "none scheduled"
+                embed.add_field(
+                    name=f"{series.template.title} • `{series_id}`",
+                    value=(
+                        f"**Teams:** {series.template.team1_mentions} vs {series.template.team2_mentions}\n"
+                        f"**Repeats:** {self._describe_series(series)}\n"
+                        f"**Next:** {next_match}"
+                    ),
+                    inline=False
+                )
+            
+            if len(guild_series) > MATCHES_PER_PAGE:
+                embed.set_footer(text=f"Showing {MATCHES_PER_PAGE} of {len(guild_series)} series")
+            
+            await interaction.response.send_message(embed=embed)
+            
+        except Exception as e:
+            embed = self.bot.embed_builder.create_error_embed(f"Failed to list recurring matches: {e}", interaction.user)
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+    
+    @app_commands.command(name="cancel_series", description="Stop a recurring match")
+    @app_commands.describe(series="Series to stop: search by team or ID")
+    @app_commands.autocomplete(series=series_autocomplete)
+    async def cancel_series(self, interaction: discord.Interaction, series: str):
+        """Stop a series and cancel its occurrences that have not started"""
+        try:
+            # Check permissions
+            if not interaction.user.guild_permissions.manage_events:
+                embed = self.bot.embed_builder.create_error_embed(
+                    "You don't have permission to cancel recurring matches!",
+                    interaction.user
+                )
+                return await interaction.response.send_message(embed=embed, ephemeral=True)
+            
+            series_id = series.strip()
+            series_data = self.bot.series.guild_series(interaction.guild.id).get(series_id)
+            if series_data is None:
+                embed = self.bot.embed_builder.create_error_embed(
+                    "Series not found! Pick one from the suggestions or see `/series`",
+                    interaction.user
+                )
+                return await interaction.response.send_message(embed=embed, ephemeral=True)
+            
+            # Check if user is the creator or has admin permissions
+            if series_data.template.creator_id != interaction.user.id and not interaction.user.guild_permissions.administrator:
+                embed = self.bot.embed_builder.create_error_embed(
+                    "You can only cancel series you created!",
+                    interaction.user
+                )
+                return await interaction.response.send_message(embed=embed, ephemeral=True)
+            
+            cancelled = await self.bot.series.cancel(interaction.guild.id, series_id) or []
+            
+            embed = discord.Embed(
+                title="❌ Match Series Cancelled",
+                description=f"**Teams:** {series_data.template.team1_mentions} vs {series_data.template.team2_mentions}\n**Upcoming matches cancelled:** {len(cancelled)}\n**Cancelled by:** {interaction.user.mention}",
+                color=0xf44336,
+                timestamp=datetime.utcnow()
+            )
+            await interaction.response.send_message(embed=embed)
+            
+            # Cancelled occurrences go to the history and their players are told, like /cancel_match
+            language = await self.bot.db.get_guild_setting(interaction.guild.id, 'language', 'en')
+            for match_id, match_data in cancelled:
+                await self._archive_match(interaction.guild.id, match_id, match_data, 'cancelled', interaction.user.id)
+                await self._send_cancellation_notifications(interaction.guild, match_id, match_data, language)
+            
+        except Exception as e:
+            embed = self.bot.embed_builder.create_error_embed(f"Failed to cancel series: {e}", interaction.user)
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+    
+    @staticmethod
+    def _describe_series(series, plain=False):
+        """How often a series repeats, in words (``plain`` avoids Discord timestamps, for autocomplete)"""
+        unit = 'day' if series.frequency == 'daily' else 'week'
+        text = f"Every {unit}" if series.interval == 1 else f"Every {series.interval} {unit}s"
+        if series.until is not None:
+            until = datetime.utcfromtimestamp(series.until).strftime('%d %b %Y') if plain else f"<t:{series.until}:D>"
+            text += f" until {until}"
+        return text
+    
+    @app_commands.command(name="match_history", description="📜 See past matches")
+    @app_commands.describe(
+        user="Only matches this member played in",
+        from_date="Earliest match day (YYYY-MM-DD, UTC)",
+        to_date="Latest match day (YYYY-MM-DD, UTC)"
+    )
+    @app_commands.rename(from_date="from", to_date="to")
+    async def match_history(self, interaction: discord.Interaction, user: discord.Member = None,
+                            from_date: str = None, to_date: str = None):
+        """List ended, cancelled and expired matches from the match archive"""
+        try:
+            try:
+                start_from = self._parse_date(from_date)
+                start_to = self._parse_date(to_date)
+            except ValueError:
+                embed = self.bot.embed_builder.create_error_embed(
+                    "Dates must look like 2024-05-31!",
+                    interaction.user
+                )
+                return await interaction.response.send_message(embed=embed, ephemeral=True)
+            if start_to is not None:
+                start_to += 24 * 3600 - 1  # Include the whole last day
+            
+            user_ids = [user.id] if user else []
+            role_ids = self._member_role_ids(user.id, interaction.guild) if user else []
+            
+            # Only the segments that can hold matching entries are decompressed, off the event loop
+            loop = asyncio.get_running_loop()
+            entries = await loop.run_in_executor(
+                None, lambda: self.bot.match_archive.query(
+                    interaction.guild.id, start_from, start_to, user_ids=user_ids, role_ids=role_ids
+                )
+            )
+            
+            embed = self._build_history_embed(entries, user)
+            await interaction.response.send_message(embed=embed)
+            
+        except Exception as e:
+            embed = self.bot.embed_builder.create_error_embed(f"Failed to load match history: {e}", interaction.user)
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+    
+    @staticmethod
+    def _parse_date(value):
+        """Epoch seconds at the start of a YYYY-MM-DD day in UTC, or None"""
+        if not value:
+            return None
+        return int(pytz.UTC.localize(datetime.strptime(value.strip(), '%Y-%m-%d')).timestamp())
+    
+    def _build_history_embed(self, entries, user):
+        """Embed listing the most recent archived matches, newest first"""
+        title = f"📜 Match History • {user.display_name}" if user else "📜 Match History"
+        if not entries:
+            return discord.Embed(
+                title=title,
+                description="No past matches found.",
+                color=0x5865f2,
+                timestamp=datetime.utcnow()
+            )
         
-        # Find user mentions
-        user_matches = re.findall(r'<@!?(\d+)>', participants_str)
-        for user_id in user_matches:
-            member = guild.get_member(int(user_id))
-            if member:
-                participant_ids.add(member.id)
+        embed = discord.Embed(
+            title=title,
+            description=f"Found {len(entries)} past matches:",
+            color=0x5865f2,
+            timestamp=datetime.utcnow()
+        )
         
-        # Find role mentions
-        role_matches = re.findall(r'<@&(\d+)>', participants_str)
-        for role_id in role_matches:
-            role = guild.get_role(int(role_id))
-            if role:
-                for member in role.members:
-                    participant_ids.add(member.id)
+        for entry in reversed(entries[-MATCHES_PER_PAGE:]):
+            status = entry.get('status', 'expired')
+            value = f"**Time:** <t:{entry['start']}:f>\n**Teams:** {entry.get('team1_mentions', '')} vs {entry.get('team2_mentions', '')}"
+            if entry.get('winner'):
+                winning_team = entry.get(f"team{entry['winner']}_mentions", '')
+                value += f"\n**Winner:** {winning_team}"
+            if entry.get('closed_by'):
+                value += f"\n**{status.capitalize()} by:** <@{entry['closed_by']}>"
+            embed.add_field(
+                name=f"{HISTORY_STATUS_ICONS.get(status, '')} {entry.get('title', '')} • `{entry['match_id']}`",
+                value=value,
+                inline=False
+            )
+        
+        if len(entries) > MATCHES_PER_PAGE:
+            embed.set_footer(text=f"Showing the {MATCHES_PER_PAGE} most recent of {len(entries)} matches")
         
-        return participant_ids
+        return embed
+    
+    async def _archive_match(self, guild_id, match_id, match_data, status, closed_by, winner=None):
+        """Append a match that is leaving the live store to the match archive"""
+        entry = archive_entry(guild_id, match_id, match_data, status, closed_by, winner)
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.bot.match_archive.append, [entry])
+    
+    def _resolve_match(self, guild_id, value):
+        """Match ID picked from autocomplete, or the ID at a number typed by hand"""
+        value = value.strip()
+        if self.bot.match_index.position(guild_id, value) is not None:
+            return value
+        if value.lstrip('#').isdigit():
+            entry = self.bot.match_index.at(guild_id, int(value.lstrip('#')))
+            return entry[0] if entry else None
+        return None
+    
+    def _match_choice_name(self, guild, match_id, match_data):
+        """Short label for an autocomplete choice (Discord allows 100 characters)"""
+        def team_names(user_ids):
+            names = []
+            for user_id in user_ids[:3]:
+                member = guild.get_member(user_id)
+                names.append(member.display_name if member else str(user_id))
+            if len(user_ids) > 3:
+                names.append(f"+{len(user_ids) - 3}")
+            return ", ".join(names)
+        
+        match_time = match_data.start_time.strftime('%d %b %H:%M')
+        name = f"{team_names(match_data.team1)} vs {team_names(match_data.team2)} • {match_time} • {match_id}"
+        if len(name) > 100:
+            name = name[:99 - len(match_id) - 3] + "… • " + match_id
+        return name[:100]
+    
+    def _member_role_ids(self, user_id, guild=None):
+        """Role IDs a user holds in ``guild``, or in every server shared with the bot"""
+        if guild is not None:
+            member = guild.get_member(user_id)
+            return [role.id for role in member.roles] if member else []
+        
+        user = self.bot.get_user(user_id)
+        role_ids = []
+        for mutual_guild in (user.mutual_guilds if user else []):
+            member = mutual_guild.get_member(user_id)
+            if member:
+                role_ids.extend(role.id for role in member.roles)
+        return role_ids
     
     def _parse_day_and_time(self, day, time_str):
         """Parse day (1-31) and time string into datetime"""
@@ -433,41 +1135,22 @@ class Matches(commands.Cog):
             print(f"Error parsing time: {e}")
             return None
     
-    async def _send_match_notifications(self, guild, match_data, participant_ids, language):
-        """Send DM notifications to match participants"""
-        try:
-            for user_id in participant_ids:
-                try:
-                    member = guild.get_member(user_id)
-                    if member:
-                        embed = self.bot.embed_builder.create_match_notification_embed(match_data, language)
-                        view = TranslationView(embed, match_data, language)
-                        
-                        await member.send(embed=embed, view=view)
-                        
-                except Exception as e:
-                    print(f"Failed to send notification to user {user_id}: {e}")
-                    
-        except Exception as e:
-            print(f"Error sending match notifications: {e}")
+    async def _send_match_notifications(self, guild, match_id, match_data, participant_ids, language):
+        """Queue DM notifications to match participants, skipping unreachable users"""
+        embed = self.bot.embed_builder.render_match_embed('notification', guild.id, match_id, match_data, language)
+        return await self.bot.dm_queue.enqueue(
+            guild.id, participant_ids, embed,
+            view={'type': 'match', 'kind': 'n', 'guild_id': guild.id, 'match_id': match_id, 'language': language, 'start': match_data.start},
+            not_after=match_data.start
+        )
     
-    async def _send_cancellation_notifications(self, guild, match_data, language):
-        """Send DM notifications about match cancellation"""
-        try:
-            for user_id in match_data['participants']:
-                try:
-                    member = guild.get_member(user_id)
-                    if member:
-                        embed = self.bot.embed_builder.create_cancellation_embed(match_data, language)
-                        view = TranslationView(embed, match_data, language)
-                        
-                        await member.send(embed=embed, view=view)
-                        
-                except Exception as e:
-                    print(f"Failed to send cancellation notification to user {user_id}: {e}")
-                    
-        except Exception as e:
-            print(f"Error sending cancellation notifications: {e}")
+    async def _send_cancellation_notifications(self, guild, match_id, match_data, language):
+        """Queue DM notifications about match cancellation, skipping unreachable users"""
+        embed = self.bot.embed_builder.render_match_embed('cancellation', guild.id, match_id, match_data, language)
+        return await self.bot.dm_queue.enqueue(
+            guild.id, self.bot.participants.resolve(guild, match_data), embed,
+            view={'type': 'match', 'kind': 'c', 'guild_id': guild.id, 'match_id': match_id, 'language': language, 'start': match_data.start}
+        )
 
 
 
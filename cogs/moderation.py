@@ -35,16 +35,13 @@ class Moderation(commands.Cog):
                 return await interaction.response.send_message(embed=embed, ephemeral=True)
             
             # Send DM to user before kicking
-            try:
-                dm_embed = discord.Embed(
-                    title="🦶 You have been kicked",
-                    description=f"**Server:** {interaction.guild.name}\n**Reason:** {reason}",
-                    color=0xff6b6b,
-                    timestamp=datetime.utcnow()
-                )
-                await member.send(embed=dm_embed)
-            except:
-                pass  # User has DMs disabled
+            dm_embed = discord.Embed(
+                title="🦶 You have been kicked",
+                description=f"**Server:** {interaction.guild.name}\n**Reason:** {reason}",
+                color=0xff6b6b,
+                timestamp=datetime.utcnow()
+            )
+            await self.bot.dm_dispatcher.deliver(member, {'embed': dm_embed})  # Skips users with DMs closed
             
             # Kick the member
             await member.kick(reason=f"Kicked by {interaction.user} | {reason}")
@@ -60,7 +57,7 @@ class Moderation(commands.Cog):
             await interaction.response.send_message(embed=embed)
             
             # Log to moderation channel if set
-            log_channel_id = self.bot.database.get_guild_setting(interaction.guild.id, 'mod_log_channel')
+            log_channel_id = await self.bot.db.get_guild_setting(interaction.guild.id, 'mod_log_channel')
             if log_channel_id:
                 log_channel = interaction.guild.get_channel(log_channel_id)
                 if log_channel:
@@ -104,16 +101,13 @@ class Moderation(commands.Cog):
                 return await interaction.response.send_message(embed=embed, ephemeral=True)
             
             # Send DM to user before banning
-            try:
-                dm_embed = discord.Embed(
-                    title="🔨 You have been banned",
-                    description=f"**Server:** {interaction.guild.name}\n**Reason:** {reason}",
-                    color=0xff4757,
-                    timestamp=datetime.utcnow()
-                )
-                await member.send(embed=dm_embed)
-            except:
-                pass  # User has DMs disabled
+            dm_embed = discord.Embed(
+                title="🔨 You have been banned",
+                description=f"**Server:** {interaction.guild.name}\n**Reason:** {reason}",
+                color=0xff4757,
+                timestamp=datetime.utcnow()
+            )
+            await self.bot.dm_dispatcher.deliver(member, {'embed': dm_embed})  # Skips users with DMs closed
             
             # Ban the member
             await member.ban(reason=f"Banned by {interaction.user} | {reason}", delete_message_days=delete_days)
@@ -129,7 +123,7 @@ class Moderation(commands.Cog):
             await interaction.response.send_message(embed=embed)
             
             # Log to moderation channel if set
-            log_channel_id = self.bot.database.get_guild_setting(interaction.guild.id, 'mod_log_channel')
+            log_channel_id = await self.bot.db.get_guild_setting(interaction.guild.id, 'mod_log_channel')
             if log_channel_id:
                 log_channel = interaction.guild.get_channel(log_channel_id)
                 if log_channel:
@@ -176,16 +170,13 @@ class Moderation(commands.Cog):
             timeout_until = datetime.utcnow() + timedelta(minutes=duration)
             
             # Send DM to user before timing out
-            try:
-                dm_embed = discord.Embed(
-                    title="🔇 You have been timed out",
-                    description=f"**Server:** {interaction.guild.name}\n**Duration:** {duration} minutes\n**Reason:** {reason}",
-                    color=0xffa502,
-                    timestamp=datetime.utcnow()
-                )
-                await member.send(embed=dm_embed)
-            except:
-                pass  # User has DMs disabled
+            dm_embed = discord.Embed(
+                title="🔇 You have been timed out",
+                description=f"**Server:** {interaction.guild.name}\n**Duration:** {duration} minutes\n**Reason:** {reason}",
+                color=0xffa502,
+                timestamp=datetime.utcnow()
+            )
+            await self.bot.dm_dispatcher.deliver(member, {'embed': dm_embed})  # Skips users with DMs closed
             
             # Timeout the member
             await member.timeout(timeout_until, reason=f"Timed out by {interaction.user} | {reason}")
@@ -201,7 +192,7 @@ class Moderation(commands.Cog):
             await interaction.response.send_message(embed=embed)
             
             # Log to moderation channel if set
-            log_channel_id = self.bot.database.get_guild_setting(interaction.guild.id, 'mod_log_channel')
+            log_channel_id = await self.bot.db.get_guild_setting(interaction.guild.id, 'mod_log_channel')
             if log_channel_id:
                 log_channel = interaction.guild.get_channel(log_channel_id)
                 if log_channel:
@@ -228,7 +219,7 @@ class Moderation(commands.Cog):
                 return await interaction.response.send_message(embed=embed, ephemeral=True)
             
             # Add warning to database
-            warning_id = self.bot.database.add_warning(
+            warning_id = await self.bot.db.add_warning(
                 interaction.guild.id,
                 member.id,
                 interaction.user.id,
@@ -236,20 +227,16 @@ class Moderation(commands.Cog):
             )
             
             # Get total warnings for user
-            warnings = self.bot.database.get_user_warnings(interaction.guild.id, member.id)
-            warning_count = len(warnings)
+            warning_count = await self.bot.db.get_warning_count(interaction.guild.id, member.id)
             
-            # Send DM to user
-            try:
-                dm_embed = discord.Embed(
-                    title="⚠️ You have been warned",
-                    description=f"**Server:** {interaction.guild.name}\n**Reason:** {reason}\n**Total Warnings:** {warning_count}",
-                    color=0xff9f43,
-                    timestamp=datetime.utcnow()
-                )
-                await member.send(embed=dm_embed)
-            except:
-                pass  # User has DMs disabled
+            # Queue DM to user
+            dm_embed = discord.Embed(
+                title="⚠️ You have been warned",
+                description=f"**Server:** {interaction.guild.name}\n**Reason:** {reason}\n**Total Warnings:** {warning_count}",
+                color=0xff9f43,
+                timestamp=datetime.utcnow()
+            )
+            await self.bot.dm_queue.enqueue(interaction.guild.id, [member.id], dm_embed)
             
             # Create success embed
             embed = discord.Embed(
@@ -262,7 +249,7 @@ class Moderation(commands.Cog):
             await interaction.response.send_message(embed=embed)
             
             # Log to moderation channel if set
-            log_channel_id = self.bot.database.get_guild_setting(interaction.guild.id, 'mod_log_channel')
+            log_channel_id = await self.bot.db.get_guild_setting(interaction.guild.id, 'mod_log_channel')
             if log_channel_id:
                 log_channel = interaction.guild.get_channel(log_channel_id)
                 if log_channel:
@@ -285,7 +272,7 @@ class Moderation(commands.Cog):
                 )
                 return await interaction.response.send_message(embed=embed, ephemeral=True)
             
-            warnings = self.bot.database.get_user_warnings(interaction.guild.id, member.id)
+            warnings = await self.bot.db.get_user_warnings(interaction.guild.id, member.id)
             
             if not warnings:
                 embed = discord.Embed(
@@ -304,12 +291,12 @@ class Moderation(commands.Cog):
                 
                 # Add warning fields
                 for i, warning in enumerate(warnings[-10:], 1):  # Show last 10 warnings
-                    moderator = interaction.guild.get_member(warning['moderator_id'])
-                    mod_name = moderator.mention if moderator else f"<@{warning['moderator_id']}>"
+                    moderator = interaction.guild.get_member(warning.moderator_id)
+                    mod_name = moderator.mention if moderator else f"<@{warning.moderator_id}>"
                     
                     embed.add_field(
-                        name=f"Warning #{warning['id']}",
-                        value=f"**Reason:** {warning['reason']}\n**Moderator:** {mod_name}\n**Date:** <t:{int(warning['timestamp'])}:R>",
+                        name=f"Warning #{warning.id}",
+                        value=f"**Reason:** {warning.reason}\n**Moderator:** {mod_name}\n**Date:** <t:{warning.timestamp}:R>",
                         inline=False
                     )
             
@@ -8,6 +8,20 @@ class Settings(commands.Cog):
     
     def __init__(self, bot):
         self.bot = bot
+        bot.dm_queue.register_view('dm', self._build_dm_view)
+    
+    @staticmethod
+    def _build_dm_view(spec, embed):
+        """Rebuild the translation buttons for a queued DM"""
+        view = discord.ui.View(timeout=None)
+        language = spec['language']
+        if language != 'en':
+            view.add_item(TranslationButton('🇺🇸', 'en', 'English', spec['message'], spec['embed_title'], spec['color']))
+        if language != 'ar':
+            view.add_item(TranslationButton('🇸🇦', 'ar', 'العربية', spec['message'], spec['embed_title'], spec['color']))
+        if language != 'pt':
+            view.add_item(TranslationButton('🇧🇷', 'pt', 'Português', spec['message'], spec['embed_title'], spec['color']))
+        return view
     
     @app_commands.command(name="set_channel", description="Set channels for bot functions")
     @app_commands.describe(
@@ -30,8 +44,10 @@ class Settings(commands.Cog):
                 )
                 return await interaction.response.send_message(embed=embed, ephemeral=True)
             
-            # Set the channel in database
-            self.bot.database.set_guild_setting(interaction.guild.id, function.value, channel.id)
+            # Set the channel and read the log channel with one settings load and write
+            async with self.bot.db.transaction():
+                await self.bot.db.set_guild_setting(interaction.guild.id, function.value, channel.id)
+                activity_channel_id = await self.bot.db.get_guild_setting(interaction.guild.id, 'bot_activity_channel')
             
             # Create success embed
             embed = discord.Embed(
@@ -45,7 +61,6 @@ class Settings(commands.Cog):
             
             # Log in bot activity channel
             if function.value != 'bot_activity_channel':  # Avoid infinite loop
-                activity_channel_id = self.bot.database.get_guild_setting(interaction.guild.id, 'bot_activity_channel')
                 if activity_channel_id:
                     activity_channel = interaction.guild.get_channel(activity_channel_id)
                     if activity_channel:
@@ -79,8 +94,10 @@ class Settings(commands.Cog):
                 )
                 return await interaction.response.send_message(embed=embed, ephemeral=True)
             
-            # Set the language in database
-            self.bot.database.set_guild_setting(interaction.guild.id, 'language', language.value)
+            # Set the language and read the log channel with one settings load and write
+            async with self.bot.db.transaction():
+                await self.bot.db.set_guild_setting(interaction.guild.id, 'language', language.value)
+                activity_channel_id = await self.bot.db.get_guild_setting(interaction.guild.id, 'bot_activity_channel')
             
             # Create success embed in the selected language
             if language.value == 'ar':
@@ -108,7 +125,6 @@ class Settings(commands.Cog):
             await interaction.response.send_message(embed=embed)
             
             # Log in bot activity channel
-            activity_channel_id = self.bot.database.get_guild_setting(interaction.guild.id, 'bot_activity_channel')
             if activity_channel_id:
                 activity_channel = interaction.guild.get_channel(activity_channel_id)
                 if activity_channel:
@@ -124,6 +140,38 @@ class Settings(commands.Cog):
             embed = self.bot.embed_builder.create_error_embed(f"Failed to set language: {e}", interaction.user)
             await interaction.response.send_message(embed=embed, ephemeral=True)
     
+    @app_commands.command(name="set_retention", description="Set how long finished matches stay listed")
+    @app_commands.describe(
+        hours="Hours after a match starts before it is removed (1-720)",
+        archive="Keep removed matches in the match archive"
+    )
+    async def set_retention(self, interaction: discord.Interaction, hours: app_commands.Range[int, 1, 720], archive: bool = True):
+        """Set the server's match retention policy"""
+        try:
+            # Check permissions
+            if not interaction.user.guild_permissions.administrator:
+                embed = self.bot.embed_builder.create_error_embed(
+                    "You need administrator permissions to change match retention!",
+                    interaction.user
+                )
+                return await interaction.response.send_message(embed=embed, ephemeral=True)
+            
+            async with self.bot.db.transaction():
+                await self.bot.db.set_guild_setting(interaction.guild.id, 'match_retention_hours', hours)
+                await self.bot.db.set_guild_setting(interaction.guild.id, 'archive_expired_matches', archive)
+            
+            embed = discord.Embed(
+                title="✅ Match Retention Set",
+                description=f"**Remove after:** {hours} hours from start\n**Archive:** {'Yes' if archive else 'No'}",
+                color=0x4CAF50,
+                timestamp=datetime.utcnow()
+            )
+            await interaction.response.send_message(embed=embed)
+            
+        except Exception as e:
+            embed = self.bot.embed_builder.create_error_embed(f"Failed to set retention: {e}", interaction.user)
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+    
     @app_commands.command(name="settings", description="View current bot settings")
     async def settings(self, interaction: discord.Interaction):
         """Display current bot settings for the server"""
@@ -137,7 +185,7 @@ class Settings(commands.Cog):
                 return await interaction.response.send_message(embed=embed, ephemeral=True)
             
             # Get current settings
-            settings = self.bot.database.get_guild_settings(interaction.guild.id)
+            settings = await self.bot.db.get_guild_settings(interaction.guild.id)
             
             embed = discord.Embed(
                 title="⚙️ Bot Settings",
@@ -148,7 +196,7 @@ class Settings(commands.Cog):
             
             # Language setting
             language_names = {'en': 'English (GMT)', 'ar': 'العربية (Mecca Time)', 'pt': 'Português'}
-            current_lang = settings.get('language', 'en')
+            current_lang = settings.language
             embed.add_field(
                 name="🌐 Language",
                 value=language_names.get(current_lang, current_lang),
@@ -163,7 +211,7 @@ class Settings(commands.Cog):
             ]
             
             for setting_key, setting_name, emoji in channel_settings:
-                channel_id = settings.get(setting_key)
+                channel_id = getattr(settings, setting_key)
                 if channel_id:
                     channel = interaction.guild.get_channel(channel_id)
                     value = channel.mention if channel else "Channel not found"
@@ -176,8 +224,14 @@ class Settings(commands.Cog):
                     inline=True
                 )
             
+            embed.add_field(
+                name="🗄️ Match Retention",
+                value=f"{settings.match_retention_hours}h after start, {'archived' if settings.archive_expired_matches else 'not archived'}",
+                inline=True
+            )
+            
             # Statistics
-            matches_count = len(self.bot.database.get_guild_matches(interaction.guild.id))
+            matches_count = len(await self.bot.db.get_guild_matches(interaction.guild.id))
             embed.add_field(
                 name="📊 Statistics",
                 value=f"Active Matches: {matches_count}",
@@ -243,33 +297,17 @@ class Settings(commands.Cog):
                 )
             
             # Get server language for translation buttons
-            language = self.bot.database.get_guild_setting(interaction.guild.id, 'language', 'en')
-            
-            # Create view with translation buttons
-            view = discord.ui.View(timeout=None)
-            if language != 'en':
-                view.add_item(TranslationButton('🇺🇸', 'en', 'English', message, embed_title, color))
-            if language != 'ar':
-                view.add_item(TranslationButton('🇸🇦', 'ar', 'العربية', message, embed_title, color))
-            if language != 'pt':
-                view.add_item(TranslationButton('🇧🇷', 'pt', 'Português', message, embed_title, color))
+            language = await self.bot.db.get_guild_setting(interaction.guild.id, 'language', 'en')
             
-            # Send DM
-            try:
-                await user.send(embed=dm_embed, view=view)
-                success = True
-                error_msg = None
-            except discord.Forbidden:
-                success = False
-                error_msg = "User has DMs disabled"
-            except Exception as e:
-                success = False
-                error_msg = str(e)
+            # Queue DM with translation buttons
+            delivery = await self.bot.dm_queue.enqueue(
+                interaction.guild.id, [user.id], dm_embed,
+                view={'type': 'dm', 'language': language, 'message': message, 'embed_title': embed_title, 'color': color}
+            )
             
-            # Create response embed
-            if success:
+            if delivery.queued:
                 response_embed = discord.Embed(
-                    title="✅ Message Sent",
+                    title="📨 Message Queued",
                     description=f"**Recipient:** {user.mention}\n**Message:** {message[:100]}{'...' if len(message) > 100 else ''}",
                     color=0x4CAF50,
                     timestamp=datetime.utcnow()
@@ -277,7 +315,7 @@ class Settings(commands.Cog):
             else:
                 response_embed = discord.Embed(
                     title="❌ Message Failed",
-                    description=f"**Recipient:** {user.mention}\n**Error:** {error_msg}",
+                    description=f"**Recipient:** {user.mention}\n**Error:** User has DMs disabled (unreachable)",
                     color=0xf44336,
                     timestamp=datetime.utcnow()
                 )
@@ -285,11 +323,11 @@ class Settings(commands.Cog):
             await interaction.response.send_message(embed=response_embed)
             
             # Log in bot activity channel
-            activity_channel_id = self.bot.database.get_guild_setting(interaction.guild.id, 'bot_activity_channel')
+            activity_channel_id = await self.bot.db.get_guild_setting(interaction.guild.id, 'bot_activity_channel')
             if activity_channel_id:
                 activity_channel = interaction.guild.get_channel(activity_channel_id)
                 if activity_channel:
-                    status = "✅ Sent" if success else "❌ Failed"
+                    status = "📨 Queued" if delivery.queued else "❌ Unreachable"
                     log_embed = discord.Embed(
                         title="🤖 Bot Activity",
                         description=f"DM {status}: {interaction.user.mention} → {user.mention}",
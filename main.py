@@ -1,16 +1,25 @@
 import discord
-from discord.ext import commands, tasks
+from discord.ext import commands
 import asyncio
 import os
-import json
-from datetime import datetime, timedelta
-import pytz
-from typing import Dict, Any
+import time
 
 # Import our custom modules
-from utils.database import Database
+from utils.database import create_database
+from utils.async_database import AsyncDatabase
 from utils.translations import Translations
 from utils.embeds import EmbedBuilder
+from utils.dm_cache import ClosedDMCache
+from utils.dm_dispatcher import DMDispatcher
+from utils.dm_queue import DMQueue
+from utils.translation_buttons import MatchTranslationButton, build_translation_view
+from utils.reminders import ReminderScheduler, REMINDER_KINDS
+from utils.match_index import MatchIndex
+from utils.participants import ParticipantResolver
+from utils.match_archive import MatchArchive
+from utils.retention import RetentionEngine
+from utils.standings import Standings
+from utils.series import SeriesScheduler
 from keep_alive import keep_alive
 
 # Define bot intents
@@ -26,9 +35,41 @@ class DiscordBot(commands.Bot):
             intents=intents,
             help_command=None
         )
-        self.database = Database()
+        self.database = create_database()
+        self.db = AsyncDatabase(self.database)
         self.translations = Translations()
         self.embed_builder = EmbedBuilder()
+        self.closed_dms = ClosedDMCache()
+        self.dm_dispatcher = DMDispatcher(
+            concurrency=int(os.getenv('DM_CONCURRENCY', '5')),
+            closed_cache=self.closed_dms
+        )
+        self.dm_queue = DMQueue(self, self.dm_dispatcher, workers=int(os.getenv('DM_QUEUE_WORKERS', '4')))
+        self.match_index = MatchIndex(default_duration=int(os.getenv('MATCH_DURATION_MINUTES', '60')) * 60)
+        self.participants = ParticipantResolver(
+            ttl=int(os.getenv('ROLE_CACHE_TTL', '60')),
+            max_participants=int(os.getenv('MATCH_MAX_PARTICIPANTS', '500'))
+        )
+        self.match_archive = MatchArchive()
+        self.series = SeriesScheduler(self.db, lookahead=int(os.getenv('SERIES_LOOKAHEAD', '1')))
+        self.standings = Standings(
+            self.db,
+            initial_rating=float(os.getenv('RATING_INITIAL', '1500')),
+            k_factor=float(os.getenv('RATING_K_FACTOR', '32'))
+        )
+        self.retention = RetentionEngine(
+            self.db,
+            self.match_index,
+            self.match_archive,
+            interval=int(os.getenv('RETENTION_INTERVAL_SECONDS', '300')),
+            time_budget_ms=int(os.getenv('RETENTION_TIME_BUDGET_MS', '200')),
+            batch_size=int(os.getenv('RETENTION_BATCH_SIZE', '500'))
+        )
+        self.reminders = ReminderScheduler(
+            self.handle_match_deadline,
+            self.db,
+            catch_up=os.getenv('REMINDER_CATCH_UP', 'skip_started')
+        )
         
     async def setup_hook(self):
         """Load all cogs and start background tasks"""
@@ -41,8 +82,27 @@ class DiscordBot(commands.Bot):
             except Exception as e:
                 print(f"Failed to load {cog}: {e}")
         
-        # Start background tasks
-        self.match_reminder_task.start()
+        # Translation buttons on match DMs are stateless and survive restarts
+        self.add_dynamic_items(MatchTranslationButton)
+        
+        # Start delivering queued DMs (including any left over from a restart)
+        self.dm_queue.register_view('match', lambda spec, embed: build_translation_view(
+            spec['kind'], spec['guild_id'], spec['match_id'], spec['language'], spec.get('minutes'), spec.get('start')
+        ))
+        await self.dm_queue.start()
+        
+        # Build the match index and start the reminder scheduler, retention sweep and
+        # recurring series from what is already stored
+        self.db.add_match_listener(self.match_index)
+        self.db.add_match_listener(self.reminders)
+        self.db.add_match_listener(self.embed_builder)
+        self.db.add_match_listener(self.series)
+        await self.match_index.load(self.db)
+        await self.reminders.load()
+        await self.series.load()
+        self.reminders.start()
+        self.retention.start()
+        self.series.start()
         
         # Sync slash commands
         try:
@@ -51,6 +111,16 @@ class DiscordBot(commands.Bot):
         except Exception as e:
             print(f"Failed to sync commands: {e}")
     
+    async def close(self):
+        """Flush pending database writes before shutting down"""
+        self.reminders.stop()
+        self.retention.stop()
+        self.series.stop()
+        await self.dm_queue.stop()
+        await self.closed_dms.close()
+        await super().close()
+        await self.db.close()
+    
     async def on_ready(self):
         """Bot ready event"""
         print(f'{self.user} has connected to Discord!')
@@ -66,111 +136,58 @@ class DiscordBot(commands.Bot):
     
     async def on_guild_join(self, guild):
         """Initialize settings when joining a new guild"""
-        self.database.initialize_guild(guild.id)
+        await self.db.initialize_guild(guild.id)
         print(f"Joined new guild: {guild.name} ({guild.id})")
     
-    @tasks.loop(minutes=1)
-    async def match_reminder_task(self):
-        """Check for matches that need reminders"""
-        try:
-            current_time = datetime.now(pytz.UTC)
-            matches = self.database.get_all_matches()
-            
-            for guild_id, guild_matches in matches.items():
-                guild = self.get_guild(int(guild_id))
-                if not guild:
-                    continue
-                
-                for match_id, match_data in list(guild_matches.items()):
-                    match_time = datetime.fromisoformat(match_data['time'])
-                    time_diff = match_time - current_time
-                    
-                    # 10 minute reminder
-                    if 9 <= time_diff.total_seconds() / 60 <= 11 and not match_data.get('reminded_10', False):
-                        await self.send_match_reminder(guild, match_data, 10)
-                        match_data['reminded_10'] = True
-                        self.database.update_match(guild_id, match_id, match_data)
-                    
-                    # 3 minute reminder
-                    elif 2 <= time_diff.total_seconds() / 60 <= 4 and not match_data.get('reminded_3', False):
-                        await self.send_match_reminder(guild, match_data, 3)
-                        match_data['reminded_3'] = True
-                        self.database.update_match(guild_id, match_id, match_data)
-                    
-                    # Remove expired matches
-                    elif time_diff.total_seconds() < -3600:  # 1 hour after match time
-                        self.database.remove_match(guild_id, match_id)
-                        
-        except Exception as e:
-            print(f"Error in match reminder task: {e}")
+    async def on_member_update(self, before, after):
+        """Drop cached memberships of roles a member gained or lost"""
+        if before.roles != after.roles:
+            changed = set(before.roles).symmetric_difference(after.roles)
+            self.participants.invalidate(after.guild.id, [role.id for role in changed])
+    
+    async def on_guild_role_delete(self, role):
+        self.participants.invalidate(role.guild.id, [role.id])
+    
+    async def handle_match_deadline(self, guild_id, match_id, kind):
+        """Send a due reminder.
+        
+        The scheduler records the reminder flag once the whole pass is done.
+        """
+        guild = self.get_guild(guild_id)
+        if not guild:
+            return
+        
+        match_data = await self.db.get_match(guild_id, match_id)
+        if not match_data:
+            return
+        
+        if getattr(match_data, REMINDER_KINDS[kind]['flag']):
+            return
+        
+        # Reminders recovered after a restart may be late, so report the real lead time
+        seconds_left = match_data.start - time.time()
+        await self.send_match_reminder(guild, match_id, match_data, max(0, round(seconds_left / 60)))
     
-    async def send_match_reminder(self, guild, match_data, minutes):
+    async def send_match_reminder(self, guild, match_id, match_data, minutes):
         """Send reminder to match participants"""
         try:
-            language = self.database.get_guild_setting(guild.id, 'language', 'en')
+            language = await self.db.get_guild_setting(guild.id, 'language', 'en')
             
             # Create reminder embed
-            embed = self.embed_builder.create_match_reminder_embed(match_data, minutes, language)
+            embed = self.embed_builder.render_match_embed('reminder', guild.id, match_id, match_data, language, minutes)
             
-            # Send to participants
-            for user_id in match_data['participants']:
-                try:
-                    user = guild.get_member(user_id)
-                    if user:
-                        view = TranslationView(match_data, language)
-                        await user.send(embed=embed, view=view)
-                except Exception as e:
-                    print(f"Failed to send reminder to user {user_id}: {e}")
+            # Queue for participants
+            delivery = await self.dm_queue.enqueue(
+                guild.id, self.participants.resolve(guild, match_data), embed,
+                view={'type': 'match', 'kind': 'r', 'guild_id': guild.id, 'match_id': match_id, 'language': language, 'minutes': minutes, 'start': match_data.start},
+                not_after=match_data.start
+            )
+            print(f"Match reminder ({minutes} min): {delivery.summary()}")
+            return delivery
                     
         except Exception as e:
             print(f"Error sending match reminder: {e}")
 
-class TranslationView(discord.ui.View):
-    """View with translation buttons for DMs"""
-    
-    def __init__(self, match_data, current_language):
-        super().__init__(timeout=None)
-        self.match_data = match_data
-        self.current_language = current_language
-        
-        # Add translation buttons
-        if current_language != 'en':
-            self.add_item(TranslationButton('🇺🇸', 'en', 'English'))
-        if current_language != 'ar':
-            self.add_item(TranslationButton('🇸🇦', 'ar', 'العربية'))
-        if current_language != 'pt':
-            self.add_item(TranslationButton('🇧🇷', 'pt', 'Português'))
-
-class TranslationButton(discord.ui.Button):
-    """Button for translating messages"""
-    
-    def __init__(self, emoji, language, label):
-        super().__init__(emoji=emoji, label=label, style=discord.ButtonStyle.secondary)
-        self.language = language
-        
-    async def callback(self, interaction: discord.Interaction):
-        """Show translation as a separate message without deleting original"""
-        try:
-            bot = interaction.client
-            embed_builder = bot.embed_builder
-            
-            # Get match data from view
-            view = self.view
-            match_data = view.match_data
-            
-            # Create new embed in selected language
-            embed = embed_builder.create_match_reminder_embed(match_data, 0, self.language)
-            
-            # Add translation indicator to title
-            if embed.title:
-                embed.title = f"[{self.label}] {embed.title}"
-            
-            # Send as follow-up message instead of editing original
-            await interaction.response.send_message(embed=embed, ephemeral=True)
-            
-        except Exception as e:
-            await interaction.response.send_message(f"Translation error: {e}", ephemeral=True)
-
 # Initialize and run the bot
 async def main():
     # Start keep-alive server
@@ -0,0 +1,325 @@
+import asyncio
+import contextvars
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Dict, Any, AsyncIterator, List, Optional, Tuple
+
+from utils.records import Match, MatchSeries, MemberWarning, GuildSettings, Standing
+
+
+class _Transaction:
+    """State of one open ``AsyncDatabase.transaction()``"""
+    
+    def __init__(self, database):
+        self.database = database
+        self.deferred = []  # Listener calls to make once it commits
+        self.open = True
+
+
+# Tasks started inside a transaction inherit this and join it while it is open
+_current_transaction = contextvars.ContextVar('database_transaction', default=None)
+
+
+class CallTimings:
+    """Running queue-wait and execution timings for one database method"""
+    
+    def __init__(self):
+        self.calls = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.total_exec = 0.0
+        self.max_exec = 0.0
+    
+    def record(self, wait: float, execution: float):
+        self.calls += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+        self.total_exec += execution
+        self.max_exec = max(self.max_exec, execution)
+    
+    def to_dict(self) -> dict:
+        """Timings in milliseconds"""
+        return {
+            'calls': self.calls,
+            'avg_wait_ms': self.total_wait / self.calls * 1000 if self.calls else 0.0,
+            'max_wait_ms': self.max_wait * 1000,
+            'avg_exec_ms': self.total_exec / self.calls * 1000 if self.calls else 0.0,
+            'max_exec_ms': self.max_exec * 1000
+        }
+
+
+class AsyncDatabase:
+    """Async facade that keeps blocking storage work off the event loop.
+    
+    Mutations run one at a time, in submission order, on a dedicated writer
+    thread. Reads run concurrently on a small reader pool. Every call records
+    how long it waited in its queue and how long the storage call itself took;
+    see ``get_timings()``.
+    
+    ``async with db.transaction():`` runs the calls made inside the block as
+    one ``database.batch()`` on the writer thread. Other tasks' writes wait
+    until the transaction ends (tasks started inside the block join it),
+    reads inside it see its own changes, and match listeners are only
+    notified once it commits.
+    
+    Guild settings are cached per guild on the event loop, so repeated
+    lookups (several per moderation action) don't leave it. A guild's entry
+    is dropped whenever one of its settings is set, or when the transaction
+    that set it commits. The cached ``GuildSettings`` are shared and must
+    not be mutated.
+    """
+    
+    def __init__(self, database, read_workers: int = 4):
+        self.database = database
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-writer")
+        self._readers = ThreadPoolExecutor(max_workers=read_workers, thread_name_prefix="db-reader")
+        self._timings: Dict[str, CallTimings] = {}
+        self._timings_lock = threading.Lock()
+        self._match_listeners = []
+        self._transaction_lock = asyncio.Lock()
+        self._settings: Dict[int, GuildSettings] = {}
+        # Bumped on every invalidation so a load that started earlier isn't cached
+        self._settings_generation: Dict[int, int] = {}
+    
+    async def _submit(self, executor: ThreadPoolExecutor, method: str, *args, **kwargs):
+        """Run ``database.<method>`` on the given executor and record its timings"""
+        submitted = time.perf_counter()
+        
+        def call():
+            started = time.perf_counter()
+            try:
+                return getattr(self.database, method)(*args, **kwargs)
+            finally:
+                finished = time.perf_counter()
+                with self._timings_lock:
+                    self._timings.setdefault(method, CallTimings()).record(started - submitted, finished - started)
+        
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, call)
+    
+    def _transaction(self) -> Optional[_Transaction]:
+        """The open transaction the calling task belongs to, if any"""
+        transaction = _current_transaction.get()
+        if transaction is not None and transaction.database is self and transaction.open:
+            return transaction
+        return None
+    
+    async def _read(self, method: str, *args, **kwargs):
+        if self._transaction() is not None:
+            # Uncommitted changes are only visible on the writer thread
+            return await self._submit(self._writer, method, *args, **kwargs)
+        return await self._submit(self._readers, method, *args, **kwargs)
+    
+    async def _write(self, method: str, *args, **kwargs):
+        if self._transaction() is not None:
+            return await self._submit(self._writer, method, *args, **kwargs)
+        async with self._transaction_lock:
+            return await self._submit(self._writer, method, *args, **kwargs)
+    
+    @asynccontextmanager
+    async def transaction(self):
+        """Group every call in the block into a single commit, rolled back if it raises"""
+        if self._transaction() is not None:
+            yield self
+            return
+        
+        loop = asyncio.get_running_loop()
+        async with self._transaction_lock:
+            batch = self.database.batch()
+            await loop.run_in_executor(self._writer, batch.__enter__)
+            transaction = _Transaction(self)
+            token = _current_transaction.set(transaction)
+            try:
+                yield self
+            except BaseException as e:
+                transaction.open = False
+                _current_transaction.reset(token)
+                await loop.run_in_executor(self._writer, batch.__exit__, type(e), e, e.__traceback__)
+                raise
+            transaction.open = False
+            _current_transaction.reset(token)
+            await loop.run_in_executor(self._writer, batch.__exit__, None, None, None)
+        
+        for notify in transaction.deferred:
+            notify()
+    
+    def add_match_listener(self, listener):
+        """Register an object with ``on_match_saved``/``on_match_removed`` hooks.
+        
+        Hooks run on the event loop once the write has been applied.
+        """
+        self._match_listeners.append(listener)
+    
+    def _match_saved(self, guild_id: int, match_id: str, match: Match):
+        transaction = self._transaction()
+        if transaction is not None:
+            transaction.deferred.append(lambda: self._match_saved_now(guild_id, match_id, match))
+        else:
+            self._match_saved_now(guild_id, match_id, match)
+    
+    def _match_saved_now(self, guild_id: int, match_id: str, match: Match):
+        for listener in self._match_listeners:
+            listener.on_match_saved(int(guild_id), match_id, match)
+    
+    def _match_removed(self, guild_id: int, match_id: str):
+        transaction = self._transaction()
+        if transaction is not None:
+            transaction.deferred.append(lambda: self._match_removed_now(guild_id, match_id))
+        else:
+            self._match_removed_now(guild_id, match_id)
+    
+    def _match_removed_now(self, guild_id: int, match_id: str):
+        for listener in self._match_listeners:
+            listener.on_match_removed(int(guild_id), match_id)
+    
+    def get_timings(self) -> Dict[str, dict]:
+        """Per-method call counts and queue-wait/execution times in milliseconds"""
+        with self._timings_lock:
+            return {method: timings.to_dict() for method, timings in self._timings.items()}
+    
+    def get_total_timings(self) -> dict:
+        """Queue-wait/execution times across every method"""
+        total = CallTimings()
+        with self._timings_lock:
+            for timings in self._timings.values():
+                total.calls += timings.calls
+                total.total_wait += timings.total_wait
+                total.max_wait = max(total.max_wait, timings.max_wait)
+                total.total_exec += timings.total_exec
+                total.max_exec = max(total.max_exec, timings.max_exec)
+        return total.to_dict()
+    
+    async def close(self):
+        """Drain the writer queue and close the underlying database"""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self._writer.shutdown)
+        self._readers.shutdown(wait=False)
+        self.database.close()
+    
+    # Match Management
+    async def create_match(self, guild_id: int, match: Match) -> str:
+        match_id = await self._write('create_match', guild_id, match)
+        self._match_saved(guild_id, match_id, match)
+        return match_id
+    
+    async def get_guild_matches(self, guild_id: int) -> Dict[str, Match]:
+        return await self._read('get_guild_matches', guild_id)
+    
+    async def get_match(self, guild_id: int, match_id: str) -> Optional[Match]:
+        return await self._read('get_match', guild_id, match_id)
+    
+    async def iter_all_matches(self, until: Optional[datetime] = None) -> AsyncIterator[Tuple[str, Dict[str, Match]]]:
+        """Yield ``(guild_id, matches)`` one guild at a time, loading each on a reader thread"""
+        guilds = await self._read('get_all_matches', until)
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await loop.run_in_executor(self._readers, next, guilds, None)
+            if item is None:
+                return
+            yield item
+    
+    async def update_match(self, guild_id: int, match_id: str, match: Match):
+        await self._write('update_match', guild_id, match_id, match)
+        self._match_saved(guild_id, match_id, match)
+    
+    async def set_match_fields(self, updates: List[tuple]):
+        # Listeners get the updated matches, so indexes and schedules see the new fields
+        for guild_id, match_id, match in await self._write('set_match_fields', updates):
+            self._match_saved(guild_id, match_id, match)
+    
+    async def remove_match(self, guild_id: int, match_id: str):
+        await self._write('remove_match', guild_id, match_id)
+        self._match_removed(guild_id, match_id)
+    
+    async def remove_matches(self, items: List[Tuple[int, str]]):
+        await self._write('remove_matches', items)
+        for guild_id, match_id in items:
+            self._match_removed(guild_id, match_id)
+    
+    # Recurring Match Series
+    async def create_series(self, guild_id: int, series: MatchSeries) -> str:
+        return await self._write('create_series', guild_id, series)
+    
+    async def iter_all_series(self) -> AsyncIterator[Tuple[str, Dict[str, MatchSeries]]]:
+        """Yield ``(guild_id, series)`` one guild at a time, loading each on a reader thread"""
+        guilds = await self._read('get_all_series')
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await loop.run_in_executor(self._readers, next, guilds, None)
+            if item is None:
+                return
+            yield item
+    
+    async def update_series(self, guild_id: int, series_id: str, series: MatchSeries):
+        await self._write('update_series', guild_id, series_id, series)
+    
+    async def remove_series(self, guild_id: int, series_id: str):
+        await self._write('remove_series', guild_id, series_id)
+    
+    # Guild Settings
+    def _invalidate_settings(self, guild_id: int):
+        self._settings.pop(guild_id, None)
+        self._settings_generation[guild_id] = self._settings_generation.get(guild_id, 0) + 1
+    
+    def _settings_changed(self, guild_id: int):
+        self._invalidate_settings(guild_id)
+        transaction = self._transaction()
+        if transaction is not None:
+            # Others may cache the committed value until this transaction lands
+            transaction.deferred.append(lambda: self._invalidate_settings(guild_id))
+    
+    async def initialize_guild(self, guild_id: int):
+        try:
+            return await self._write('initialize_guild', guild_id)
+        finally:
+            self._settings_changed(int(guild_id))
+    
+    async def get_guild_settings(self, guild_id: int) -> GuildSettings:
+        guild_id = int(guild_id)
+        if self._transaction() is not None:
+            # Must see the transaction's own uncommitted changes
+            return await self._read('get_guild_settings', guild_id)
+        
+        settings = self._settings.get(guild_id)
+        if settings is None:
+            generation = self._settings_generation.get(guild_id, 0)
+            settings = await self._read('get_guild_settings', guild_id)
+            if self._settings_generation.get(guild_id, 0) == generation:
+                self._settings[guild_id] = settings
+        return settings
+    
+    async def get_guild_setting(self, guild_id: int, key: str, default=None):
+        return (await self.get_guild_settings(guild_id)).get(key, default)
+    
+    async def set_guild_setting(self, guild_id: int, key: str, value):
+        try:
+            return await self._write('set_guild_setting', guild_id, key, value)
+        finally:
+            self._settings_changed(int(guild_id))
+    
+    # Standings
+    async def get_guild_standings(self, guild_id: int) -> Dict[str, Dict[Any, Standing]]:
+        return await self._read('get_guild_standings', guild_id)
+    
+    async def save_standings(self, guild_id: int, players: Dict[int, Standing], teams: Dict[str, Standing]):
+        return await self._write('save_standings', guild_id, players, teams)
+    
+    # Warning System
+    async def add_warning(self, guild_id: int, user_id: int, moderator_id: int, reason: str) -> str:
+        return await self._write('add_warning', guild_id, user_id, moderator_id, reason)
+    
+    async def get_user_warnings(self, guild_id: int, user_id: int) -> List[MemberWarning]:
+        return await self._read('get_user_warnings', guild_id, user_id)
+    
+    async def get_warning_count(self, guild_id: int, user_id: int) -> int:
+        return await self._read('get_warning_count', guild_id, user_id)
+    
+    async def remove_warning(self, guild_id: int, user_id: int, warning_id: str):
+        return await self._write('remove_warning', guild_id, user_id, warning_id)
+    
+    # Utility Methods
+    async def get_stats(self) -> Dict[str, Any]:
+        return await self._read('get_stats')
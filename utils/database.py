@@ -1,33 +1,155 @@
+import copy
 import json
 import os
+import sqlite3
+import threading
+import time
 from datetime import datetime
-from typing import Dict, Any, List
+from typing import Dict, Any, Iterator, List, Optional, Tuple
 import uuid
+from contextlib import contextmanager
+
+from utils.records import Match, MatchSeries, MemberWarning, GuildSettings, Standing
+from utils.warning_journal import WarningJournal
+
 
 class Database:
-    """Simple JSON-based database for bot data"""
+    """Simple JSON-based database for bot data.
+    
+    Each store is sharded into one file per guild (``data/<store>/<guild_id>.json``)
+    so a mutation only rewrites the owning guild's file. Files are replaced
+    atomically. Monolithic ``data/<store>.json`` files from older versions are
+    split into shards the first time the database starts.
+    
+    Warnings are kept in memory by a ``WarningJournal``: adds and removals
+    are appended to ``data/warnings/journal.log`` and folded back into the
+    per-guild files by its background compactor.
+    
+    ``with db.batch():`` groups several mutations: each file is loaded once,
+    every change is applied to that working copy and each touched file is
+    written once when the block exits. An exception discards the changes.
+    Warning mutations are journaled immediately and are not part of a batch.
+    
+    Stores hold records (``Match``, ``MatchSeries``, ``GuildSettings``,
+    ``Standing``); they are converted to and from their dict form only when
+    a file is read or written.
+    
+    ``get_stats`` counts every match shard once and then keeps a running
+    per-guild match count as shards are saved.
+    """
+    
+    STORES = ('matches', 'series', 'settings', 'warnings', 'standings')
     
-    def __init__(self):
-        self.data_dir = "data"
-        self.matches_file = os.path.join(self.data_dir, "matches.json")
-        self.settings_file = os.path.join(self.data_dir, "settings.json")
-        self.warnings_file = os.path.join(self.data_dir, "warnings.json")
+    def __init__(self, data_dir: str = "data", warnings_compact_bytes: int = 1024 * 1024,
+                 warnings_fsync_interval_ms: int = 1000):
+        self.data_dir = data_dir
+        self.store_dirs = {store: os.path.join(self.data_dir, store) for store in self.STORES}
         
-        # Ensure data directory exists
-        os.makedirs(self.data_dir, exist_ok=True)
+        # Ensure store directories exist
+        for store_dir in self.store_dirs.values():
+            os.makedirs(store_dir, exist_ok=True)
         
-        # Initialize data files
-        self._init_file(self.matches_file, {})
-        self._init_file(self.settings_file, {})
-        self._init_file(self.warnings_file, {})
+        # Open batch per thread: {'stores': {filepath: data}, 'dirty': set(filepaths)}
+        self._batch_local = threading.local()
+        
+        # Matches per guild, counted on the first get_stats call
+        self._match_counts: Optional[Dict[str, int]] = None
+        self._counts_lock = threading.Lock()
+        
+        self._migrate_monolithic_files()
+        self.warnings = WarningJournal(
+            self.store_dirs['warnings'],
+            compact_bytes=warnings_compact_bytes,
+            fsync_interval_ms=warnings_fsync_interval_ms
+        )
+    
+    def _migrate_monolithic_files(self):
+        """Split legacy data/<store>.json files into per-guild shards"""
+        for store in self.STORES:
+            legacy_file = os.path.join(self.data_dir, f"{store}.json")
+            if not os.path.exists(legacy_file):
+                continue
+            
+            for guild_str, guild_data in self._read_file(legacy_file).items():
+                guild_file = self._guild_file(store, guild_str)
+                if not os.path.exists(guild_file):
+                    self._write_atomic(guild_file, guild_data)
+            
+            os.replace(legacy_file, f"{legacy_file}.migrated")
+            print(f"Migrated {legacy_file} to per-guild files in {self.store_dirs[store]}")
     
-    def _init_file(self, filepath: str, default_data: dict):
-        """Initialize a JSON file if it doesn't exist"""
-        if not os.path.exists(filepath):
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(default_data, f, indent=2, ensure_ascii=False)
+    def _guild_file(self, store: str, guild_id) -> str:
+        """Path of one guild's shard of a store"""
+        return os.path.join(self.store_dirs[store], f"{guild_id}.json")
+    
+    def _guild_ids(self, store: str) -> List[str]:
+        """Guild IDs that have a shard in a store"""
+        return [
+            filename[:-len(".json")]
+            for filename in os.listdir(self.store_dirs[store])
+            if filename.endswith(".json")
+        ]
+    
+    def _decode(self, filepath: str, data: Optional[dict]):
+        """Records for a file's JSON: ``{match_id: Match}``, ``{series_id: MatchSeries}``,
+        ``GuildSettings`` (None if unset) or ``{'players': {user_id: Standing}, 'teams': {team_key: Standing}}``
+        """
+        store = os.path.basename(os.path.dirname(filepath))
+        if store == 'matches':
+            return {match_id: Match.from_dict(match) for match_id, match in (data or {}).items()}
+        if store == 'series':
+            return {series_id: MatchSeries.from_dict(series) for series_id, series in (data or {}).items()}
+        if store == 'settings':
+            return GuildSettings.from_dict(data) if data else None
+        if store == 'standings':
+            data = data or {}
+            return {
+                'players': {int(user_id): Standing.from_dict(standing) for user_id, standing in data.get('players', {}).items()},
+                'teams': {team_key: Standing.from_dict(standing) for team_key, standing in data.get('teams', {}).items()}
+            }
+        return data or {}
     
-    def _load_json(self, filepath: str) -> dict:
+    def _encode(self, filepath: str, data) -> dict:
+        """JSON form of a store's records"""
+        store = os.path.basename(os.path.dirname(filepath))
+        if store in ('matches', 'series'):
+            return {record_id: record.to_dict() for record_id, record in data.items()}
+        if store == 'settings':
+            return data.to_dict()
+        if store == 'standings':
+            return {
+                kind: {str(key): standing.to_dict() for key, standing in standings.items()}
+                for kind, standings in data.items()
+            }
+        return data
+    
+    def _load_json(self, filepath: str):
+        """Load JSON data, from the open batch's working copy if there is one"""
+        batch = getattr(self._batch_local, 'batch', None)
+        if batch is None:
+            return self._read_store(filepath)
+        
+        if filepath not in batch['stores']:
+            batch['stores'][filepath] = self._read_store_copy(filepath)
+        return batch['stores'][filepath]
+    
+    def _save_json(self, filepath: str, data):
+        """Save JSON data, deferring the write to the end of the open batch"""
+        batch = getattr(self._batch_local, 'batch', None)
+        if batch is None:
+            self._write_store(filepath, data)
+            self._count_matches(filepath, data)
+            return
+        
+        batch['stores'][filepath] = data
+        batch['dirty'].add(filepath)
+    
+    def _read_store(self, filepath: str):
+        """Load a store's records from file"""
+        return self._decode(filepath, self._read_file(filepath))
+    
+    @staticmethod
+    def _read_file(filepath: str) -> dict:
         """Load JSON data from file"""
         try:
             with open(filepath, 'r', encoding='utf-8') as f:
@@ -35,82 +157,205 @@ class Database:
         except (FileNotFoundError, json.JSONDecodeError):
             return {}
     
-    def _save_json(self, filepath: str, data: dict):
-        """Save JSON data to file"""
+    def _read_store_copy(self, filepath: str):
+        """Load a private copy of a file for a batch to mutate"""
+        return self._read_store(filepath)
+    
+    def _write_store(self, filepath: str, data):
+        """Save a store's records to file"""
         try:
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
+            # Replace atomically so concurrent readers never see a partial file
+            self._write_atomic(filepath, self._encode(filepath, data))
         except Exception as e:
             print(f"Error saving to {filepath}: {e}")
     
+    def _write_atomic(self, filepath: str, data: dict):
+        """Write JSON data to a temp file and rename it over the target"""
+        self._write_text_atomic(filepath, json.dumps(data, indent=2, ensure_ascii=False))
+    
+    @staticmethod
+    def _write_text_atomic(filepath: str, text: str):
+        """Write already serialised JSON to a temp file and rename it over the target"""
+        tmp_path = f"{filepath}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, filepath)
+    
+    def close(self):
+        """Sync and close the warnings journal"""
+        self.warnings.close()
+    
+    @contextmanager
+    def batch(self):
+        """Apply every mutation in the block with one write per touched file.
+        
+        Batches are per thread and nest; only the outermost one commits.
+        If the block raises, nothing it changed is written.
+        """
+        if getattr(self._batch_local, 'batch', None) is not None:
+            yield self
+            return
+        
+        batch = {'stores': {}, 'dirty': set()}
+        self._batch_local.batch = batch
+        try:
+            yield self
+        finally:
+            self._batch_local.batch = None
+        
+        # Only reached when the block didn't raise
+        self._commit_batch(batch)
+    
+    def _commit_batch(self, batch: dict):
+        """Write every file changed in a batch"""
+        for filepath in batch['dirty']:
+            self._write_store(filepath, batch['stores'][filepath])
+            self._count_matches(filepath, batch['stores'][filepath])
+    
+    def _count_matches(self, filepath: str, data):
+        """Keep the running match count current when a matches shard is saved"""
+        if os.path.dirname(filepath) != self.store_dirs['matches']:
+            return
+        with self._counts_lock:
+            if self._match_counts is not None:
+                self._match_counts[os.path.basename(filepath)[:-len(".json")]] = len(data)
+    
     # Match Management
-    def create_match(self, guild_id: int, match_data: dict) -> str:
+    def create_match(self, guild_id: int, match: Match) -> str:
         """Create a new match and return its ID"""
-        matches = self._load_json(self.matches_file)
-        guild_str = str(guild_id)
-        
-        if guild_str not in matches:
-            matches[guild_str] = {}
+        guild_file = self._guild_file('matches', guild_id)
+        matches = self._load_json(guild_file)
         
         match_id = str(uuid.uuid4())[:8]  # Short UUID
-        matches[guild_str][match_id] = match_data
+        matches[match_id] = match
         
-        self._save_json(self.matches_file, matches)
+        self._save_json(guild_file, matches)
         return match_id
     
-    def get_guild_matches(self, guild_id: int) -> dict:
+    def get_guild_matches(self, guild_id: int) -> Dict[str, Match]:
         """Get all matches for a guild"""
-        matches = self._load_json(self.matches_file)
-        return matches.get(str(guild_id), {})
+        return self._load_json(self._guild_file('matches', guild_id))
+    
+    def get_match(self, guild_id: int, match_id: str) -> Optional[Match]:
+        """Get a single match, or None if it no longer exists"""
+        return self.get_guild_matches(guild_id).get(match_id)
     
-    def get_all_matches(self) -> dict:
-        """Get all matches across all guilds"""
-        return self._load_json(self.matches_file)
+    def get_all_matches(self, until: Optional[datetime] = None) -> Iterator[Tuple[str, Dict[str, Match]]]:
+        """Lazily yield ``(guild_id, matches)`` for every guild, one shard at a time.
+        
+        With ``until`` only matches starting at or before that time are included.
+        """
+        cutoff = until.timestamp() if until is not None else None
+        for guild_str in self._guild_ids('matches'):
+            matches = self.get_guild_matches(guild_str)
+            if cutoff is not None:
+                matches = {match_id: match for match_id, match in matches.items() if match.start <= cutoff}
+            if matches:
+                yield guild_str, matches
     
-    def update_match(self, guild_id: int, match_id: str, match_data: dict):
+    def update_match(self, guild_id: int, match_id: str, match: Match):
         """Update match data"""
-        matches = self._load_json(self.matches_file)
-        guild_str = str(guild_id)
+        guild_file = self._guild_file('matches', guild_id)
+        matches = self._load_json(guild_file)
         
-        if guild_str in matches and match_id in matches[guild_str]:
-            matches[guild_str][match_id] = match_data
-            self._save_json(self.matches_file, matches)
+        if match_id in matches:
+            matches[match_id] = match
+            self._save_json(guild_file, matches)
+    
+    def set_match_fields(self, updates: List[tuple]) -> List[Tuple[str, str, Match]]:
+        """Merge ``(guild_id, match_id, fields)`` updates into matches with one write per guild.
+        
+        Returns ``(guild_id, match_id, match)`` for every match that still existed.
+        """
+        by_guild: Dict[str, List[tuple]] = {}
+        for guild_id, match_id, fields in updates:
+            by_guild.setdefault(str(guild_id), []).append((match_id, fields))
+        
+        updated = []
+        for guild_str, guild_updates in by_guild.items():
+            guild_file = self._guild_file('matches', guild_str)
+            matches = self._load_json(guild_file)
+            for match_id, fields in guild_updates:
+                if match_id in matches:
+                    for field, value in fields.items():
+                        setattr(matches[match_id], field, value)
+                    updated.append((guild_str, match_id, matches[match_id]))
+            self._save_json(guild_file, matches)
+        return updated
     
     def remove_match(self, guild_id: int, match_id: str):
         """Remove a match"""
-        matches = self._load_json(self.matches_file)
-        guild_str = str(guild_id)
+        guild_file = self._guild_file('matches', guild_id)
+        matches = self._load_json(guild_file)
+        
+        if match_id in matches:
+            del matches[match_id]
+            self._save_json(guild_file, matches)
+    
+    def remove_matches(self, items: List[Tuple[int, str]]):
+        """Remove ``(guild_id, match_id)`` pairs with one write per guild"""
+        by_guild: Dict[str, List[str]] = {}
+        for guild_id, match_id in items:
+            by_guild.setdefault(str(guild_id), []).append(match_id)
+        
+        for guild_str, match_ids in by_guild.items():
+            guild_file = self._guild_file('matches', guild_str)
+            matches = self._load_json(guild_file)
+            removed = [matches.pop(match_id) for match_id in match_ids if match_id in matches]
+            if removed:
+                self._save_json(guild_file, matches)
+    
+    # Recurring Match Series
+    def create_series(self, guild_id: int, series: MatchSeries) -> str:
+        """Create a recurring match series and return its ID"""
+        guild_file = self._guild_file('series', guild_id)
+        guild_series = self._load_json(guild_file)
         
-        if guild_str in matches and match_id in matches[guild_str]:
-            del matches[guild_str][match_id]
-            self._save_json(self.matches_file, matches)
+        series_id = str(uuid.uuid4())[:8]
+        guild_series[series_id] = series
+        
+        self._save_json(guild_file, guild_series)
+        return series_id
+    
+    def get_all_series(self) -> Iterator[Tuple[str, Dict[str, MatchSeries]]]:
+        """Lazily yield ``(guild_id, series)`` for every guild that has any"""
+        for guild_str in self._guild_ids('series'):
+            guild_series = self._load_json(self._guild_file('series', guild_str))
+            if guild_series:
+                yield guild_str, guild_series
+    
+    def update_series(self, guild_id: int, series_id: str, series: MatchSeries):
+        """Update a series"""
+        guild_file = self._guild_file('series', guild_id)
+        guild_series = self._load_json(guild_file)
+        
+        if series_id in guild_series:
+            guild_series[series_id] = series
+            self._save_json(guild_file, guild_series)
+    
+    def remove_series(self, guild_id: int, series_id: str):
+        """Remove a series"""
+        guild_file = self._guild_file('series', guild_id)
+        guild_series = self._load_json(guild_file)
+        
+        if series_id in guild_series:
+            del guild_series[series_id]
+            self._save_json(guild_file, guild_series)
     
     # Guild Settings
     def initialize_guild(self, guild_id: int):
         """Initialize default settings for a new guild"""
-        settings = self._load_json(self.settings_file)
-        guild_str = str(guild_id)
-        
-        if guild_str not in settings:
-            settings[guild_str] = {
-                'language': 'en',
-                'mod_log_channel': None,
-                'bot_activity_channel': None,
-                'match_channel': None,
-                'created_at': datetime.utcnow().isoformat()
-            }
-            self._save_json(self.settings_file, settings)
-    
-    def get_guild_settings(self, guild_id: int) -> dict:
-        """Get all settings for a guild"""
-        settings = self._load_json(self.settings_file)
-        guild_str = str(guild_id)
-        
-        if guild_str not in settings:
-            self.initialize_guild(guild_id)
-            return self.get_guild_settings(guild_id)
+        guild_file = self._guild_file('settings', guild_id)
         
-        return settings[guild_str]
+        if self._load_json(guild_file) is None:
+            self._save_json(guild_file, GuildSettings(created_at=int(time.time())))
+    
+    def get_guild_settings(self, guild_id: int) -> GuildSettings:
+        """Get all settings for a guild; unconfigured guilds get the defaults and nothing is written"""
+        settings = self._load_json(self._guild_file('settings', guild_id))
+        return settings if settings is not None else GuildSettings()
     
     def get_guild_setting(self, guild_id: int, key: str, default=None):
         """Get a specific setting for a guild"""
@@ -119,92 +364,852 @@ class Database:
     
     def set_guild_setting(self, guild_id: int, key: str, value):
         """Set a specific setting for a guild"""
-        settings = self._load_json(self.settings_file)
-        guild_str = str(guild_id)
-        
-        if guild_str not in settings:
-            self.initialize_guild(guild_id)
-            settings = self._load_json(self.settings_file)
-        
-        settings[guild_str][key] = value
-        self._save_json(self.settings_file, settings)
+        with self.batch():
+            guild_file = self._guild_file('settings', guild_id)
+            settings = self._load_json(guild_file)
+            if settings is None:
+                settings = GuildSettings(created_at=int(time.time()))
+            elif settings.get(key) == value:
+                return
+            settings.set(key, value)
+            self._save_json(guild_file, settings)
+    
+    # Standings
+    def get_guild_standings(self, guild_id: int) -> Dict[str, Dict[Any, Standing]]:
+        """A guild's ``{'players': {user_id: Standing}, 'teams': {team_key: Standing}}``"""
+        return self._load_json(self._guild_file('standings', guild_id))
+    
+    def save_standings(self, guild_id: int, players: Dict[int, Standing], teams: Dict[str, Standing]):
+        """Store new standings for some of a guild's players and teams"""
+        guild_file = self._guild_file('standings', guild_id)
+        standings = self._load_json(guild_file)
+        standings['players'].update(players)
+        standings['teams'].update(teams)
+        self._save_json(guild_file, standings)
     
     # Warning System
     def add_warning(self, guild_id: int, user_id: int, moderator_id: int, reason: str) -> str:
-        """Add a warning for a user"""
-        warnings = self._load_json(self.warnings_file)
-        guild_str = str(guild_id)
-        user_str = str(user_id)
-        
-        if guild_str not in warnings:
-            warnings[guild_str] = {}
-        
-        if user_str not in warnings[guild_str]:
-            warnings[guild_str][user_str] = []
-        
-        warning_id = str(len(warnings[guild_str][user_str]) + 1)
-        warning_data = {
-            'id': warning_id,
-            'moderator_id': moderator_id,
-            'reason': reason,
-            'timestamp': datetime.utcnow().timestamp()
-        }
-        
-        warnings[guild_str][user_str].append(warning_data)
-        self._save_json(self.warnings_file, warnings)
-        
-        return warning_id
+        """Add a warning for a user and return its guild-unique ID"""
+        return self.warnings.add(guild_id, user_id, moderator_id, reason, int(time.time()))
     
-    def get_user_warnings(self, guild_id: int, user_id: int) -> List[dict]:
+    def get_user_warnings(self, guild_id: int, user_id: int) -> List[MemberWarning]:
         """Get all warnings for a user"""
-        warnings = self._load_json(self.warnings_file)
-        guild_str = str(guild_id)
-        user_str = str(user_id)
-        
-        return warnings.get(guild_str, {}).get(user_str, [])
+        return self.warnings.get(guild_id, user_id)
+    
+    def get_warning_count(self, guild_id: int, user_id: int) -> int:
+        """Number of warnings a user has"""
+        return self.warnings.user_count(guild_id, user_id)
     
     def remove_warning(self, guild_id: int, user_id: int, warning_id: str):
         """Remove a specific warning"""
-        warnings = self._load_json(self.warnings_file)
-        guild_str = str(guild_id)
-        user_str = str(user_id)
-        
-        if guild_str in warnings and user_str in warnings[guild_str]:
-            warnings[guild_str][user_str] = [
-                w for w in warnings[guild_str][user_str] 
-                if w['id'] != warning_id
-            ]
-            self._save_json(self.warnings_file, warnings)
+        self.warnings.remove(guild_id, user_id, warning_id)
     
     # Utility Methods
-    def cleanup_old_matches(self):
-        """Remove matches older than 24 hours"""
-        matches = self._load_json(self.matches_file)
-        current_time = datetime.utcnow()
-        
-        for guild_id, guild_matches in matches.items():
-            for match_id, match_data in list(guild_matches.items()):
-                match_time = datetime.fromisoformat(match_data['time'])
-                if (current_time - match_time).total_seconds() > 86400:  # 24 hours
-                    del guild_matches[match_id]
-        
-        self._save_json(self.matches_file, matches)
-    
     def get_stats(self) -> dict:
         """Get database statistics"""
-        matches = self._load_json(self.matches_file)
-        settings = self._load_json(self.settings_file)
-        warnings = self._load_json(self.warnings_file)
-        
-        total_matches = sum(len(guild_matches) for guild_matches in matches.values())
-        total_guilds = len(settings)
-        total_warnings = sum(
-            sum(len(user_warnings) for user_warnings in guild_warnings.values())
-            for guild_warnings in warnings.values()
-        )
+        with self._counts_lock:
+            if self._match_counts is None:
+                self._match_counts = {
+                    guild_str: len(self.get_guild_matches(guild_str)) for guild_str in self._guild_ids('matches')
+                }
+            total_matches = sum(self._match_counts.values())
+        total_guilds = len(self._guild_ids('settings'))
+        total_warnings = self.warnings.count()
         
         return {
             'guilds': total_guilds,
             'matches': total_matches,
             'warnings': total_warnings
         }
+
+
+class CachedDatabase(Database):
+    """JSON database that keeps every store in memory and writes behind.
+
+    Reads are served from memory. Mutations mark their store dirty and a
+    background thread coalesces them into a single atomic write once the
+    store has been quiet for ``flush_interval_ms`` or has been dirty for
+    ``max_dirty_age_ms``, whichever comes first. Stores are serialised under
+    the lock but written and fsynced outside it, so reads and writes never
+    wait on the disk. Call ``close()`` on shutdown to flush anything still
+    pending.
+    """
+    
+    def __init__(self, flush_interval_ms: int = 500, max_dirty_age_ms: int = 5000,
+                 warnings_compact_bytes: int = 1024 * 1024, warnings_fsync_interval_ms: int = 1000):
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_dirty_age = max_dirty_age_ms / 1000
+        
+        self._lock = threading.RLock()
+        self._wakeup = threading.Condition(self._lock)
+        # Held while flushing (taken before _lock) so snapshots reach the disk in order
+        self._flush_lock = threading.Lock()
+        self._cache: Dict[str, Any] = {}
+        self._first_dirty: Dict[str, float] = {}
+        self._last_dirty: Dict[str, float] = {}
+        self._closed = False
+        
+        super().__init__(
+            warnings_compact_bytes=warnings_compact_bytes,
+            warnings_fsync_interval_ms=warnings_fsync_interval_ms
+        )
+        
+        # Warm the cache so the first command doesn't pay for parsing
+        # (warnings are already held in memory by the journal)
+        for store in ('matches', 'series', 'settings', 'standings'):
+            for guild_str in super()._guild_ids(store):
+                filepath = self._guild_file(store, guild_str)
+                self._cache[filepath] = super()._read_store(filepath)
+        
+        self._flusher = threading.Thread(target=self._flush_loop, name="database-flusher", daemon=True)
+        self._flusher.start()
+    
+    def _read_store(self, filepath: str):
+        """Return the in-memory store (callers must hold the lock to mutate it)"""
+        with self._lock:
+            if filepath not in self._cache:
+                self._cache[filepath] = super()._read_store(filepath)
+            return self._cache[filepath]
+    
+    def _read_store_copy(self, filepath: str):
+        """Deep copy of the in-memory store, so a rolled back batch leaves it untouched"""
+        with self._lock:
+            return copy.deepcopy(self._read_store(filepath))
+    
+    def _guild_ids(self, store: str) -> List[str]:
+        """Guild IDs with a shard on disk or one that has not been flushed yet"""
+        with self._lock:
+            cached = [
+                os.path.basename(filepath)[:-len(".json")]
+                for filepath, data in self._cache.items()
+                if os.path.dirname(filepath) == self.store_dirs[store] and data
+            ]
+            return list(dict.fromkeys(super()._guild_ids(store) + cached))
+    
+    def _write_store(self, filepath: str, data):
+        """Mark a store dirty instead of writing it immediately"""
+        with self._lock:
+            self._cache[filepath] = data
+            now = time.monotonic()
+            self._first_dirty.setdefault(filepath, now)
+            self._last_dirty[filepath] = now
+            self._wakeup.notify()
+    
+    def _due_stores(self, now: float) -> List[str]:
+        """Stores that have been quiet long enough or dirty for too long"""
+        return [
+            filepath for filepath, first in self._first_dirty.items()
+            if now - self._last_dirty[filepath] >= self.flush_interval
+            or now - first >= self.max_dirty_age
+        ]
+    
+    def _next_deadline(self) -> Optional[float]:
+        """Seconds until the next dirty store becomes due, or None if all clean"""
+        if not self._first_dirty:
+            return None
+        now = time.monotonic()
+        return max(0, min(
+            min(self._last_dirty[fp] + self.flush_interval, first + self.max_dirty_age) - now
+            for fp, first in self._first_dirty.items()
+        ))
+    
+    def _flush_loop(self):
+        """Background thread that writes dirty stores to disk"""
+        while True:
+            with self._lock:
+                if self._closed:
+                    return
+                self._wakeup.wait(timeout=self._next_deadline())
+            self._flush_stores(due_only=True)
+    
+    def _flush_stores(self, due_only: bool):
+        """Write dirty stores to disk (caller must not hold the lock).
+        
+        Each store is serialised and marked clean under the lock; the disk
+        writes happen after it is released. A store changed meanwhile is
+        dirty again and goes out with the next flush.
+        """
+        with self._flush_lock:
+            with self._lock:
+                filepaths = self._due_stores(time.monotonic()) if due_only else list(self._first_dirty)
+                snapshots = []
+                for filepath in filepaths:
+                    try:
+                        text = json.dumps(self._encode(filepath, self._cache[filepath]), indent=2, ensure_ascii=False)
+                    except Exception as e:
+                        print(f"Error flushing {filepath}: {e}")
+                        continue
+                    snapshots.append((filepath, text, self._first_dirty.pop(filepath), self._last_dirty.pop(filepath)))
+            
+            for filepath, text, first, last in snapshots:
+                try:
+                    self._write_text_atomic(filepath, text)
+                except Exception as e:
+                    print(f"Error flushing {filepath}: {e}")
+                    # Still dirty since its original change, whatever happened meanwhile
+                    with self._lock:
+                        self._first_dirty[filepath] = min(first, self._first_dirty.get(filepath, first))
+                        self._last_dirty.setdefault(filepath, last)
+    
+    def _commit_batch(self, batch: dict):
+        """Swap a batch's working copies in under the lock so readers see all or nothing"""
+        with self._lock:
+            super()._commit_batch(batch)
+    
+    def flush(self):
+        """Write every dirty store to disk now"""
+        self._flush_stores(due_only=False)
+    
+    def close(self):
+        """Stop the flusher thread and write any pending changes"""
+        with self._lock:
+            self._closed = True
+            self._wakeup.notify()
+        self._flusher.join(timeout=5)
+        self.flush()
+        super().close()
+    
+    # The base methods load a store, mutate it and save it back. With a
+    # shared in-memory store that sequence has to run under the lock so the
+    # flusher never serialises a half-applied change. Matches and series go
+    # in and come out as copies, like the JSON backend's freshly parsed ones,
+    # so changing a record a caller holds never reaches the cache unseen.
+    
+    def create_match(self, guild_id: int, match: Match) -> str:
+        with self._lock:
+            return super().create_match(guild_id, match.copy())
+    
+    def get_guild_matches(self, guild_id: int) -> Dict[str, Match]:
+        with self._lock:
+            return {match_id: match.copy() for match_id, match in super().get_guild_matches(guild_id).items()}
+    
+    def get_match(self, guild_id: int, match_id: str) -> Optional[Match]:
+        with self._lock:
+            match = Database.get_guild_matches(self, guild_id).get(match_id)
+            return match.copy() if match is not None else None
+    
+    def get_all_matches(self, until: Optional[datetime] = None) -> Iterator[Tuple[str, Dict[str, Match]]]:
+        # Snapshot under the lock so the iterator can be consumed without it
+        # (the base method reads each guild through get_guild_matches, which copies)
+        with self._lock:
+            snapshot = [
+                (guild_str, guild_matches)
+                for guild_str, guild_matches in super().get_all_matches(until)
+            ]
+        return iter(snapshot)
+    
+    def update_match(self, guild_id: int, match_id: str, match: Match):
+        with self._lock:
+            super().update_match(guild_id, match_id, match.copy())
+    
+    def set_match_fields(self, updates: List[tuple]) -> List[Tuple[str, str, Match]]:
+        with self._lock:
+            return [(guild_str, match_id, match.copy()) for guild_str, match_id, match in super().set_match_fields(updates)]
+    
+    def remove_match(self, guild_id: int, match_id: str):
+        with self._lock:
+            super().remove_match(guild_id, match_id)
+    
+    def remove_matches(self, items: List[Tuple[int, str]]):
+        with self._lock:
+            super().remove_matches(items)
+    
+    def create_series(self, guild_id: int, series: MatchSeries) -> str:
+        with self._lock:
+            return super().create_series(guild_id, series.copy())
+    
+    def get_all_series(self) -> Iterator[Tuple[str, Dict[str, MatchSeries]]]:
+        with self._lock:
+            return iter([
+                (guild_str, {series_id: series.copy() for series_id, series in guild_series.items()})
+                for guild_str, guild_series in super().get_all_series()
+            ])
+    
+    def update_series(self, guild_id: int, series_id: str, series: MatchSeries):
+        with self._lock:
+            super().update_series(guild_id, series_id, series.copy())
+    
+    def remove_series(self, guild_id: int, series_id: str):
+        with self._lock:
+            super().remove_series(guild_id, series_id)
+    
+    def initialize_guild(self, guild_id: int):
+        with self._lock:
+            super().initialize_guild(guild_id)
+    
+    def get_guild_settings(self, guild_id: int) -> GuildSettings:
+        with self._lock:
+            return super().get_guild_settings(guild_id).copy()
+    
+    def set_guild_setting(self, guild_id: int, key: str, value):
+        with self._lock:
+            super().set_guild_setting(guild_id, key, value)
+    
+    def get_guild_standings(self, guild_id: int) -> Dict[str, Dict[Any, Standing]]:
+        # Standings are replaced rather than changed in place, so they can be shared
+        with self._lock:
+            return {kind: dict(standings) for kind, standings in super().get_guild_standings(guild_id).items()}
+    
+    def save_standings(self, guild_id: int, players: Dict[int, Standing], teams: Dict[str, Standing]):
+        with self._lock:
+            super().save_standings(guild_id, players, teams)
+    
+    def add_warning(self, guild_id: int, user_id: int, moderator_id: int, reason: str) -> str:
+        with self._lock:
+            return super().add_warning(guild_id, user_id, moderator_id, reason)
+    
+    def get_user_warnings(self, guild_id: int, user_id: int) -> List[MemberWarning]:
+        with self._lock:
+            return list(super().get_user_warnings(guild_id, user_id))
+    
+    def get_warning_count(self, guild_id: int, user_id: int) -> int:
+        with self._lock:
+            return super().get_warning_count(guild_id, user_id)
+    
+    def remove_warning(self, guild_id: int, user_id: int, warning_id: str):
+        with self._lock:
+            super().remove_warning(guild_id, user_id, warning_id)
+    
+    def get_stats(self) -> dict:
+        with self._lock:
+            return super().get_stats()
+
+
+class SQLiteDatabase:
+    """SQLite (WAL mode) database with the same API as ``Database``.
+
+    Matches are indexed on ``(guild_id, start_ts)``, warnings on
+    ``(guild_id, user_id)``, settings are keyed by ``guild_id``, series by
+    ``(guild_id, series_id)`` and standings by ``(guild_id, kind, key)``. Row
+    counts for ``get_stats`` are kept in a ``stats`` table by triggers so
+    none of the lookups scan the whole dataset.
+    """
+    
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS matches (
+            guild_id INTEGER NOT NULL,
+            match_id TEXT NOT NULL,
+            start_ts REAL NOT NULL,
+            data TEXT NOT NULL,
+            PRIMARY KEY (guild_id, match_id)
+        );
+        CREATE INDEX IF NOT EXISTS idx_matches_guild_time ON matches (guild_id, start_ts);
+        CREATE INDEX IF NOT EXISTS idx_matches_time ON matches (start_ts);
+        
+        CREATE TABLE IF NOT EXISTS series (
+            guild_id INTEGER NOT NULL,
+            series_id TEXT NOT NULL,
+            data TEXT NOT NULL,
+            PRIMARY KEY (guild_id, series_id)
+        );
+        
+        CREATE TABLE IF NOT EXISTS settings (
+            guild_id INTEGER PRIMARY KEY,
+            data TEXT NOT NULL
+        );
+        
+        CREATE TABLE IF NOT EXISTS standings (
+            guild_id INTEGER NOT NULL,
+            kind TEXT NOT NULL,
+            key TEXT NOT NULL,
+            data TEXT NOT NULL,
+            PRIMARY KEY (guild_id, kind, key)
+        );
+        
+        CREATE TABLE IF NOT EXISTS warnings (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            guild_id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            warning_id TEXT NOT NULL,
+            moderator_id INTEGER,
+            reason TEXT,
+            timestamp REAL
+        );
+        CREATE INDEX IF NOT EXISTS idx_warnings_guild_user ON warnings (guild_id, user_id);
+        
+        CREATE TABLE IF NOT EXISTS warning_counters (
+            guild_id INTEGER PRIMARY KEY,
+            next_id INTEGER NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS warning_counts (
+            guild_id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (guild_id, user_id)
+        );
+        
+        CREATE TABLE IF NOT EXISTS stats (
+            name TEXT PRIMARY KEY,
+            value INTEGER NOT NULL
+        );
+        INSERT OR IGNORE INTO stats (name, value) VALUES ('guilds', 0), ('matches', 0), ('warnings', 0);
+        
+        CREATE TRIGGER IF NOT EXISTS matches_insert AFTER INSERT ON matches
+        BEGIN UPDATE stats SET value = value + 1 WHERE name = 'matches'; END;
+        CREATE TRIGGER IF NOT EXISTS matches_delete AFTER DELETE ON matches
+        BEGIN UPDATE stats SET value = value - 1 WHERE name = 'matches'; END;
+        CREATE TRIGGER IF NOT EXISTS settings_insert AFTER INSERT ON settings
+        BEGIN UPDATE stats SET value = value + 1 WHERE name = 'guilds'; END;
+        CREATE TRIGGER IF NOT EXISTS settings_delete AFTER DELETE ON settings
+        BEGIN UPDATE stats SET value = value - 1 WHERE name = 'guilds'; END;
+        CREATE TRIGGER IF NOT EXISTS warnings_insert AFTER INSERT ON warnings
+        BEGIN UPDATE stats SET value = value + 1 WHERE name = 'warnings'; END;
+        CREATE TRIGGER IF NOT EXISTS warnings_delete AFTER DELETE ON warnings
+        BEGIN UPDATE stats SET value = value - 1 WHERE name = 'warnings'; END;
+        CREATE TRIGGER IF NOT EXISTS warning_counts_insert AFTER INSERT ON warnings
+        BEGIN
+            INSERT INTO warning_counts (guild_id, user_id, count) VALUES (NEW.guild_id, NEW.user_id, 1)
+            ON CONFLICT (guild_id, user_id) DO UPDATE SET count = count + 1;
+        END;
+        CREATE TRIGGER IF NOT EXISTS warning_counts_delete AFTER DELETE ON warnings
+        BEGIN
+            UPDATE warning_counts SET count = count - 1 WHERE guild_id = OLD.guild_id AND user_id = OLD.user_id;
+        END;
+        
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        );
+    """
+    
+    def __init__(self, db_path: str = os.path.join("data", "bot.db")):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        
+        # One connection per thread; writes are serialised by the lock,
+        # which is re-entrant so statements can run inside a batch
+        self._local = threading.local()
+        self._write_lock = threading.RLock()
+        
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(self.SCHEMA)
+        conn.commit()
+        
+        # Databases created before the warning counters existed need them filled in once
+        with conn:
+            if not conn.execute("SELECT 1 FROM meta WHERE key = 'warning_counters'").fetchone():
+                conn.execute("DELETE FROM warning_counts")
+                conn.execute(
+                    "INSERT INTO warning_counts (guild_id, user_id, count) "
+                    "SELECT guild_id, user_id, COUNT(*) FROM warnings GROUP BY guild_id, user_id"
+                )
+                self._advance_warning_counters(conn)
+                conn.execute("INSERT INTO meta (key, value) VALUES ('warning_counters', '1')")
+    
+    def _conn(self) -> sqlite3.Connection:
+        """Get the calling thread's connection"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+        return conn
+    
+    @contextmanager
+    def _transaction(self):
+        """Hold the write lock and commit on exit, unless an enclosing batch will"""
+        with self._write_lock:
+            conn = self._conn()
+            if getattr(self._local, 'batch_depth', 0):
+                yield conn
+                return
+            with conn:
+                yield conn
+    
+    def _write(self, sql: str, params: tuple = ()) -> sqlite3.Cursor:
+        """Run a single write statement in its own transaction"""
+        with self._transaction() as conn:
+            return conn.execute(sql, params)
+    
+    @contextmanager
+    def batch(self):
+        """Run every statement in the block in one transaction, rolled back if it raises"""
+        with self._write_lock:
+            depth = getattr(self._local, 'batch_depth', 0)
+            self._local.batch_depth = depth + 1
+            try:
+                if depth:
+                    yield self
+                else:
+                    with self._conn():
+                        yield self
+            finally:
+                self._local.batch_depth = depth
+    
+    @staticmethod
+    def _advance_warning_counters(conn: sqlite3.Connection):
+        """Move every guild's warning counter past the highest numeric ID in use"""
+        conn.execute(
+            "INSERT INTO warning_counters (guild_id, next_id) "
+            "SELECT guild_id, MAX(CAST(warning_id AS INTEGER)) + 1 FROM warnings GROUP BY guild_id "
+            "ON CONFLICT (guild_id) DO UPDATE SET next_id = MAX(next_id, excluded.next_id)"
+        )
+    
+    def close(self):
+        """Close the calling thread's connection"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+    
+    # Match Management
+    @staticmethod
+    def _dump(record) -> str:
+        return json.dumps(record.to_dict(), ensure_ascii=False)
+    
+    def create_match(self, guild_id: int, match: Match) -> str:
+        """Create a new match and return its ID"""
+        match_id = str(uuid.uuid4())[:8]  # Short UUID
+        self._write(
+            "INSERT INTO matches (guild_id, match_id, start_ts, data) VALUES (?, ?, ?, ?)",
+            (int(guild_id), match_id, match.start, self._dump(match))
+        )
+        return match_id
+    
+    def get_guild_matches(self, guild_id: int) -> Dict[str, Match]:
+        """Get all matches for a guild"""
+        rows = self._conn().execute(
+            "SELECT match_id, data FROM matches WHERE guild_id = ? ORDER BY start_ts",
+            (int(guild_id),)
+        )
+        return {match_id: Match.from_dict(json.loads(data)) for match_id, data in rows}
+    
+    def get_match(self, guild_id: int, match_id: str) -> Optional[Match]:
+        """Get a single match, or None if it no longer exists"""
+        row = self._conn().execute(
+            "SELECT data FROM matches WHERE guild_id = ? AND match_id = ?",
+            (int(guild_id), match_id)
+        ).fetchone()
+        return Match.from_dict(json.loads(row[0])) if row else None
+    
+    def get_all_matches(self, until: Optional[datetime] = None) -> Iterator[Tuple[str, Dict[str, Match]]]:
+        """Lazily yield ``(guild_id, matches)`` for every guild, optionally only matches starting before ``until``"""
+        cutoff = until.timestamp() if until is not None else float('inf')
+        guild_ids = [row[0] for row in self._conn().execute("SELECT DISTINCT guild_id FROM matches")]
+        
+        # One query per guild on the consuming thread's connection, so the
+        # iterator may be advanced from different executor threads
+        for guild_id in guild_ids:
+            rows = self._conn().execute(
+                "SELECT match_id, data FROM matches WHERE guild_id = ? AND start_ts <= ? ORDER BY start_ts",
+                (guild_id, cutoff)
+            )
+            matches = {match_id: Match.from_dict(json.loads(data)) for match_id, data in rows}
+            if matches:
+                yield str(guild_id), matches
+    
+    def update_match(self, guild_id: int, match_id: str, match: Match):
+        """Update match data"""
+        self._write(
+            "UPDATE matches SET start_ts = ?, data = ? WHERE guild_id = ? AND match_id = ?",
+            (match.start, self._dump(match), int(guild_id), match_id)
+        )
+    
+    def set_match_fields(self, updates: List[tuple]) -> List[Tuple[str, str, Match]]:
+        """Merge ``(guild_id, match_id, fields)`` updates into matches in one transaction.
+        
+        Returns ``(guild_id, match_id, match)`` for every match that still existed.
+        """
+        updated = []
+        if not updates:
+            return updated
+        
+        with self._transaction() as conn:
+            for guild_id, match_id, fields in updates:
+                row = conn.execute(
+                    "SELECT data FROM matches WHERE guild_id = ? AND match_id = ?",
+                    (int(guild_id), match_id)
+                ).fetchone()
+                if row is None:
+                    continue
+                match = Match.from_dict(json.loads(row[0]))
+                for field, value in fields.items():
+                    setattr(match, field, value)
+                conn.execute(
+                    "UPDATE matches SET data = ? WHERE guild_id = ? AND match_id = ?",
+                    (self._dump(match), int(guild_id), match_id)
+                )
+                updated.append((str(guild_id), match_id, match))
+        return updated
+    
+    def remove_match(self, guild_id: int, match_id: str):
+        """Remove a match"""
+        self._write("DELETE FROM matches WHERE guild_id = ? AND match_id = ?", (int(guild_id), match_id))
+    
+    def remove_matches(self, items: List[Tuple[int, str]]):
+        """Remove ``(guild_id, match_id)`` pairs in one transaction"""
+        with self._transaction() as conn:
+            conn.executemany(
+                "DELETE FROM matches WHERE guild_id = ? AND match_id = ?",
+                [(int(guild_id), match_id) for guild_id, match_id in items]
+            )
+    
+    # Recurring Match Series
+    def create_series(self, guild_id: int, series: MatchSeries) -> str:
+        """Create a recurring match series and return its ID"""
+        series_id = str(uuid.uuid4())[:8]
+        self._write(
+            "INSERT INTO series (guild_id, series_id, data) VALUES (?, ?, ?)",
+            (int(guild_id), series_id, self._dump(series))
+        )
+        return series_id
+    
+    def get_all_series(self) -> Iterator[Tuple[str, Dict[str, MatchSeries]]]:
+        """Lazily yield ``(guild_id, series)`` for every guild that has any"""
+        guild_ids = [row[0] for row in self._conn().execute("SELECT DISTINCT guild_id FROM series")]
+        for guild_id in guild_ids:
+            rows = self._conn().execute("SELECT series_id, data FROM series WHERE guild_id = ?", (guild_id,))
+            guild_series = {series_id: MatchSeries.from_dict(json.loads(data)) for series_id, data in rows}
+            if guild_series:
+                yield str(guild_id), guild_series
+    
+    def update_series(self, guild_id: int, series_id: str, series: MatchSeries):
+        """Update a series"""
+        self._write(
+            "UPDATE series SET data = ? WHERE guild_id = ? AND series_id = ?",
+            (self._dump(series), int(guild_id), series_id)
+        )
+    
+    def remove_series(self, guild_id: int, series_id: str):
+        """Remove a series"""
+        self._write("DELETE FROM series WHERE guild_id = ? AND series_id = ?", (int(guild_id), series_id))
+    
+    # Guild Settings
+    def initialize_guild(self, guild_id: int):
+        """Initialize default settings for a new guild"""
+        self._write(
+            "INSERT OR IGNORE INTO settings (guild_id, data) VALUES (?, ?)",
+            (int(guild_id), self._dump(GuildSettings(created_at=int(time.time()))))
+        )
+    
+    def get_guild_settings(self, guild_id: int) -> GuildSettings:
+        """Get all settings for a guild; unconfigured guilds get the defaults and nothing is written"""
+        row = self._conn().execute("SELECT data FROM settings WHERE guild_id = ?", (int(guild_id),)).fetchone()
+        return GuildSettings.from_dict(json.loads(row[0])) if row else GuildSettings()
+    
+    def get_guild_setting(self, guild_id: int, key: str, default=None):
+        """Get a specific setting for a guild"""
+        settings = self.get_guild_settings(guild_id)
+        return settings.get(key, default)
+    
+    def set_guild_setting(self, guild_id: int, key: str, value):
+        """Set a specific setting for a guild"""
+        with self._transaction() as conn:
+            row = conn.execute("SELECT data FROM settings WHERE guild_id = ?", (int(guild_id),)).fetchone()
+            if row is None:
+                settings = GuildSettings(created_at=int(time.time()))
+            else:
+                settings = GuildSettings.from_dict(json.loads(row[0]))
+                if settings.get(key) == value:
+                    return
+            settings.set(key, value)
+            conn.execute(
+                "INSERT INTO settings (guild_id, data) VALUES (?, ?) "
+                "ON CONFLICT (guild_id) DO UPDATE SET data = excluded.data",
+                (int(guild_id), self._dump(settings))
+            )
+    
+    # Standings
+    def get_guild_standings(self, guild_id: int) -> Dict[str, Dict[Any, Standing]]:
+        """A guild's ``{'players': {user_id: Standing}, 'teams': {team_key: Standing}}``"""
+        standings = {'players': {}, 'teams': {}}
+        rows = self._conn().execute("SELECT kind, key, data FROM standings WHERE guild_id = ?", (int(guild_id),))
+        for kind, key, data in rows:
+            standings[kind][int(key) if kind == 'players' else key] = Standing.from_dict(json.loads(data))
+        return standings
+    
+    def save_standings(self, guild_id: int, players: Dict[int, Standing], teams: Dict[str, Standing]):
+        """Store new standings for some of a guild's players and teams"""
+        rows = [(int(guild_id), 'players', str(user_id), self._dump(standing)) for user_id, standing in players.items()]
+        rows += [(int(guild_id), 'teams', team_key, self._dump(standing)) for team_key, standing in teams.items()]
+        with self._transaction() as conn:
+            conn.executemany(
+                "INSERT INTO standings (guild_id, kind, key, data) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (guild_id, kind, key) DO UPDATE SET data = excluded.data",
+                rows
+            )
+    
+    # Warning System
+    def add_warning(self, guild_id: int, user_id: int, moderator_id: int, reason: str) -> str:
+        """Add a warning for a user and return its guild-unique ID"""
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT INTO warning_counters (guild_id, next_id) VALUES (?, 2) "
+                "ON CONFLICT (guild_id) DO UPDATE SET next_id = next_id + 1",
+                (int(guild_id),)
+            )
+            next_id = conn.execute(
+                "SELECT next_id FROM warning_counters WHERE guild_id = ?", (int(guild_id),)
+            ).fetchone()[0]
+            warning_id = str(next_id - 1)
+            conn.execute(
+                "INSERT INTO warnings (guild_id, user_id, warning_id, moderator_id, reason, timestamp) VALUES (?, ?, ?, ?, ?, ?)",
+                (int(guild_id), int(user_id), warning_id, moderator_id, reason, int(time.time()))
+            )
+        return warning_id
+    
+    def get_user_warnings(self, guild_id: int, user_id: int) -> List[MemberWarning]:
+        """Get all warnings for a user"""
+        rows = self._conn().execute(
+            "SELECT warning_id, moderator_id, reason, timestamp FROM warnings "
+            "WHERE guild_id = ? AND user_id = ? ORDER BY seq",
+            (int(guild_id), int(user_id))
+        )
+        return [
+            MemberWarning(warning_id, moderator_id, reason, timestamp or 0)
+            for warning_id, moderator_id, reason, timestamp in rows
+        ]
+    
+    def get_warning_count(self, guild_id: int, user_id: int) -> int:
+        """Number of warnings a user has"""
+        row = self._conn().execute(
+            "SELECT count FROM warning_counts WHERE guild_id = ? AND user_id = ?",
+            (int(guild_id), int(user_id))
+        ).fetchone()
+        return row[0] if row else 0
+    
+    def remove_warning(self, guild_id: int, user_id: int, warning_id: str):
+        """Remove a specific warning"""
+        self._write(
+            "DELETE FROM warnings WHERE guild_id = ? AND user_id = ? AND warning_id = ?",
+            (int(guild_id), int(user_id), warning_id)
+        )
+    
+    # Utility Methods
+    def get_stats(self) -> dict:
+        """Get database statistics"""
+        rows = self._conn().execute("SELECT name, value FROM stats")
+        stats = dict(rows)
+        return {
+            'guilds': stats.get('guilds', 0),
+            'matches': stats.get('matches', 0),
+            'warnings': stats.get('warnings', 0)
+        }
+    
+    @staticmethod
+    def _read_json(filepath: str) -> dict:
+        try:
+            with open(filepath, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+    
+    def import_from_json(self, data_dir: str = "data") -> bool:
+        """One-shot import of the JSON backend's files.
+
+        Both the per-guild shards under data/<store>/ and the older
+        monolithic data/<store>.json files are read.
+
+        Returns False without touching anything if an import has already
+        been recorded for this database.
+        """
+        # Every start of the SQLite backend calls this; don't read any files once imported
+        if self._conn().execute("SELECT 1 FROM meta WHERE key = 'json_import'").fetchone():
+            return False
+        
+        legacy = {}
+        for store in Database.STORES:
+            legacy[store] = self._read_json(os.path.join(data_dir, f"{store}.json"))
+            
+            # Per-guild shards written by the JSON backend
+            store_dir = os.path.join(data_dir, store)
+            if store == 'warnings':
+                legacy[store].update(WarningJournal.read_state(store_dir))
+            elif os.path.isdir(store_dir):
+                for filename in os.listdir(store_dir):
+                    if filename.endswith(".json"):
+                        guild_data = self._read_json(os.path.join(store_dir, filename))
+                        if guild_data:
+                            legacy[store][filename[:-len(".json")]] = guild_data
+        matches, settings, warnings = legacy['matches'], legacy['settings'], legacy['warnings']
+        standings, series = legacy['standings'], legacy['series']
+        
+        with self._transaction() as conn:
+            # Checked again in case another process imported while the files were read
+            if conn.execute("SELECT 1 FROM meta WHERE key = 'json_import'").fetchone():
+                return False
+            
+            for guild_id, guild_matches in matches.items():
+                for match_id, match_data in guild_matches.items():
+                    match = Match.from_dict(match_data)
+                    conn.execute(
+                        "INSERT OR REPLACE INTO matches (guild_id, match_id, start_ts, data) VALUES (?, ?, ?, ?)",
+                        (int(guild_id), match_id, match.start, self._dump(match))
+                    )
+            
+            for guild_id, guild_series in series.items():
+                for series_id, series_data in guild_series.items():
+                    conn.execute(
+                        "INSERT OR REPLACE INTO series (guild_id, series_id, data) VALUES (?, ?, ?)",
+                        (int(guild_id), series_id, self._dump(MatchSeries.from_dict(series_data)))
+                    )
+            
+            for guild_id, guild_settings in settings.items():
+                conn.execute(
+                    "INSERT OR REPLACE INTO settings (guild_id, data) VALUES (?, ?)",
+                    (int(guild_id), self._dump(GuildSettings.from_dict(guild_settings)))
+                )
+            
+            for guild_id, guild_warnings in warnings.items():
+                for user_id, user_warnings in guild_warnings.items():
+                    for warning in user_warnings:
+                        if isinstance(warning, dict):
+                            warning = MemberWarning.from_dict(warning)  # From the monolithic file
+                        conn.execute(
+                            "INSERT INTO warnings (guild_id, user_id, warning_id, moderator_id, reason, timestamp) VALUES (?, ?, ?, ?, ?, ?)",
+                            (int(guild_id), int(user_id), warning.id, warning.moderator_id, warning.reason, warning.timestamp)
+                        )
+            self._advance_warning_counters(conn)
+            
+            for guild_id, guild_standings in standings.items():
+                for kind in ('players', 'teams'):
+                    for key, standing in guild_standings.get(kind, {}).items():
+                        conn.execute(
+                            "INSERT OR REPLACE INTO standings (guild_id, kind, key, data) VALUES (?, ?, ?, ?)",
+                            (int(guild_id), kind, key, self._dump(Standing.from_dict(standing)))
+                        )
+            
+            conn.execute(
+                "INSERT INTO meta (key, value) VALUES ('json_import', ?)",
+                (datetime.utcnow().isoformat(),)
+            )
+        
+        print(f"Imported JSON data from {data_dir} into {self.db_path}")
+        return True
+
+
+def create_database() -> Database:
+    """Build the database backend selected by environment variables.
+
+    ``DATABASE_BACKEND`` picks the backend (``json``, ``cached`` or
+    ``sqlite``). The cached backend reads ``DATABASE_FLUSH_INTERVAL_MS``
+    and ``DATABASE_MAX_DIRTY_AGE_MS`` to tune its write-behind flusher.
+    Both JSON backends read ``WARNINGS_COMPACT_BYTES`` and
+    ``WARNINGS_FSYNC_INTERVAL_MS`` to tune the warnings journal.
+    The SQLite backend stores its data at ``DATABASE_PATH`` and imports
+    the JSON backend's files the first time it starts.
+    """
+    backend = os.getenv('DATABASE_BACKEND', 'json').lower()
+    
+    if backend == 'sqlite':
+        database = SQLiteDatabase(os.getenv('DATABASE_PATH', os.path.join("data", "bot.db")))
+        database.import_from_json()
+        return database
+    
+    journal_options = {
+        'warnings_compact_bytes': int(os.getenv('WARNINGS_COMPACT_BYTES', str(1024 * 1024))),
+        'warnings_fsync_interval_ms': int(os.getenv('WARNINGS_FSYNC_INTERVAL_MS', '1000'))
+    }
+    
+    if backend == 'cached':
+        return CachedDatabase(
+            flush_interval_ms=int(os.getenv('DATABASE_FLUSH_INTERVAL_MS', '500')),
+            max_dirty_age_ms=int(os.getenv('DATABASE_MAX_DIRTY_AGE_MS', '5000')),
+            **journal_options
+        )
+    
+    if backend != 'json':
+        print(f"Unknown DATABASE_BACKEND '{backend}', falling back to json")
+    return Database(**journal_options)
@@ -0,0 +1,82 @@
+import asyncio
+import json
+import os
+import time
+from typing import Dict, Optional
+
+
+class ClosedDMCache:
+    """Persisted negative cache of users whose DMs recently failed.
+    
+    A user who answers a DM with 403 is skipped until their entry expires.
+    Every further failure doubles the time before the next probe, up to
+    ``max_ttl``; a successful delivery clears the entry. The cache is saved to
+    ``path`` a few seconds after it changes so bursts of failures cost one write.
+    """
+    
+    def __init__(self, path: str = os.path.join("data", "closed_dms.json"),
+                 base_ttl: float = 3600, max_ttl: float = 7 * 86400, save_delay: float = 5):
+        self.path = path
+        self.base_ttl = base_ttl
+        self.max_ttl = max_ttl
+        self.save_delay = save_delay
+        self._entries: Dict[str, dict] = self._load()
+        self._save_task: Optional[asyncio.Task] = None
+    
+    def _load(self) -> Dict[str, dict]:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+    
+    def _write(self, entries: Dict[str, dict]):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entries, f)
+        os.replace(tmp_path, self.path)
+    
+    async def _save_later(self):
+        await asyncio.sleep(self.save_delay)
+        self._save_task = None
+        await self.save()
+    
+    def _schedule_save(self):
+        if self._save_task is None:
+            try:
+                self._save_task = asyncio.get_running_loop().create_task(self._save_later())
+            except RuntimeError:
+                self._write(dict(self._entries))
+    
+    async def save(self):
+        """Write the cache to disk now"""
+        entries = dict(self._entries)
+        await asyncio.get_running_loop().run_in_executor(None, self._write, entries)
+    
+    async def close(self):
+        """Write any pending change before shutdown"""
+        if self._save_task is not None:
+            self._save_task.cancel()
+            self._save_task = None
+        await self.save()
+    
+    def is_closed(self, user_id: int) -> bool:
+        """True if DMs to this user should be skipped for now"""
+        entry = self._entries.get(str(user_id))
+        return entry is not None and entry['retry_at'] > time.time()
+    
+    def record_closed(self, user_id: int):
+        """Remember a 403 and push the next probe out exponentially"""
+        entry = self._entries.get(str(user_id), {'failures': 0})
+        failures = entry['failures'] + 1
+        ttl = min(self.max_ttl, self.base_ttl * (2 ** (failures - 1)))
+        self._entries[str(user_id)] = {'failures': failures, 'retry_at': time.time() + ttl}
+        self._schedule_save()
+    
+    def record_delivered(self, user_id: int):
+        """Forget a user once a DM to them goes through"""
+        if self._entries.pop(str(user_id), None) is not None:
+            self._schedule_save()
+    
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,129 @@
+import asyncio
+import time
+from typing import Dict, Callable, Iterable, Optional
+
+import discord
+
+from utils.dm_cache import ClosedDMCache
+
+# Per-recipient delivery outcomes
+SENT = 'sent'
+DM_CLOSED = 'dm_closed'
+NOT_CACHED = 'not_cached'
+UNREACHABLE = 'unreachable'
+ERROR = 'error'
+
+
+class FanOutResult:
+    """Delivery outcome for every recipient of a fan-out"""
+    
+    def __init__(self):
+        self.results: Dict[int, str] = {}
+    
+    def count(self, status: str) -> int:
+        return sum(1 for result in self.results.values() if result == status)
+    
+    @property
+    def sent(self) -> int:
+        return self.count(SENT)
+    
+    @property
+    def total(self) -> int:
+        return len(self.results)
+    
+    def summary(self) -> str:
+        """Short human readable delivery report"""
+        parts = [f"{self.sent}/{self.total} delivered"]
+        for status, label in ((DM_CLOSED, "DMs closed"), (UNREACHABLE, "unreachable"), (NOT_CACHED, "not found"), (ERROR, "failed")):
+            count = self.count(status)
+            if count:
+                parts.append(f"{count} {label}")
+        return ", ".join(parts)
+
+
+class DMDispatcher:
+    """Sends the same DM to many members concurrently.
+    
+    At most ``concurrency`` sends are in flight at once. When Discord answers
+    with a 429 every sender pauses for the ``retry_after`` it asked for before
+    the request is retried.
+    
+    With a ``ClosedDMCache`` attached, users who recently rejected a DM are
+    reported as unreachable without spending an API call on them.
+    """
+    
+    def __init__(self, concurrency: int = 5, max_attempts: int = 3, closed_cache: Optional[ClosedDMCache] = None):
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.max_attempts = max_attempts
+        self.closed_cache = closed_cache
+        self._resume_at = 0.0
+    
+    async def _wait_for_rate_limit(self):
+        delay = self._resume_at - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+    
+    def _pause(self, retry_after: float):
+        self._resume_at = max(self._resume_at, time.monotonic() + retry_after)
+    
+    @staticmethod
+    def _retry_after(error: Exception) -> Optional[float]:
+        """Seconds Discord asked us to wait, or None if this wasn't a 429"""
+        if isinstance(error, discord.RateLimited):
+            return error.retry_after
+        if error.status == 429:
+            try:
+                return float(error.response.headers.get('Retry-After', 1))
+            except (TypeError, ValueError, AttributeError):
+                return 1.0
+        return None
+    
+    async def deliver(self, member: discord.abc.Messageable, kwargs: dict) -> str:
+        """Send one DM, retrying on rate limits, and return its delivery status"""
+        if self.closed_cache is not None and self.closed_cache.is_closed(member.id):
+            return UNREACHABLE
+        
+        async with self.semaphore:
+            for attempt in range(self.max_attempts):
+                await self._wait_for_rate_limit()
+                try:
+                    await member.send(**kwargs)
+                    if self.closed_cache is not None:
+                        self.closed_cache.record_delivered(member.id)
+                    return SENT
+                except discord.Forbidden:
+                    if self.closed_cache is not None:
+                        self.closed_cache.record_closed(member.id)
+                    return DM_CLOSED
+                except (discord.HTTPException, discord.RateLimited) as e:
+                    retry_after = self._retry_after(e)
+                    if retry_after is None or attempt == self.max_attempts - 1:
+                        print(f"Failed to send DM to user {member.id}: {e}")
+                        return ERROR
+                    self._pause(retry_after)
+                except Exception as e:
+                    print(f"Failed to send DM to user {member.id}: {e}")
+                    return ERROR
+            return ERROR
+    
+    async def send(self, guild: discord.Guild, user_ids: Iterable[int], embed: discord.Embed,
+                   view_factory: Optional[Callable[[], discord.ui.View]] = None) -> FanOutResult:
+        """DM ``embed`` to every member in ``user_ids`` and report what happened to each"""
+        result = FanOutResult()
+        recipients = []
+        
+        for user_id in dict.fromkeys(user_ids):
+            member = guild.get_member(user_id)
+            if member is None:
+                result.results[user_id] = NOT_CACHED
+            else:
+                recipients.append(member)
+        
+        async def deliver(member):
+            kwargs = {'embed': embed}
+            if view_factory is not None:
+                kwargs['view'] = view_factory()
+            result.results[member.id] = await self.deliver(member, kwargs)
+        
+        await asyncio.gather(*(deliver(member) for member in recipients))
+        return result
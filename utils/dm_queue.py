@@ -0,0 +1,283 @@
+import asyncio
+import json
+import os
+import random
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Callable, Iterable, List, Optional
+
+import discord
+
+from utils.dm_dispatcher import DMDispatcher, SENT, DM_CLOSED, NOT_CACHED, UNREACHABLE, ERROR
+
+
+class EnqueueResult:
+    """How many recipients were queued and who was skipped as unreachable"""
+    
+    def __init__(self, queued: int, unreachable: List[int]):
+        self.queued = queued
+        self.unreachable = unreachable
+    
+    def summary(self) -> str:
+        if self.unreachable:
+            return f"{self.queued} queued, {len(self.unreachable)} unreachable"
+        return f"{self.queued} queued"
+
+
+class DMQueue:
+    """Durable outbound DM queue backed by SQLite.
+    
+    Each job is one embed (plus an optional view spec) for one recipient.
+    Commands enqueue and return straight away; a pool of async workers drains
+    the queue through the ``DMDispatcher``. Failed sends are retried with
+    exponential backoff and jitter, and move to the dead-letter table once
+    ``max_attempts`` is used up, the recipient has DMs closed or is no longer
+    in the guild. A job can carry a ``not_after`` time (a reminder is useless
+    once its match has started); it is dead-lettered instead of being sent
+    or retried past that time. Jobs survive a restart because they only
+    leave the table once they are done.
+    
+    Views can't be stored, so jobs carry a small spec dict with a ``type``
+    and the view is rebuilt by the builder registered for that type.
+    """
+    
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            guild_id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            payload TEXT NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt_at REAL NOT NULL,
+            claimed INTEGER NOT NULL DEFAULT 0,
+            last_error TEXT,
+            created_at REAL NOT NULL,
+            not_after REAL
+        );
+        CREATE INDEX IF NOT EXISTS idx_jobs_due ON jobs (claimed, next_attempt_at);
+        
+        CREATE TABLE IF NOT EXISTS dead_letters (
+            id INTEGER PRIMARY KEY,
+            guild_id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            payload TEXT NOT NULL,
+            attempts INTEGER NOT NULL,
+            last_error TEXT,
+            created_at REAL NOT NULL,
+            failed_at REAL NOT NULL
+        );
+    """
+    
+    def __init__(self, bot, dispatcher: DMDispatcher, db_path: str = os.path.join("data", "dm_queue.db"),
+                 workers: int = 4, max_attempts: int = 5, base_delay: float = 5, max_delay: float = 900):
+        self.bot = bot
+        self.dispatcher = dispatcher
+        self.db_path = db_path
+        self.worker_count = workers
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        
+        self._view_builders: Dict[str, Callable[[dict, discord.Embed], discord.ui.View]] = {}
+        self._workers: List[asyncio.Task] = []
+        self._wakeup = asyncio.Event()
+        
+        # Every queue query runs on this one thread with its own connection
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="dm-queue")
+        self._conn: Optional[sqlite3.Connection] = None
+    
+    def register_view(self, view_type: str, builder: Callable[[dict, discord.Embed], discord.ui.View]):
+        """Register how to rebuild a view from the spec stored with a job"""
+        self._view_builders[view_type] = builder
+    
+    async def _run(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+    
+    # Storage (queue thread only)
+    def _open(self):
+        os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(self.db_path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(self.SCHEMA)
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")]
+        if 'not_after' not in columns:
+            # Queues created before jobs could expire
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN not_after REAL")
+        # Jobs claimed by a previous process were never finished
+        self._conn.execute("UPDATE jobs SET claimed = 0")
+        self._conn.commit()
+    
+    def _insert(self, rows: List[tuple]):
+        with self._conn:
+            self._conn.executemany(
+                "INSERT INTO jobs (guild_id, user_id, payload, next_attempt_at, created_at, not_after) VALUES (?, ?, ?, ?, ?, ?)",
+                rows
+            )
+    
+    def _claim(self, now: float) -> Optional[tuple]:
+        row = self._conn.execute(
+            "SELECT id, guild_id, user_id, payload, attempts, not_after FROM jobs "
+            "WHERE claimed = 0 AND next_attempt_at <= ? ORDER BY next_attempt_at LIMIT 1",
+            (now,)
+        ).fetchone()
+        if row is not None:
+            with self._conn:
+                self._conn.execute("UPDATE jobs SET claimed = 1 WHERE id = ?", (row[0],))
+        return row
+    
+    def _next_due(self) -> Optional[float]:
+        row = self._conn.execute("SELECT MIN(next_attempt_at) FROM jobs WHERE claimed = 0").fetchone()
+        return row[0]
+    
+    def _complete(self, job_id: int):
+        with self._conn:
+            self._conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+    
+    def _retry(self, job_id: int, attempts: int, next_attempt_at: float, error: str):
+        with self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET attempts = ?, next_attempt_at = ?, claimed = 0, last_error = ? WHERE id = ?",
+                (attempts, next_attempt_at, error, job_id)
+            )
+    
+    def _dead_letter(self, job_id: int, attempts: int, error: str):
+        with self._conn:
+            self._conn.execute(
+                "INSERT INTO dead_letters (id, guild_id, user_id, payload, attempts, last_error, created_at, failed_at) "
+                "SELECT id, guild_id, user_id, payload, ?, ?, created_at, ? FROM jobs WHERE id = ?",
+                (attempts, error, time.time(), job_id)
+            )
+            self._conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+    
+    def _counts(self) -> Dict[str, int]:
+        pending = self._conn.execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
+        dead = self._conn.execute("SELECT COUNT(*) FROM dead_letters").fetchone()[0]
+        return {'pending': pending, 'dead': dead}
+    
+    # Public API
+    async def enqueue(self, guild_id: int, user_ids: Iterable[int], embed: discord.Embed, view: Optional[dict] = None,
+                      not_after: Optional[float] = None) -> EnqueueResult:
+        """Queue ``embed`` for every user in ``user_ids``, skipping users with DMs known to be closed.
+        
+        Jobs still unsent at ``not_after`` (a Unix timestamp) are dead-lettered.
+        """
+        closed_cache = self.dispatcher.closed_cache
+        recipients, unreachable = [], []
+        for user_id in dict.fromkeys(user_ids):
+            if closed_cache is not None and closed_cache.is_closed(user_id):
+                unreachable.append(user_id)
+            else:
+                recipients.append(user_id)
+        
+        payload = json.dumps({'embed': embed.to_dict(), 'view': view}, ensure_ascii=False)
+        now = time.time()
+        rows = [(int(guild_id), int(user_id), payload, now, now, not_after) for user_id in recipients]
+        if rows:
+            await self._run(self._insert, rows)
+            self._wakeup.set()
+        return EnqueueResult(len(rows), unreachable)
+    
+    async def get_stats(self) -> Dict[str, int]:
+        """Number of pending and dead-lettered jobs"""
+        return await self._run(self._counts)
+    
+    async def start(self):
+        """Open the queue and start the workers"""
+        await self._run(self._open)
+        for index in range(self.worker_count):
+            self._workers.append(asyncio.create_task(self._worker(index)))
+    
+    async def stop(self):
+        """Stop the workers; unfinished jobs stay queued for the next start"""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers.clear()
+        if self._conn is not None:
+            await self._run(self._conn.close)
+        self._executor.shutdown(wait=False)
+    
+    # Workers
+    def _backoff(self, attempts: int) -> float:
+        delay = min(self.max_delay, self.base_delay * (2 ** (attempts - 1)))
+        return delay * random.uniform(0.8, 1.2)
+    
+    async def _worker(self, index: int):
+        await self.bot.wait_until_ready()
+        while True:
+            try:
+                job = await self._run(self._claim, time.time())
+                if job is None:
+                    await self._wait_for_work()
+                    continue
+                await self._process(*job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"DM queue worker {index} error: {e}")
+                await asyncio.sleep(1)
+    
+    async def _wait_for_work(self):
+        """Sleep until a job is enqueued or the earliest retry becomes due"""
+        self._wakeup.clear()
+        next_due = await self._run(self._next_due)
+        timeout = None if next_due is None else max(0, next_due - time.time())
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+    
+    def _build_message(self, payload: dict) -> Dict[str, Any]:
+        embed = discord.Embed.from_dict(payload['embed'])
+        kwargs = {'embed': embed}
+        view_spec = payload.get('view')
+        if view_spec:
+            builder = self._view_builders.get(view_spec.get('type'))
+            if builder is not None:
+                kwargs['view'] = builder(view_spec, embed)
+        return kwargs
+    
+    async def _find_member(self, guild_id: int, user_id: int):
+        """The recipient as ``(member, status, error)``; status is None if the member was found"""
+        guild = self.bot.get_guild(guild_id)
+        if guild is None:
+            return None, NOT_CACHED, "guild not found"
+        
+        member = guild.get_member(user_id)
+        if member is not None:
+            return member, None, None
+        
+        # Not in the member cache; only Discord knows whether they left
+        try:
+            return await guild.fetch_member(user_id), None, None
+        except discord.NotFound:
+            return None, NOT_CACHED, "member not found"
+        except discord.HTTPException as e:
+            return None, ERROR, f"member lookup failed: {e}"
+    
+    async def _process(self, job_id: int, guild_id: int, user_id: int, payload: str, attempts: int,
+                       not_after: Optional[float]):
+        if not_after is not None and time.time() >= not_after:
+            await self._run(self._dead_letter, job_id, attempts, "expired")
+            return
+        
+        member, status, error = await self._find_member(guild_id, user_id)
+        if member is not None:
+            status = await self.dispatcher.deliver(member, self._build_message(json.loads(payload)))
+            error = status
+        
+        if status == SENT:
+            await self._run(self._complete, job_id)
+            return
+        
+        attempts += 1
+        next_attempt_at = time.time() + self._backoff(attempts)
+        if not_after is not None and next_attempt_at >= not_after:
+            await self._run(self._dead_letter, job_id, attempts, f"{error} (expired before retry)")
+        elif status in (DM_CLOSED, UNREACHABLE, NOT_CACHED) or attempts >= self.max_attempts:
+            await self._run(self._dead_letter, job_id, attempts, error)
+        else:
+            await self._run(self._retry, job_id, attempts, next_attempt_at, error)
+            self._wakeup.set()  # Let idle workers pick up the new retry time
@@ -1,11 +1,15 @@
 import discord
+from collections import OrderedDict
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Dict, Optional, Set, Tuple
+from utils.translations import Translations
+from utils.participants import participant_summary
+from utils.records import Match
 
 class EmbedBuilder:
     """Utility class for creating consistent embeds"""
     
-    def __init__(self):
+    def __init__(self, render_cache_size: int = 512):
         self.colors = {
             'success': 0x4CAF50,
             'error': 0xf44336,
@@ -14,6 +18,73 @@ class EmbedBuilder:
             'match': 0x9b59b6,
             'moderation': 0xe74c3c
         }
+        self.translations = Translations()
+        
+        # Rendered match embeds keyed by (template, guild_id, match_id, language, minutes);
+        # match IDs are only unique within a guild
+        self.render_cache_size = render_cache_size
+        self._render_cache: "OrderedDict[Tuple, discord.Embed]" = OrderedDict()
+        self._render_keys: Dict[Tuple[int, str], Set[Tuple]] = {}
+        self.cache_hits = 0
+        self.cache_misses = 0
+    
+    def render_match_embed(self, template: str, guild_id: int, match_id: str, match: Match, language: str,
+                           minutes: Optional[int] = None) -> discord.Embed:
+        """Build a match embed once per variant and hand out copies.
+        
+        ``template`` is one of ``match``, ``notification``, ``cancellation``
+        or ``reminder``. Cached variants are dropped by ``invalidate_match``.
+        """
+        key = (template, int(guild_id), match_id, language, minutes)
+        embed = self._render_cache.get(key)
+        
+        if embed is not None:
+            self.cache_hits += 1
+            self._render_cache.move_to_end(key)
+        else:
+            self.cache_misses += 1
+            if template == 'match':
+                embed = self.create_match_embed(match, match_id, language)
+            elif template == 'notification':
+                embed = self.create_match_notification_embed(match, language)
+            elif template == 'cancellation':
+                embed = self.create_cancellation_embed(match, language)
+            elif template == 'reminder':
+                embed = self.create_match_reminder_embed(match, minutes, language)
+            else:
+                raise ValueError(f"Unknown embed template '{template}'")
+            
+            self._render_cache[key] = embed
+            self._render_keys.setdefault(key[1:3], set()).add(key)
+            if len(self._render_cache) > self.render_cache_size:
+                old_key, _ = self._render_cache.popitem(last=False)
+                self._forget_key(old_key)
+        
+        rendered = embed.copy()
+        rendered.timestamp = datetime.utcnow()
+        return rendered
+    
+    def _forget_key(self, key: Tuple):
+        keys = self._render_keys.get(key[1:3])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._render_keys[key[1:3]]
+    
+    def invalidate_match(self, guild_id: int, match_id: str):
+        """Drop every cached variant of a match"""
+        for key in self._render_keys.pop((int(guild_id), match_id), ()):
+            self._render_cache.pop(key, None)
+    
+    def get_cache_stats(self) -> Dict[str, int]:
+        return {'hits': self.cache_hits, 'misses': self.cache_misses, 'size': len(self._render_cache)}
+    
+    # AsyncDatabase match listener hooks
+    def on_match_saved(self, guild_id: int, match_id: str, match: Match):
+        self.invalidate_match(guild_id, match_id)
+    
+    def on_match_removed(self, guild_id: int, match_id: str):
+        self.invalidate_match(guild_id, match_id)
     
     def create_error_embed(self, message: str, user: discord.User) -> discord.Embed:
         """Create a standardized error embed"""
@@ -37,22 +108,21 @@ class EmbedBuilder:
         embed.set_footer(text=f"Requested by {user.display_name}", icon_url=user.display_avatar.url)
         return embed
     
-    def create_match_embed(self, match_data: Dict[str, Any], match_id: str, language: str) -> discord.Embed:
+    def create_match_embed(self, match: Match, match_id: str, language: str) -> discord.Embed:
         """Create a match information embed"""
-        from utils.translations import Translations
-        translations = Translations()
+        translations = self.translations
         
         title = translations.get_text('match_created', language)
         
         embed = discord.Embed(
             title=f"⚔️ {title}",
-            description=f"**{match_data['title']}**",
+            description=f"**{match.title}**",
             color=self.colors['match'],
             timestamp=datetime.utcnow()
         )
         
         # Match time
-        match_time = datetime.fromisoformat(match_data['time'])
+        match_time = match.start_time
         formatted_time = translations.format_time_for_language(match_time, language)
         
         embed.add_field(
@@ -62,15 +132,15 @@ class EmbedBuilder:
         )
         
         # Teams (if available) or Participants
-        if match_data.get('team1_mentions') and match_data.get('team2_mentions'):
+        if match.team1_mentions and match.team2_mentions:
             embed.add_field(
                 name="🔴 الفريق الأول",
-                value=match_data['team1_mentions'],
+                value=match.team1_mentions,
                 inline=True
             )
             embed.add_field(
                 name="🔵 الفريق الثاني", 
-                value=match_data['team2_mentions'],
+                value=match.team2_mentions,
                 inline=True
             )
             embed.add_field(
@@ -81,7 +151,7 @@ class EmbedBuilder:
         else:
             embed.add_field(
                 name=f"👥 {translations.get_text('participants', language)}",
-                value=f"{len(match_data['participants'])} members",
+                value=participant_summary(match),
                 inline=True
             )
         
@@ -93,17 +163,17 @@ class EmbedBuilder:
         )
         
         # Description if provided
-        if match_data.get('description'):
+        if match.description:
             embed.add_field(
                 name=f"📝 {translations.get_text('description', language)}",
-                value=match_data['description'],
+                value=match.description,
                 inline=False
             )
         
         # Creator
         embed.add_field(
             name=f"👤 {translations.get_text('creator', language)}",
-            value=f"<@{match_data['creator_id']}>",
+            value=f"<@{match.creator_id}>",
             inline=True
         )
         
@@ -112,22 +182,21 @@ class EmbedBuilder:
         
         return embed
     
-    def create_match_notification_embed(self, match_data: Dict[str, Any], language: str) -> discord.Embed:
+    def create_match_notification_embed(self, match: Match, language: str) -> discord.Embed:
         """Create a match notification embed for DMs"""
-        from utils.translations import Translations
-        translations = Translations()
+        translations = self.translations
         
         title = translations.get_text('join_match', language)
         
         embed = discord.Embed(
             title=f"⚔️ {title}",
-            description=f"**{match_data['title']}**",
+            description=f"**{match.title}**",
             color=self.colors['match'],
             timestamp=datetime.utcnow()
         )
         
         # Match time
-        match_time = datetime.fromisoformat(match_data['time'])
+        match_time = match.start_time
         formatted_time = translations.format_time_for_language(match_time, language)
         
         embed.add_field(
@@ -137,17 +206,17 @@ class EmbedBuilder:
         )
         
         # Description if provided
-        if match_data.get('description'):
+        if match.description:
             embed.add_field(
                 name=f"📝 {translations.get_text('description', language)}",
-                value=match_data['description'],
+                value=match.description,
                 inline=False
             )
         
         # Participants count
         embed.add_field(
             name=f"👥 {translations.get_text('participants', language)}",
-            value=str(len(match_data['participants'])),
+            value=participant_summary(match),
             inline=True
         )
         
@@ -155,23 +224,22 @@ class EmbedBuilder:
         
         return embed
     
-    def create_cancellation_embed(self, match_data: Dict[str, Any], language: str) -> discord.Embed:
+    def create_cancellation_embed(self, match: Match, language: str) -> discord.Embed:
         """Create a match cancellation embed for DMs"""
-        from utils.translations import Translations
-        translations = Translations()
+        translations = self.translations
         
         title = translations.get_text('match_cancelled', language)
         
         embed = discord.Embed(
             title=f"❌ {title}",
-            description=f"**{match_data['title']}**",
+            description=f"**{match.title}**",
             color=0xf44336,
             timestamp=datetime.utcnow()
         )
         
         # Match time
-        if match_data.get('time'):
-            match_time = datetime.fromisoformat(match_data['time'])
+        if match.start:
+            match_time = match.start_time
             formatted_time = translations.format_time_for_language(match_time, language)
             
             embed.add_field(
@@ -190,22 +258,21 @@ class EmbedBuilder:
         
         return embed
     
-    def create_match_reminder_embed(self, match_data: Dict[str, Any], minutes: int, language: str) -> discord.Embed:
+    def create_match_reminder_embed(self, match: Match, minutes: int, language: str) -> discord.Embed:
         """Create a match reminder embed"""
-        from utils.translations import Translations
-        translations = Translations()
+        translations = self.translations
         
         title = translations.get_text('match_reminder', language)
         
         embed = discord.Embed(
             title=f"⏰ {title}",
-            description=f"**{match_data['title']}**\n\n{translations.get_text('match_in', language)} {minutes} {translations.get_text('minutes_before', language)}",
+            description=f"**{match.title}**\n\n{translations.get_text('match_in', language)} {minutes} {translations.get_text('minutes_before', language)}",
             color=self.colors['warning'],
             timestamp=datetime.utcnow()
         )
         
         # Match time
-        match_time = datetime.fromisoformat(match_data['time'])
+        match_time = match.start_time
         formatted_time = translations.format_time_for_language(match_time, language)
         
         embed.add_field(
@@ -215,31 +282,30 @@ class EmbedBuilder:
         )
         
         # Description if provided
-        if match_data.get('description'):
+        if match.description:
             embed.add_field(
                 name=f"📝 {translations.get_text('description', language)}",
-                value=match_data['description'],
+                value=match.description,
                 inline=False
             )
         
         return embed
     
-    def create_cancellation_embed(self, match_data: Dict[str, Any], language: str) -> discord.Embed:
+    def create_cancellation_embed(self, match: Match, language: str) -> discord.Embed:
         """Create a match cancellation embed"""
-        from utils.translations import Translations
-        translations = Translations()
+        translations = self.translations
         
         title = translations.get_text('match_cancelled', language)
         
         embed = discord.Embed(
             title=f"❌ {title}",
-            description=f"**{match_data['title']}**",
+            description=f"**{match.title}**",
             color=self.colors['error'],
             timestamp=datetime.utcnow()
         )
         
         # Original match time
-        match_time = datetime.fromisoformat(match_data['time'])
+        match_time = match.start_time
         formatted_time = translations.format_time_for_language(match_time, language)
         
         embed.add_field(
@@ -249,10 +315,10 @@ class EmbedBuilder:
         )
         
         # Description if provided
-        if match_data.get('description'):
+        if match.description:
             embed.add_field(
                 name=f"📝 {translations.get_text('description', language)}",
-                value=match_data['description'],
+                value=match.description,
                 inline=False
             )
         
@@ -0,0 +1,273 @@
+import json
+import os
+import struct
+import threading
+import time
+import zlib
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from utils.records import Match
+
+
+def archive_entry(guild_id: int, match_id: str, match: Match, status: str, closed_by: Optional[int] = None,
+                  winner: Optional[int] = None) -> dict:
+    """Archive form of a match that left the live store.
+    
+    ``status`` is how it left (``expired``, ``ended`` or ``cancelled``),
+    ``closed_by`` the user who ended or cancelled it and ``winner`` the
+    winning team (1 or 2) if a result was recorded.
+    """
+    return {
+        **match.to_dict(),
+        'guild_id': int(guild_id),
+        'match_id': match_id,
+        'status': status,
+        'closed_by': int(closed_by) if closed_by is not None else None,
+        'winner': winner,
+        'archived_at': int(time.time())
+    }
+
+
+class MatchArchive:
+    """Append-only, compressed archive of matches that left the live store.
+    
+    Entries are partitioned into monthly segments by match start
+    (``<archive_dir>/<YYYY-MM>.seg``). Every ``append`` writes one frame per
+    segment it touches: a 4-byte big-endian length followed by a zlib
+    block of JSON lines, so a batch is compressed together and nothing
+    already written is ever rewritten. A frame cut short by a crash is
+    dropped the first time its segment is appended to again.
+    
+    Each segment has a small index next to it (``<YYYY-MM>.idx``) holding,
+    per guild, the earliest and latest match start and the players and
+    roles that appear in it. ``query`` uses the indexes to decompress only
+    segments that can hold a match it is looking for. Indexes are kept in
+    memory and rewritten after every append; one that is missing or does
+    not cover the whole segment (a crash between the two writes) is
+    rebuilt from the segment on startup.
+    """
+    
+    FRAME_HEADER = struct.Struct('>I')
+    SUFFIX = ".seg"
+    INDEX_SUFFIX = ".idx"
+    
+    def __init__(self, archive_dir: str = os.path.join("data", "archive"), compress_level: int = 6):
+        self.archive_dir = archive_dir
+        self.compress_level = compress_level
+        self._lock = threading.Lock()
+        self._checked = set()  # Segments whose tail has been validated this run
+        os.makedirs(archive_dir, exist_ok=True)
+        
+        # segment -> {'size': bytes covered, 'guilds': {guild_id: summary}}
+        self._index: Dict[str, dict] = {}
+        for segment in self.segments():
+            self._index[segment] = self._load_index(segment)
+    
+    @staticmethod
+    def segment_for(start: int) -> str:
+        """Segment holding matches that start at ``start`` (epoch seconds)"""
+        return datetime.fromtimestamp(start, timezone.utc).strftime('%Y-%m')
+    
+    def _segment_path(self, segment: str) -> str:
+        return os.path.join(self.archive_dir, f"{segment}{self.SUFFIX}")
+    
+    def _index_path(self, segment: str) -> str:
+        return os.path.join(self.archive_dir, f"{segment}{self.INDEX_SUFFIX}")
+    
+    def segments(self) -> List[str]:
+        """Every segment name, oldest first"""
+        return sorted(
+            filename[:-len(self.SUFFIX)]
+            for filename in os.listdir(self.archive_dir)
+            if filename.endswith(self.SUFFIX)
+        )
+    
+    def _truncate_torn_tail(self, path: str):
+        """Cut a partially written last frame off a segment"""
+        try:
+            with open(path, 'rb+') as f:
+                size = os.fstat(f.fileno()).st_size
+                position = 0
+                while position + self.FRAME_HEADER.size <= size:
+                    f.seek(position)
+                    (length,) = self.FRAME_HEADER.unpack(f.read(self.FRAME_HEADER.size))
+                    if position + self.FRAME_HEADER.size + length > size:
+                        break
+                    position += self.FRAME_HEADER.size + length
+                if position < size:
+                    f.truncate(position)
+        except FileNotFoundError:
+            pass
+    
+    @staticmethod
+    def _index_entry(index: dict, entry: dict):
+        """Add one archived match to a segment index"""
+        summary = index['guilds'].setdefault(int(entry['guild_id']), {
+            'first': entry['start'], 'last': entry['start'], 'users': set(), 'roles': set()
+        })
+        summary['first'] = min(summary['first'], entry['start'])
+        summary['last'] = max(summary['last'], entry['start'])
+        summary['users'].update(entry.get('team1', ()))
+        summary['users'].update(entry.get('team2', ()))
+        summary['roles'].update(entry.get('team1_roles', ()))
+        summary['roles'].update(entry.get('team2_roles', ()))
+    
+    def _load_index(self, segment: str) -> dict:
+        """A segment's index from disk, rebuilt if it is missing or out of date"""
+        try:
+            size = os.path.getsize(self._segment_path(segment))
+        except FileNotFoundError:
+            size = 0
+        
+        try:
+            with open(self._index_path(segment), 'r', encoding='utf-8') as f:
+                stored = json.load(f)
+            if stored.get('size') == size:
+                return {
+                    'size': size,
+                    'guilds': {
+                        int(guild_id): {
+                            'first': summary['first'],
+                            'last': summary['last'],
+                            'users': set(summary['users']),
+                            'roles': set(summary['roles'])
+                        }
+                        for guild_id, summary in stored['guilds'].items()
+                    }
+                }
+        except (FileNotFoundError, json.JSONDecodeError, KeyError, TypeError):
+            pass
+        
+        print(f"Rebuilding archive index for {segment}")
+        index = {'size': size, 'guilds': {}}
+        for entry in self.read_segment(segment):
+            self._index_entry(index, entry)
+        self._write_index(segment, index)
+        return index
+    
+    def _write_index(self, segment: str, index: dict):
+        """Replace a segment's index file"""
+        data = {
+            'size': index['size'],
+            'guilds': {
+                str(guild_id): {
+                    'first': summary['first'],
+                    'last': summary['last'],
+                    'users': sorted(summary['users']),
+                    'roles': sorted(summary['roles'])
+                }
+                for guild_id, summary in index['guilds'].items()
+            }
+        }
+        path = self._index_path(segment)
+        with open(f"{path}.tmp", 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(f"{path}.tmp", path)
+    
+    def append(self, entries: List[dict]):
+        """Archive entries (each needs a ``start``), one compressed frame per segment"""
+        by_segment: Dict[str, List[dict]] = {}
+        for entry in entries:
+            by_segment.setdefault(self.segment_for(entry['start']), []).append(entry)
+        
+        with self._lock:
+            for segment, segment_entries in by_segment.items():
+                path = self._segment_path(segment)
+                if segment not in self._checked:
+                    self._truncate_torn_tail(path)
+                    self._checked.add(segment)
+                
+                block = "\n".join(json.dumps(entry, ensure_ascii=False) for entry in segment_entries)
+                payload = zlib.compress(block.encode('utf-8'), self.compress_level)
+                with open(path, 'ab') as f:
+                    f.write(self.FRAME_HEADER.pack(len(payload)) + payload)
+                    f.flush()
+                    os.fsync(f.fileno())
+                    size = f.tell()
+                
+                index = self._index.setdefault(segment, {'size': 0, 'guilds': {}})
+                for entry in segment_entries:
+                    self._index_entry(index, entry)
+                index['size'] = size
+                self._write_index(segment, index)
+    
+    def read_segment(self, segment: str) -> Iterator[dict]:
+        """Yield every entry in a segment, in the order it was archived"""
+        try:
+            with open(self._segment_path(segment), 'rb') as f:
+                while True:
+                    header = f.read(self.FRAME_HEADER.size)
+                    if len(header) < self.FRAME_HEADER.size:
+                        return
+                    (length,) = self.FRAME_HEADER.unpack(header)
+                    payload = f.read(length)
+                    if len(payload) < length:
+                        return  # Torn final frame
+                    for line in zlib.decompress(payload).decode('utf-8').split("\n"):
+                        yield json.loads(line)
+        except FileNotFoundError:
+            return
+    
+    def find(self, guild_id: int, match_id: str, start: Optional[int] = None) -> Optional[dict]:
+        """The last archived copy of one match, or None.
+        
+        With its ``start`` only the segment holding it is read; otherwise
+        every segment the guild appears in is searched.
+        """
+        guild_id = int(guild_id)
+        if start is not None:
+            candidates = [self.segment_for(start)]
+        else:
+            with self._lock:
+                candidates = [segment for segment in sorted(self._index) if guild_id in self._index[segment]['guilds']]
+        
+        found = None
+        for segment in candidates:
+            for entry in self.read_segment(segment):
+                if entry['guild_id'] == guild_id and entry['match_id'] == match_id:
+                    found = entry
+        return found
+    
+    def query(self, guild_id: int, start_from: Optional[int] = None, start_to: Optional[int] = None,
+              user_ids: Iterable[int] = (), role_ids: Iterable[int] = ()) -> List[dict]:
+        """A guild's archived matches starting in ``[start_from, start_to]``, oldest first.
+        
+        With ``user_ids`` or ``role_ids`` only matches any of them played in
+        are returned. A match archived more than once is returned as its
+        last copy.
+        """
+        guild_id = int(guild_id)
+        user_ids = {int(user_id) for user_id in user_ids}
+        role_ids = {int(role_id) for role_id in role_ids}
+        filtered = bool(user_ids or role_ids)
+        
+        with self._lock:
+            candidates = []
+            for segment in sorted(self._index):
+                summary = self._index[segment]['guilds'].get(guild_id)
+                if summary is None:
+                    continue
+                if start_from is not None and summary['last'] < start_from:
+                    continue
+                if start_to is not None and summary['first'] > start_to:
+                    continue
+                if filtered and user_ids.isdisjoint(summary['users']) and role_ids.isdisjoint(summary['roles']):
+                    continue
+                candidates.append(segment)
+        
+        matches = {}
+        for segment in candidates:
+            for entry in self.read_segment(segment):
+                if entry['guild_id'] != guild_id:
+                    continue
+                if start_from is not None and entry['start'] < start_from:
+                    continue
+                if start_to is not None and entry['start'] > start_to:
+                    continue
+                if filtered and user_ids.isdisjoint(entry.get('team1', ()) + entry.get('team2', ())) \
+                        and role_ids.isdisjoint(entry.get('team1_roles', ()) + entry.get('team2_roles', ())):
+                    continue
+                matches[entry['match_id']] = entry
+        
+        return sorted(matches.values(), key=lambda entry: (entry['start'], entry['match_id']))
@@ -0,0 +1,242 @@
+import bisect
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from utils.records import Match
+
+
+class MatchIndex:
+    """In-memory, time-ordered index of every guild's matches.
+    
+    Each guild keeps a list of ``(start_epoch, match_id)`` keys sorted with
+    ``bisect``, plus a map from match ID to its key and data. The index is
+    kept current as an ``AsyncDatabase`` match listener, so commands read
+    pages and positions from it instead of loading and sorting the guild's
+    matches on every call. Ties on start time are broken by match ID, which
+    keeps the numbering stable between calls.
+    
+    Every entry also carries a lower-cased search text (ID, title, team
+    mentions and start time) so autocomplete can filter a guild's matches
+    without touching storage.
+    
+    A reverse index maps each participant's user ID to the ``(guild_id,
+    match_id)`` pairs they play in, so a player's matches are a direct
+    lookup rather than a scan of every match. Each player also has a list
+    of booked ``(start, end, guild_id, match_id)`` windows sorted by start,
+    where a match lasts its ``duration`` (seconds) or ``default_duration``.
+    Finding a player's overlapping bookings is a bisect plus the overlaps.
+    
+    Roles that play in a match are indexed the same way under their role
+    ID, so callers pass a member's role IDs to include the matches they
+    play in through a role without the index tracking role membership.
+    """
+    
+    def __init__(self, default_duration: float = 3600):
+        self.default_duration = default_duration
+        self._max_duration = default_duration  # Bounds how far back an overlapping window can start
+        self._windows: Dict[int, List[Tuple[float, float, int, str]]] = {}
+        self._role_windows: Dict[int, List[Tuple[float, float, int, str]]] = {}
+        self._keys: Dict[int, List[Tuple[float, str]]] = {}
+        self._matches: Dict[int, Dict[str, Tuple[Tuple[float, str], Match, str]]] = {}
+        self._by_user: Dict[int, Set[Tuple[int, str]]] = {}
+        self._by_role: Dict[int, Set[Tuple[int, str]]] = {}
+    
+    async def load(self, database):
+        """Build the index from storage"""
+        self._keys.clear()
+        self._matches.clear()
+        self._by_user.clear()
+        self._by_role.clear()
+        self._windows.clear()
+        self._role_windows.clear()
+        async for guild_id, guild_matches in database.iter_all_matches():
+            for match_id, match in guild_matches.items():
+                self.add(guild_id, match_id, match)
+    
+    def add(self, guild_id: int, match_id: str, match: Match):
+        """Insert or move a match"""
+        guild_id = int(guild_id)
+        self.remove(guild_id, match_id)
+        key = (match.start, match_id)
+        bisect.insort(self._keys.setdefault(guild_id, []), key)
+        self._matches.setdefault(guild_id, {})[match_id] = (key, match, self._search_text(match_id, match))
+        window = self._window(guild_id, match_id, match)
+        self._max_duration = max(self._max_duration, window[1] - window[0])
+        for user_id in match.players:
+            self._by_user.setdefault(user_id, set()).add((guild_id, match_id))
+            bisect.insort(self._windows.setdefault(user_id, []), window)
+        for role_id in match.roles:
+            self._by_role.setdefault(role_id, set()).add((guild_id, match_id))
+            bisect.insort(self._role_windows.setdefault(role_id, []), window)
+    
+    def _window(self, guild_id: int, match_id: str, match: Match) -> Tuple[float, float, int, str]:
+        duration = match.duration if match.duration is not None else self.default_duration
+        return (match.start, match.start + duration, guild_id, match_id)
+    
+    @staticmethod
+    def _search_text(match_id: str, match: Match) -> str:
+        return " ".join([
+            match_id,
+            match.title,
+            match.team1_mentions,
+            match.team2_mentions,
+            match.start_time.strftime('%Y-%m-%d %H:%M %I:%M %p')
+        ]).lower()
+    
+    def remove(self, guild_id: int, match_id: str):
+        """Drop a match if it is indexed"""
+        guild_id = int(guild_id)
+        entry = self._matches.get(guild_id, {}).pop(match_id, None)
+        if entry is None:
+            return
+        keys = self._keys[guild_id]
+        position = bisect.bisect_left(keys, entry[0])
+        del keys[position]
+        
+        window = self._window(guild_id, match_id, entry[1])
+        for user_id in entry[1].players:
+            self._unlink(self._by_user, self._windows, user_id, guild_id, match_id, window)
+        for role_id in entry[1].roles:
+            self._unlink(self._by_role, self._role_windows, role_id, guild_id, match_id, window)
+    
+    @staticmethod
+    def _unlink(by_id: dict, windows_by_id: dict, key: int, guild_id: int, match_id: str, window: tuple):
+        """Drop one match from a user's or role's reverse index and windows"""
+        matches = by_id.get(key)
+        if matches is not None:
+            matches.discard((guild_id, match_id))
+            if not matches:
+                del by_id[key]
+        
+        windows = windows_by_id.get(key)
+        if windows:
+            position = bisect.bisect_left(windows, window)
+            if position < len(windows) and windows[position] == window:
+                del windows[position]
+            if not windows:
+                del windows_by_id[key]
+    
+    # AsyncDatabase match listener hooks
+    def on_match_saved(self, guild_id: int, match_id: str, match: Match):
+        self.add(guild_id, match_id, match)
+    
+    def on_match_removed(self, guild_id: int, match_id: str):
+        self.remove(guild_id, match_id)
+    
+    # Reads
+    def guild_ids(self) -> List[int]:
+        """Guilds with at least one match"""
+        return [guild_id for guild_id, keys in self._keys.items() if keys]
+    
+    def started_before(self, guild_id: int, cutoff: float, limit: int) -> List[Tuple[str, Match]]:
+        """Up to ``limit`` of the guild's oldest matches that start before ``cutoff``"""
+        guild_id = int(guild_id)
+        keys = self._keys.get(guild_id, [])
+        end = min(bisect.bisect_left(keys, (cutoff,)), limit)
+        return [(match_id, self._matches[guild_id][match_id][1]) for _, match_id in keys[:end]]
+    
+    def count(self, guild_id: int) -> int:
+        """Number of matches in a guild"""
+        return len(self._keys.get(int(guild_id), []))
+    
+    def page(self, guild_id: int, offset: int, limit: int) -> List[Tuple[int, str, Match]]:
+        """``(number, match_id, match)`` for a slice of the guild's matches, numbered from 1"""
+        guild_id = int(guild_id)
+        keys = self._keys.get(guild_id, [])[offset:offset + limit]
+        matches = self._matches[guild_id] if keys else {}
+        return [
+            (offset + i + 1, match_id, matches[match_id][1])
+            for i, (_, match_id) in enumerate(keys)
+        ]
+    
+    def at(self, guild_id: int, number: int) -> Optional[Tuple[str, Match]]:
+        """``(match_id, match)`` of the match at a 1-based position, or None"""
+        keys = self._keys.get(int(guild_id), [])
+        if not 1 <= number <= len(keys):
+            return None
+        match_id = keys[number - 1][1]
+        return match_id, self._matches[int(guild_id)][match_id][1]
+    
+    def search(self, guild_id: int, query: str, limit: int = 25,
+               names: Optional[Callable[[int], Optional[str]]] = None) -> List[Tuple[str, Match]]:
+        """Up to ``limit`` matches in time order whose ID, title, teams or time contain ``query``.
+        
+        With ``names`` (user ID to display name) participants' names are searched too.
+        """
+        guild_id = int(guild_id)
+        query = query.strip().lower()
+        matches = self._matches.get(guild_id, {})
+        results = []
+        
+        for _, match_id in self._keys.get(guild_id, []):
+            _, match, search_text = matches[match_id]
+            if query and query not in search_text and not (
+                names is not None and any(
+                    query in (names(user_id) or '').lower() for user_id in match.players
+                )
+            ):
+                continue
+            results.append((match_id, match))
+            if len(results) >= limit:
+                break
+        
+        return results
+    
+    def user_matches(self, user_id: int, guild_id: Optional[int] = None,
+                     role_ids: Iterable[int] = ()) -> List[Tuple[int, str, Match]]:
+        """``(guild_id, match_id, match)`` for a user's matches in time order, optionally in one guild.
+        
+        Matches played by any of ``role_ids`` (the user's roles) are included.
+        """
+        keys = set(self._by_user.get(int(user_id), ()))
+        for role_id in role_ids:
+            keys.update(self._by_role.get(int(role_id), ()))
+        
+        entries = []
+        for match_guild_id, match_id in keys:
+            if guild_id is not None and match_guild_id != int(guild_id):
+                continue
+            key, match, _ = self._matches[match_guild_id][match_id]
+            entries.append((key, match_guild_id, match_id, match))
+        entries.sort(key=lambda entry: entry[0])
+        return [(match_guild_id, match_id, match) for _, match_guild_id, match_id, match in entries]
+    
+    def conflicts(self, user_ids, start: float, duration: Optional[float] = None,
+                  roles_of: Optional[Callable[[int], Iterable[int]]] = None) -> Dict[int, List[Tuple[int, str, Match]]]:
+        """Bookings overlapping ``[start, start + duration)`` for each of ``user_ids`` that has any.
+        
+        With ``roles_of`` (user ID to role IDs) bookings through a role count too.
+        Returns ``{user_id: [(guild_id, match_id, match), ...]}``.
+        """
+        end = start + (duration if duration is not None else self.default_duration)
+        conflicts = {}
+        
+        for user_id in dict.fromkeys(int(user_id) for user_id in user_ids):
+            window_lists = [self._windows.get(user_id)]
+            if roles_of is not None:
+                window_lists.extend(self._role_windows.get(int(role_id)) for role_id in roles_of(user_id))
+            
+            overlapping = {}
+            for windows in window_lists:
+                if not windows:
+                    continue
+                # Only windows starting in (start - longest match, end) can overlap
+                low = bisect.bisect_right(windows, (start - self._max_duration,))
+                high = bisect.bisect_left(windows, (end,))
+                for window_start, window_end, guild_id, match_id in windows[low:high]:
+                    if window_end > start:
+                        overlapping[(window_start, guild_id, match_id)] = self._matches[guild_id][match_id][1]
+            
+            if overlapping:
+                conflicts[user_id] = [
+                    (guild_id, match_id, match)
+                    for (_, guild_id, match_id), match in sorted(overlapping.items(), key=lambda item: item[0])
+                ]
+        
+        return conflicts
+    
+    def position(self, guild_id: int, match_id: str) -> Optional[int]:
+        """1-based position of a match in its guild's list, or None"""
+        entry = self._matches.get(int(guild_id), {}).get(match_id)
+        if entry is None:
+            return None
+        return bisect.bisect_left(self._keys[int(guild_id)], entry[0]) + 1
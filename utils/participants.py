@@ -0,0 +1,83 @@
+import re
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import discord
+
+from utils.records import Match
+
+USER_MENTION = re.compile(r'<@!?(\d+)>')
+ROLE_MENTION = re.compile(r'<@&(\d+)>')
+
+
+def parse_mentions(text: str, guild: discord.Guild) -> Tuple[List[int], List[int]]:
+    """User IDs and role IDs mentioned in ``text`` that exist in ``guild``"""
+    user_ids = [
+        int(user_id) for user_id in dict.fromkeys(USER_MENTION.findall(text))
+        if guild.get_member(int(user_id)) is not None
+    ]
+    role_ids = [
+        int(role_id) for role_id in dict.fromkeys(ROLE_MENTION.findall(text))
+        if guild.get_role(int(role_id)) is not None
+    ]
+    return user_ids, role_ids
+
+
+def participant_summary(match: Match) -> str:
+    """Player count for display, plus the number of roles playing"""
+    players = len(match.players)
+    roles = len(match.roles)
+    return f"{players} + {roles} roles" if roles else str(players)
+
+
+class ParticipantResolver:
+    """Expands a match's role participants into member IDs when they are needed.
+    
+    Matches store the roles that were mentioned rather than every member of
+    them. Role memberships are cached per ``(guild_id, role_id)`` for ``ttl``
+    seconds, because ``Role.members`` walks the whole member list. Resolved
+    lists are capped at ``max_participants`` members.
+    """
+    
+    def __init__(self, ttl: float = 60, max_participants: int = 500):
+        self.ttl = ttl
+        self.max_participants = max_participants
+        self._roles: Dict[Tuple[int, int], Tuple[float, Tuple[int, ...]]] = {}
+    
+    def role_member_ids(self, guild: discord.Guild, role_id: int) -> Tuple[int, ...]:
+        """Member IDs holding a role, from the cache while it is fresh"""
+        key = (guild.id, int(role_id))
+        cached = self._roles.get(key)
+        now = time.monotonic()
+        if cached is not None and cached[0] > now:
+            return cached[1]
+        
+        role = guild.get_role(int(role_id))
+        member_ids = tuple(member.id for member in role.members) if role else ()
+        self._roles[key] = (now + self.ttl, member_ids)
+        return member_ids
+    
+    def expand(self, guild: discord.Guild, user_ids: Iterable[int], role_ids: Iterable[int]) -> List[int]:
+        """Users plus the members of every role, de-duplicated and capped"""
+        participants = dict.fromkeys(int(user_id) for user_id in user_ids)
+        for role_id in role_ids:
+            if len(participants) >= self.max_participants:
+                break
+            participants.update(dict.fromkeys(self.role_member_ids(guild, role_id)))
+        
+        if len(participants) > self.max_participants:
+            print(f"Capping participants in guild {guild.id} at {self.max_participants} (of {len(participants)})")
+        return list(participants)[:self.max_participants]
+    
+    def resolve(self, guild: discord.Guild, match: Match) -> List[int]:
+        """Every member who should be notified about a match"""
+        return self.expand(guild, match.players, match.roles)
+    
+    def invalidate(self, guild_id: int, role_ids: Optional[Iterable[int]] = None):
+        """Forget cached memberships for some roles, or for the whole guild"""
+        if role_ids is None:
+            for key in [key for key in self._roles if key[0] == guild_id]:
+                del self._roles[key]
+        else:
+            for role_id in role_ids:
+                self._roles.pop((guild_id, int(role_id)), None)
@@ -0,0 +1,364 @@
+from datetime import datetime, timezone
+from typing import Iterable, Optional, Tuple
+
+# Stored records carry this under 'v'; dicts without it come from before
+# records existed and are converted on read
+RECORD_VERSION = 1
+
+
+def _epoch(value) -> Optional[int]:
+    """Epoch seconds from a number or an ISO string written by older versions"""
+    if value is None or value == '':
+        return None
+    if isinstance(value, str):
+        parsed = datetime.fromisoformat(value)
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=timezone.utc)  # Older versions wrote naive UTC
+        return int(parsed.timestamp())
+    return int(value)
+
+
+def _ids(values: Optional[Iterable]) -> Tuple[int, ...]:
+    """De-duplicated tuple of integer IDs"""
+    return tuple(dict.fromkeys(int(value) for value in values or ()))
+
+
+def _version(kind: str, data: dict) -> int:
+    version = data.get('v', 0)
+    if version > RECORD_VERSION:
+        raise ValueError(f"{kind} record version {version} is newer than this bot supports ({RECORD_VERSION})")
+    return version
+
+
+class Match:
+    """A scheduled match.
+    
+    ``start`` and ``created_at`` are epoch seconds. Team members and roles
+    are tuples of IDs; roles are expanded to members only when DMs are sent.
+    ``duration`` is in seconds, or None for the bot's default. Occurrences
+    of a recurring ``MatchSeries`` carry its ID in ``series_id``.
+    """
+    
+    __slots__ = (
+        'title', 'description', 'start', 'creator_id',
+        'team1', 'team2', 'team1_roles', 'team2_roles', 'team1_mentions', 'team2_mentions',
+        'created_at', 'duration', 'reminded_10', 'reminded_3', 'series_id'
+    )
+    
+    def __init__(self, title: str, start: int, creator_id: int, team1: Iterable[int] = (), team2: Iterable[int] = (),
+                 team1_roles: Iterable[int] = (), team2_roles: Iterable[int] = (), team1_mentions: str = '',
+                 team2_mentions: str = '', description: str = '', created_at: Optional[int] = None,
+                 duration: Optional[int] = None, reminded_10: bool = False, reminded_3: bool = False,
+                 series_id: Optional[str] = None):
+        self.title = title
+        self.description = description
+        self.start = int(start)
+        self.creator_id = int(creator_id)
+        self.team1 = _ids(team1)
+        self.team2 = _ids(team2)
+        self.team1_roles = _ids(team1_roles)
+        self.team2_roles = _ids(team2_roles)
+        self.team1_mentions = team1_mentions
+        self.team2_mentions = team2_mentions
+        self.created_at = int(created_at) if created_at is not None else int(datetime.now(timezone.utc).timestamp())
+        self.duration = int(duration) if duration is not None else None
+        self.reminded_10 = reminded_10
+        self.reminded_3 = reminded_3
+        self.series_id = series_id
+    
+    @property
+    def start_time(self) -> datetime:
+        """Start as an aware UTC datetime"""
+        return datetime.fromtimestamp(self.start, timezone.utc)
+    
+    @property
+    def players(self) -> Tuple[int, ...]:
+        """Users named directly on either team"""
+        return tuple(dict.fromkeys(self.team1 + self.team2))
+    
+    @property
+    def roles(self) -> Tuple[int, ...]:
+        """Roles whose members play on either team"""
+        return tuple(dict.fromkeys(self.team1_roles + self.team2_roles))
+    
+    def copy(self) -> 'Match':
+        match = Match.__new__(Match)
+        for name in self.__slots__:
+            setattr(match, name, getattr(self, name))
+        return match
+    
+    def to_dict(self) -> dict:
+        """Storage form"""
+        return {
+            'v': RECORD_VERSION,
+            'title': self.title,
+            'description': self.description,
+            'start': self.start,
+            'creator_id': self.creator_id,
+            'team1': list(self.team1),
+            'team2': list(self.team2),
+            'team1_roles': list(self.team1_roles),
+            'team2_roles': list(self.team2_roles),
+            'team1_mentions': self.team1_mentions,
+            'team2_mentions': self.team2_mentions,
+            'created_at': self.created_at,
+            'duration': self.duration,
+            'reminded_10': self.reminded_10,
+            'reminded_3': self.reminded_3,
+            'series_id': self.series_id
+        }
+    
+    @classmethod
+    def from_dict(cls, data: dict) -> 'Match':
+        if _version('Match', data) == 0:
+            # Matches from before teams only had the expanded 'participants' list
+            team1 = data.get('team1') or ([] if data.get('team2') else data.get('participants', []))
+            data = dict(data, start=_epoch(data['time']), created_at=_epoch(data.get('created_at')), team1=team1)
+        
+        return cls(
+            title=data.get('title', ''),
+            start=data['start'],
+            creator_id=data['creator_id'],
+            team1=data.get('team1'),
+            team2=data.get('team2'),
+            team1_roles=data.get('team1_roles'),
+            team2_roles=data.get('team2_roles'),
+            team1_mentions=data.get('team1_mentions', ''),
+            team2_mentions=data.get('team2_mentions', ''),
+            description=data.get('description', ''),
+            created_at=data.get('created_at'),
+            duration=data.get('duration'),
+            reminded_10=data.get('reminded_10', False),
+            reminded_3=data.get('reminded_3', False),
+            series_id=data.get('series_id')
+        )
+
+
+class MatchSeries:
+    """A match that repeats every ``interval`` days or weeks.
+    
+    ``template`` is the first occurrence; occurrence ``n`` is a copy of it
+    starting ``n`` periods later, for as long as it starts no later than
+    ``until`` (epoch seconds, or None to run forever). Occurrences are only
+    created as matches when they are needed, and ``materialized`` counts
+    the occurrence numbers already used.
+    """
+    
+    PERIODS = {'daily': 86400, 'weekly': 7 * 86400}
+    
+    __slots__ = ('template', 'frequency', 'interval', 'until', 'materialized', 'created_at')
+    
+    def __init__(self, template: Match, frequency: str, interval: int = 1, until: Optional[int] = None,
+                 materialized: int = 0, created_at: Optional[int] = None):
+        if frequency not in self.PERIODS:
+            raise ValueError(f"Unknown frequency '{frequency}', expected one of {tuple(self.PERIODS)}")
+        if int(interval) < 1:
+            raise ValueError("Interval must be at least 1")
+        self.template = template
+        self.frequency = frequency
+        self.interval = int(interval)
+        self.until = int(until) if until is not None else None
+        self.materialized = int(materialized)
+        self.created_at = int(created_at) if created_at is not None else int(datetime.now(timezone.utc).timestamp())
+    
+    @property
+    def step(self) -> int:
+        """Seconds between occurrences"""
+        return self.PERIODS[self.frequency] * self.interval
+    
+    @property
+    def rule(self) -> str:
+        """The pattern written as an iCalendar RRULE"""
+        rule = f"FREQ={self.frequency.upper()};INTERVAL={self.interval}"
+        if self.until is not None:
+            rule += f";UNTIL={datetime.fromtimestamp(self.until, timezone.utc).strftime('%Y%m%dT%H%M%SZ')}"
+        return rule
+    
+    def occurrence_start(self, number: int) -> int:
+        return self.template.start + number * self.step
+    
+    def next_occurrence(self, now: float) -> Optional[int]:
+        """Number of the first unused occurrence that starts after ``now``, or None once the series is over"""
+        number = self.materialized
+        if now >= self.occurrence_start(number):
+            number = int((now - self.template.start) // self.step) + 1
+        if self.until is not None and self.occurrence_start(number) > self.until:
+            return None
+        return number
+    
+    def occurrence(self, number: int, series_id: str) -> Match:
+        """A fresh match for one occurrence"""
+        match = self.template.copy()
+        match.start = self.occurrence_start(number)
+        match.created_at = int(datetime.now(timezone.utc).timestamp())
+        match.reminded_10 = False
+        match.reminded_3 = False
+        match.series_id = series_id
+        return match
+    
+    def copy(self) -> 'MatchSeries':
+        return MatchSeries(self.template.copy(), self.frequency, self.interval, self.until, self.materialized, self.created_at)
+    
+    def to_dict(self) -> dict:
+        """Storage form"""
+        return {
+            'v': RECORD_VERSION,
+            'template': self.template.to_dict(),
+            'frequency': self.frequency,
+            'interval': self.interval,
+            'until': self.until,
+            'materialized': self.materialized,
+            'created_at': self.created_at
+        }
+    
+    @classmethod
+    def from_dict(cls, data: dict) -> 'MatchSeries':
+        _version('MatchSeries', data)
+        return cls(
+            template=Match.from_dict(data['template']),
+            frequency=data['frequency'],
+            interval=data.get('interval', 1),
+            until=data.get('until'),
+            materialized=data.get('materialized', 0),
+            created_at=data.get('created_at')
+        )
+
+
+class MemberWarning:
+    """A moderator's warning to a member; ``timestamp`` is epoch seconds"""
+    
+    __slots__ = ('id', 'moderator_id', 'reason', 'timestamp')
+    
+    def __init__(self, id: str, moderator_id: Optional[int], reason: str, timestamp: int):
+        self.id = str(id)
+        self.moderator_id = int(moderator_id) if moderator_id is not None else None
+        self.reason = reason
+        self.timestamp = int(timestamp)
+    
+    def to_dict(self) -> dict:
+        """Storage form"""
+        return {
+            'v': RECORD_VERSION,
+            'id': self.id,
+            'moderator_id': self.moderator_id,
+            'reason': self.reason,
+            'timestamp': self.timestamp
+        }
+    
+    @classmethod
+    def from_dict(cls, data: dict) -> 'MemberWarning':
+        _version('MemberWarning', data)
+        return cls(
+            id=data['id'],
+            moderator_id=data.get('moderator_id'),
+            reason=data.get('reason', ''),
+            timestamp=_epoch(data.get('timestamp')) or 0
+        )
+
+
+class GuildSettings:
+    """A guild's bot settings.
+    
+    ``DEFAULTS`` is the settings schema: every known setting and the value a
+    guild has until it changes it. A guild that never changed anything is
+    served a plain ``GuildSettings()`` and nothing is stored for it;
+    ``created_at`` is filled in when its settings are first written. Keys
+    outside the schema are kept in ``extra`` so nothing stored is lost when
+    the record is written back.
+    """
+    
+    DEFAULTS = {
+        'language': 'en',
+        'mod_log_channel': None,
+        'bot_activity_channel': None,
+        'match_channel': None,
+        'match_retention_hours': 1,
+        'archive_expired_matches': True
+    }
+    
+    __slots__ = tuple(DEFAULTS) + ('created_at', 'extra')
+    
+    def __init__(self, created_at: Optional[int] = None, extra: Optional[dict] = None, **settings):
+        for name, default in self.DEFAULTS.items():
+            setattr(self, name, settings.pop(name, default))
+        if settings:
+            raise TypeError(f"Unknown settings: {', '.join(settings)}")
+        self.created_at = int(created_at) if created_at is not None else None
+        self.extra = extra or {}
+    
+    def get(self, key: str, default=None):
+        """A setting by name, or ``default`` if it is not part of the schema and was never stored"""
+        if key in self.DEFAULTS:
+            return getattr(self, key)
+        return self.extra.get(key, default)
+    
+    def set(self, key: str, value):
+        """Change a setting by name"""
+        if key in self.DEFAULTS:
+            setattr(self, key, value)
+        else:
+            self.extra[key] = value
+    
+    def copy(self) -> 'GuildSettings':
+        return GuildSettings(self.created_at, dict(self.extra), **{name: getattr(self, name) for name in self.DEFAULTS})
+    
+    def to_dict(self) -> dict:
+        """Storage form"""
+        return {
+            **self.extra,
+            'v': RECORD_VERSION,
+            **{name: getattr(self, name) for name in self.DEFAULTS},
+            'created_at': self.created_at
+        }
+    
+    @classmethod
+    def from_dict(cls, data: dict) -> 'GuildSettings':
+        _version('GuildSettings', data)
+        return cls(
+            created_at=_epoch(data.get('created_at')),
+            extra={key: value for key, value in data.items() if key not in cls.DEFAULTS and key not in ('v', 'created_at')},
+            **{name: data.get(name, default) for name, default in cls.DEFAULTS.items()}
+        )
+
+
+class Standing:
+    """A player's or team's results in one guild.
+    
+    ``rating`` is an Elo rating. ``name`` is how a team was written (its
+    mentions) when it last played; players leave it empty.
+    """
+    
+    __slots__ = ('rating', 'wins', 'losses', 'name')
+    
+    def __init__(self, rating: float, wins: int = 0, losses: int = 0, name: str = ''):
+        self.rating = float(rating)
+        self.wins = int(wins)
+        self.losses = int(losses)
+        self.name = name
+    
+    @property
+    def played(self) -> int:
+        return self.wins + self.losses
+    
+    def copy(self) -> 'Standing':
+        return Standing(self.rating, self.wins, self.losses, self.name)
+    
+    def to_dict(self) -> dict:
+        """Storage form"""
+        return {
+            'v': RECORD_VERSION,
+            'rating': self.rating,
+            'wins': self.wins,
+            'losses': self.losses,
+            'name': self.name
+        }
+    
+    @classmethod
+    def from_dict(cls, data: dict) -> 'Standing':
+        _version('Standing', data)
+        return cls(
+            rating=data['rating'],
+            wins=data.get('wins', 0),
+            losses=data.get('losses', 0),
+            name=data.get('name', '')
+        )
@@ -0,0 +1,200 @@
+import asyncio
+import heapq
+import time
+from typing import Dict, List, Tuple, Callable, Awaitable, Optional
+
+from utils.records import Match
+
+# Deadline kinds: seconds relative to the match start, how late a deadline
+# may still fire (mirrors the old one-minute polling window), and the match
+# flag that records it as done. Expiry is handled by the RetentionEngine.
+REMINDER_KINDS = {
+    'reminder_10': {'offset': -600, 'late_window': 60, 'flag': 'reminded_10', 'minutes': 10},
+    'reminder_3': {'offset': -180, 'late_window': 60, 'flag': 'reminded_3', 'minutes': 3},
+}
+
+# What to do at startup with reminders whose deadline passed while offline:
+#   send_late    - send the most recent missed reminder, however late
+#   skip_started - send it late only if the match has not started yet
+CATCH_UP_POLICIES = ('send_late', 'skip_started')
+
+
+class ReminderScheduler:
+    """Deadline-driven scheduler for match reminders.
+    
+    Keeps a min-heap of ``(fire_at, guild_id, match_id, kind)`` entries and
+    sleeps exactly until the earliest one, so an idle bot does no work at all.
+    Entries are updated incrementally as matches are created, changed or
+    removed. Superseded heap entries are skipped lazily when popped.
+    
+    The pending set is rebuilt from storage by ``load()`` at startup, applying
+    the catch-up policy to reminders missed while the bot was offline. Once a
+    pass over the heap has finished, the ``reminded_*`` flags it produced are
+    committed together in one write; that write notifies the match listeners,
+    so the index and this schedule hold the flagged matches from then on.
+    Until then the pass's reminders are in flight and are not scheduled
+    again, however often their matches are saved.
+    """
+    
+    def __init__(self, handler: Callable[[int, str, str], Awaitable[None]], database, catch_up: str = 'skip_started'):
+        if catch_up not in CATCH_UP_POLICIES:
+            raise ValueError(f"Unknown catch-up policy '{catch_up}', expected one of {CATCH_UP_POLICIES}")
+        
+        self.handler = handler
+        self.database = database
+        self.catch_up = catch_up
+        self._heap: List[Tuple[float, int, str, str]] = []
+        self._pending: Dict[Tuple[int, str, str], float] = {}
+        self._changed = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._running: set = set()
+        # (guild_id, match_id, kind) handed to a pass whose flags are not committed yet
+        self._in_flight: set = set()
+    
+    @staticmethod
+    def match_deadlines(match: Match, now: float, catch_up: Optional[str] = None) -> Tuple[Dict[str, float], List[str]]:
+        """Deadlines still owed for a match, plus reminder kinds to mark as skipped.
+        
+        Without a catch-up policy a reminder that is more than its late window
+        overdue is simply dropped. With one (used when recovering after a
+        restart) the most recent missed reminder is sent immediately if the
+        policy allows it, and every other missed reminder is marked as done.
+        """
+        start = match.start
+        deadlines = {}
+        missed = []
+        for kind, spec in REMINDER_KINDS.items():
+            if getattr(match, spec['flag']):
+                continue
+            fire_at = start + spec['offset']
+            if spec['late_window'] is not None and now > fire_at + spec['late_window']:
+                missed.append(kind)
+                continue
+            deadlines[kind] = fire_at
+        
+        if catch_up is None or not missed:
+            return deadlines, []
+        
+        latest = max(missed, key=lambda kind: REMINDER_KINDS[kind]['offset'])
+        if catch_up == 'send_late' or (catch_up == 'skip_started' and now < start):
+            deadlines[latest] = now
+            missed.remove(latest)
+        return deadlines, missed
+    
+    def schedule_match(self, guild_id: int, match_id: str, match: Match, catch_up: Optional[str] = None) -> List[str]:
+        """(Re)schedule every outstanding deadline for a match; returns skipped reminder kinds"""
+        guild_id = int(guild_id)
+        self.unschedule_match(guild_id, match_id, notify=False)
+        deadlines, skipped = self.match_deadlines(match, time.time(), catch_up)
+        for kind, fire_at in deadlines.items():
+            if (guild_id, match_id, kind) in self._in_flight:
+                continue
+            self._pending[(guild_id, match_id, kind)] = fire_at
+            heapq.heappush(self._heap, (fire_at, guild_id, match_id, kind))
+        self._changed.set()
+        return skipped
+    
+    def unschedule_match(self, guild_id: int, match_id: str, notify: bool = True):
+        """Drop every deadline for a match"""
+        guild_id = int(guild_id)
+        for kind in REMINDER_KINDS:
+            self._pending.pop((guild_id, match_id, kind), None)
+        if notify:
+            self._changed.set()
+    
+    # AsyncDatabase match listener hooks
+    def on_match_saved(self, guild_id: int, match_id: str, match: Match):
+        self.schedule_match(guild_id, match_id, match)
+    
+    def on_match_removed(self, guild_id: int, match_id: str):
+        self.unschedule_match(guild_id, match_id)
+    
+    async def load(self):
+        """Rebuild the pending set from storage, catching up on missed reminders"""
+        matches = []
+        async for guild_id, guild_matches in self.database.iter_all_matches():
+            matches.extend((guild_id, match_id, match) for match_id, match in guild_matches.items())
+        
+        # Saving the skipped flags reschedules those matches without the catch-up
+        # policy, so save them first and schedule with the policy afterwards
+        now = time.time()
+        skipped_flags = []
+        for guild_id, match_id, match in matches:
+            _, skipped = self.match_deadlines(match, now, self.catch_up)
+            if skipped:
+                skipped_flags.append((guild_id, match_id, {REMINDER_KINDS[kind]['flag']: True for kind in skipped}))
+        await self.database.set_match_fields(skipped_flags)
+        
+        for guild_id, match_id, match in matches:
+            self.schedule_match(guild_id, match_id, match, catch_up=self.catch_up)
+    
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+    
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+    
+    def _next_deadline(self) -> Optional[float]:
+        """Earliest live deadline, discarding superseded heap entries"""
+        while self._heap:
+            fire_at, guild_id, match_id, kind = self._heap[0]
+            if self._pending.get((guild_id, match_id, kind)) == fire_at:
+                return fire_at
+            heapq.heappop(self._heap)
+        return None
+    
+    async def _run(self):
+        while True:
+            self._changed.clear()
+            next_deadline = self._next_deadline()
+            timeout = None if next_deadline is None else max(0, next_deadline - time.time())
+            
+            if timeout is None or timeout > 0:
+                try:
+                    await asyncio.wait_for(self._changed.wait(), timeout=timeout)
+                    continue  # Schedule changed, look again
+                except asyncio.TimeoutError:
+                    pass
+            
+            now = time.time()
+            due = []
+            while self._heap and self._heap[0][0] <= now:
+                fire_at, guild_id, match_id, kind = heapq.heappop(self._heap)
+                if self._pending.get((guild_id, match_id, kind)) != fire_at:
+                    continue
+                del self._pending[(guild_id, match_id, kind)]
+                due.append((guild_id, match_id, kind))
+                self._in_flight.add((guild_id, match_id, kind))
+            
+            if due:
+                # Run the pass as a task so a slow fan-out never delays the next deadline
+                task = asyncio.create_task(self._run_pass(due))
+                self._running.add(task)
+                task.add_done_callback(self._running.discard)
+    
+    async def _run_pass(self, due: List[Tuple[int, str, str]]):
+        """Handle every deadline that came due together, then commit their flags at once"""
+        results = await asyncio.gather(*(self._fire(guild_id, match_id, kind) for guild_id, match_id, kind in due))
+        
+        flags = [
+            (guild_id, match_id, {REMINDER_KINDS[kind]['flag']: True})
+            for (guild_id, match_id, kind), handled in zip(due, results)
+            if handled
+        ]
+        try:
+            if flags:
+                await self.database.set_match_fields(flags)
+        except Exception as e:
+            print(f"Error saving reminder pass: {e}")
+        finally:
+            self._in_flight.difference_update(due)
+    
+    async def _fire(self, guild_id: int, match_id: str, kind: str) -> bool:
+        try:
+            await self.handler(guild_id, match_id, kind)
+            return True
+        except Exception as e:
+            print(f"Error handling {kind} for match {match_id}: {e}")
+            return False
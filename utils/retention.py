@@ -0,0 +1,87 @@
+import asyncio
+import time
+from typing import List, Optional, Tuple
+
+from utils.match_archive import MatchArchive, archive_entry
+
+
+class RetentionEngine:
+    """Background sweep that moves finished matches out of the live store.
+    
+    A guild's matches expire ``match_retention_hours`` after they start,
+    and are archived unless it turned ``archive_expired_matches`` off (both
+    guild settings). Every ``interval`` seconds a pass walks each guild's
+    oldest matches in the match index and collects expired ones until it
+    has ``batch_size`` of them or has spent ``time_budget_ms``. The batch is
+    appended to the ``MatchArchive`` on an executor thread and then removed
+    from storage in one write per guild. When a pass stops early the next one
+    follows after ``backlog_delay`` seconds instead of a full interval.
+    
+    A crash between the archive append and the removal archives those
+    matches again on the next pass; readers keep the last copy.
+    """
+    
+    def __init__(self, database, match_index, archive: MatchArchive, interval: float = 300,
+                 time_budget_ms: int = 200, batch_size: int = 500, backlog_delay: float = 1):
+        self.database = database
+        self.match_index = match_index
+        self.archive = archive
+        self.interval = interval
+        self.time_budget = time_budget_ms / 1000
+        self.batch_size = batch_size
+        self.backlog_delay = backlog_delay
+        self._task: Optional[asyncio.Task] = None
+    
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+    
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+    
+    async def _run(self):
+        while True:
+            try:
+                backlog = await self.run_pass()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Error in retention pass: {e}")
+                backlog = False
+            await asyncio.sleep(self.backlog_delay if backlog else self.interval)
+    
+    async def _collect(self, now: float) -> Tuple[List[tuple], bool]:
+        """Expired ``(guild_id, match_id, match, archive)`` within the budget, and whether any were left"""
+        deadline = time.monotonic() + self.time_budget
+        batch = []
+        
+        for guild_id in self.match_index.guild_ids():
+            if len(batch) >= self.batch_size or time.monotonic() >= deadline:
+                return batch, True
+            
+            settings = await self.database.get_guild_settings(guild_id)
+            cutoff = now - settings.match_retention_hours * 3600
+            for match_id, match in self.match_index.started_before(guild_id, cutoff, self.batch_size - len(batch)):
+                batch.append((guild_id, match_id, match, settings.archive_expired_matches))
+        
+        return batch, len(batch) >= self.batch_size
+    
+    async def run_pass(self) -> bool:
+        """Archive and remove one batch of expired matches; returns True if more may be waiting"""
+        batch, backlog = await self._collect(time.time())
+        if not batch:
+            return backlog
+        
+        entries = [
+            archive_entry(guild_id, match_id, match, 'expired')
+            for guild_id, match_id, match, archive in batch if archive
+        ]
+        if entries:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, self.archive.append, entries)
+        
+        await self.database.remove_matches([(guild_id, match_id) for guild_id, match_id, _, _ in batch])
+        
+        print(f"Retention pass: {len(batch)} expired matches removed, {len(entries)} archived")
+        return backlog
@@ -0,0 +1,185 @@
+import asyncio
+import time
+from typing import Dict, List, Optional, Tuple
+
+from utils.records import Match, MatchSeries
+
+
+class SeriesScheduler:
+    """Keeps the next occurrences of every recurring match series on the schedule.
+    
+    A ``MatchSeries`` is stored once. Only its next ``lookahead`` upcoming
+    occurrences exist as ordinary matches (tagged with ``series_id``), so
+    reminders, ``/matches`` and retention handle them like any other
+    match, and how far ahead a series runs costs nothing.
+    
+    Occurrences are topped up when a series is created, at startup, when
+    one of its matches is removed, and when an occurrence starts (it stops
+    counting as upcoming). Occurrences missed while the bot was offline are
+    skipped rather than created in the past. A series with no occurrences
+    left before its end date is removed once its last match is gone.
+    
+    Listens to ``AsyncDatabase`` match events to know which occurrences are
+    live.
+    """
+    
+    # Upper bound on how long the loop sleeps, in case a top-up failed
+    MAX_SLEEP = 3600
+    
+    def __init__(self, database, lookahead: int = 1):
+        self.database = database
+        self.lookahead = max(1, lookahead)
+        self._series: Dict[int, Dict[str, MatchSeries]] = {}
+        # (guild_id, series_id) -> {match_id: start} for occurrences in the live store
+        self._occurrences: Dict[Tuple[int, str], Dict[str, int]] = {}
+        self._series_of: Dict[Tuple[int, str], str] = {}
+        self._changed = asyncio.Event()
+        self._top_up_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+    
+    async def load(self):
+        """Read every series and the occurrences already in storage"""
+        self._series.clear()
+        self._occurrences.clear()
+        self._series_of.clear()
+        async for guild_id, guild_series in self.database.iter_all_series():
+            self._series[int(guild_id)] = dict(guild_series)
+        async for guild_id, guild_matches in self.database.iter_all_matches():
+            for match_id, match in guild_matches.items():
+                self._track(int(guild_id), match_id, match)
+    
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+    
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+    
+    def _track(self, guild_id: int, match_id: str, match: Match):
+        if match.series_id is not None:
+            self._occurrences.setdefault((guild_id, match.series_id), {})[match_id] = match.start
+            self._series_of[(guild_id, match_id)] = match.series_id
+    
+    # AsyncDatabase match listener hooks
+    def on_match_saved(self, guild_id: int, match_id: str, match: Match):
+        self._track(int(guild_id), match_id, match)
+    
+    def on_match_removed(self, guild_id: int, match_id: str):
+        series_id = self._series_of.pop((int(guild_id), match_id), None)
+        if series_id is None:
+            return
+        occurrences = self._occurrences.get((int(guild_id), series_id))
+        if occurrences is not None:
+            occurrences.pop(match_id, None)
+            if not occurrences:
+                del self._occurrences[(int(guild_id), series_id)]
+        self._changed.set()
+    
+    # Reads
+    def guild_series(self, guild_id: int) -> Dict[str, MatchSeries]:
+        """A guild's series by ID"""
+        return dict(self._series.get(int(guild_id), {}))
+    
+    def occurrences(self, guild_id: int, series_id: str) -> Dict[str, int]:
+        """``{match_id: start}`` of a series' occurrences in the live store"""
+        return dict(self._occurrences.get((int(guild_id), series_id), {}))
+    
+    # Changes
+    async def create(self, guild_id: int, series: MatchSeries) -> Tuple[str, List[str]]:
+        """Store a new series and create its first occurrences; returns its ID and their match IDs"""
+        guild_id = int(guild_id)
+        async with self._top_up_lock:
+            series_id = await self.database.create_series(guild_id, series)
+            self._series.setdefault(guild_id, {})[series_id] = series
+            created = await self._top_up(guild_id, series_id, time.time())
+        self._changed.set()
+        return series_id, created
+    
+    async def cancel(self, guild_id: int, series_id: str) -> Optional[List[Tuple[str, Match]]]:
+        """Remove a series and its occurrences that have not started yet.
+        
+        Returns the removed ``(match_id, match)`` occurrences, or None if there
+        is no such series.
+        """
+        guild_id = int(guild_id)
+        async with self._top_up_lock:
+            if series_id not in self._series.get(guild_id, {}):
+                return None
+            
+            now = time.time()
+            upcoming = [
+                (match_id, await self.database.get_match(guild_id, match_id))
+                for match_id, start in self.occurrences(guild_id, series_id).items() if start > now
+            ]
+            upcoming = [(match_id, match) for match_id, match in upcoming if match is not None]
+            
+            async with self.database.transaction():
+                await self.database.remove_series(guild_id, series_id)
+                await self.database.remove_matches([(guild_id, match_id) for match_id, _ in upcoming])
+            del self._series[guild_id][series_id]
+        return upcoming
+    
+    async def _top_up(self, guild_id: int, series_id: str, now: float) -> List[str]:
+        """Create occurrences until the series has ``lookahead`` upcoming (caller holds the top-up lock)"""
+        series = self._series[guild_id][series_id]
+        live = self._occurrences.get((guild_id, series_id), {})
+        upcoming = sum(1 for start in live.values() if start > now)
+        created = []
+        
+        while upcoming < self.lookahead:
+            number = series.next_occurrence(now)
+            if number is None:
+                if not live:
+                    # Over and nothing of it left on the schedule
+                    await self.database.remove_series(guild_id, series_id)
+                    del self._series[guild_id][series_id]
+                break
+            
+            match = series.occurrence(number, series_id)
+            series = series.copy()
+            series.materialized = number + 1
+            async with self.database.transaction():
+                match_id = await self.database.create_match(guild_id, match)
+                await self.database.update_series(guild_id, series_id, series)
+            
+            self._series[guild_id][series_id] = series
+            self._track(guild_id, match_id, match)
+            live = self._occurrences[(guild_id, series_id)]
+            created.append(match_id)
+            upcoming += 1
+        
+        return created
+    
+    async def top_up_all(self):
+        """Create whatever occurrences every series is missing"""
+        async with self._top_up_lock:
+            now = time.time()
+            for guild_id, guild_series in list(self._series.items()):
+                for series_id in list(guild_series):
+                    try:
+                        await self._top_up(guild_id, series_id, now)
+                    except Exception as e:
+                        print(f"Error creating occurrences of series {series_id} in guild {guild_id}: {e}")
+    
+    def _next_wakeup(self, now: float) -> float:
+        """Seconds until the earliest upcoming occurrence starts"""
+        starts = [
+            start
+            for occurrences in self._occurrences.values()
+            for start in occurrences.values() if start > now
+        ]
+        return min([self.MAX_SLEEP] + [start - now + 1 for start in starts])
+    
+    async def _run(self):
+        while True:
+            self._changed.clear()
+            try:
+                await self.top_up_all()
+            except Exception as e:
+                print(f"Error in series scheduler: {e}")
+            
+            try:
+                await asyncio.wait_for(self._changed.wait(), timeout=self._next_wakeup(time.time()))
+            except asyncio.TimeoutError:
+                pass
@@ -0,0 +1,186 @@
+import asyncio
+import bisect
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from utils.records import Match, Standing
+
+KINDS = ('players', 'teams')
+
+
+def team_key(user_ids: Iterable[int], role_ids: Iterable[int]) -> str:
+    """Key under which a team's standing is kept: the same roles and players are the same team"""
+    return ",".join(
+        sorted(f"r{int(role_id)}" for role_id in set(role_ids)) +
+        sorted(f"u{int(user_id)}" for user_id in set(user_ids))
+    )
+
+
+def expected_score(rating: float, opponent_rating: float) -> float:
+    """Elo probability that ``rating`` beats ``opponent_rating``"""
+    return 1 / (1 + 10 ** ((opponent_rating - rating) / 400))
+
+
+class Leaderboard:
+    """One guild's standings of one kind, kept in rank order.
+    
+    Entries are held in a list of sort keys (highest rating first, then
+    most wins, then fewest losses) maintained with ``bisect``, so a result
+    moves only the entries it changes and a page is a slice.
+    """
+    
+    def __init__(self, standings: Dict):
+        self._standings = dict(standings)
+        self._order = sorted(self._sort_key(key, standing) for key, standing in self._standings.items())
+    
+    @staticmethod
+    def _sort_key(key, standing: Standing) -> tuple:
+        return (-standing.rating, -standing.wins, standing.losses, key)
+    
+    def __len__(self) -> int:
+        return len(self._order)
+    
+    def get(self, key) -> Optional[Standing]:
+        return self._standings.get(key)
+    
+    def put(self, key, standing: Standing):
+        """Insert or replace an entry"""
+        old = self._standings.get(key)
+        if old is not None:
+            position = bisect.bisect_left(self._order, self._sort_key(key, old))
+            del self._order[position]
+        self._standings[key] = standing
+        bisect.insort(self._order, self._sort_key(key, standing))
+    
+    def page(self, offset: int, limit: int) -> List[Tuple[int, object, Standing]]:
+        """``(rank, key, standing)`` for a slice of the leaderboard, ranked from 1"""
+        return [
+            (offset + i + 1, key, self._standings[key])
+            for i, (_, _, _, key) in enumerate(self._order[offset:offset + limit])
+        ]
+    
+    def rank(self, key) -> Optional[int]:
+        """1-based rank of an entry, or None"""
+        standing = self._standings.get(key)
+        if standing is None:
+            return None
+        return bisect.bisect_left(self._order, self._sort_key(key, standing)) + 1
+
+
+class Standings:
+    """Per-guild player and team standings, updated one result at a time.
+    
+    Recording a result only touches the two teams and the players in the
+    match: each side's rating moves by ``k_factor`` times how unexpected
+    the result was (Elo), using the teams' own ratings for team standings
+    and each side's average player rating for player standings. Nothing
+    is recomputed from earlier results.
+    
+    A guild's standings are loaded into ``Leaderboard``s the first time
+    they are needed and kept current from then on, so leaderboard pages
+    never go back to storage.
+    """
+    
+    def __init__(self, database, initial_rating: float = 1500, k_factor: float = 32):
+        self.database = database
+        self.initial_rating = initial_rating
+        self.k_factor = k_factor
+        self._boards: Dict[int, Dict[str, Leaderboard]] = {}
+        self._locks: Dict[int, asyncio.Lock] = {}
+    
+    def _lock(self, guild_id: int) -> asyncio.Lock:
+        return self._locks.setdefault(guild_id, asyncio.Lock())
+    
+    async def _load(self, guild_id: int) -> Dict[str, Leaderboard]:
+        """A guild's leaderboards, loading them on first use (caller holds the guild's lock)"""
+        boards = self._boards.get(guild_id)
+        if boards is None:
+            standings = await self.database.get_guild_standings(guild_id)
+            boards = self._boards[guild_id] = {kind: Leaderboard(standings[kind]) for kind in KINDS}
+        return boards
+    
+    async def _board(self, guild_id: int, kind: str) -> Leaderboard:
+        guild_id = int(guild_id)
+        boards = self._boards.get(guild_id)
+        if boards is None:
+            async with self._lock(guild_id):
+                boards = await self._load(guild_id)
+        return boards[kind]
+    
+    def _standing(self, board: Leaderboard, key) -> Standing:
+        return board.get(key) or Standing(self.initial_rating)
+    
+    def _average(self, standings: Iterable[Standing]) -> float:
+        ratings = [standing.rating for standing in standings]
+        return sum(ratings) / len(ratings) if ratings else self.initial_rating
+    
+    async def record_result(self, guild_id: int, match_id: str, match: Match, winner: int,
+                            team1_members: Iterable[int], team2_members: Iterable[int]) -> Optional[float]:
+        """Record that team ``winner`` (1 or 2) won a match, and remove the match.
+        
+        ``team1_members``/``team2_members`` are the members who played on each
+        side, roles already expanded; anyone on both sides is left out of
+        player standings. The standings and the removal are written in one
+        transaction, and the leaderboards change only once it commits.
+        Returns the rating the winning team gained, or None without changing
+        anything if the match is no longer stored (its result was already
+        recorded or it was ended meanwhile).
+        """
+        guild_id = int(guild_id)
+        sides = {
+            1: (team_key(match.team1, match.team1_roles), match.team1_mentions, set(team1_members)),
+            2: (team_key(match.team2, match.team2_roles), match.team2_mentions, set(team2_members))
+        }
+        winner_key, winner_name, winner_members = sides[winner]
+        loser_key, loser_name, loser_members = sides[3 - winner]
+        both = winner_members & loser_members
+        winner_members, loser_members = winner_members - both, loser_members - both
+        
+        async with self._lock(guild_id):
+            if await self.database.get_match(guild_id, match_id) is None:
+                return None
+            
+            boards = await self._load(guild_id)
+            
+            # Teams
+            teams = {}
+            team_change = 0.0
+            if winner_key != loser_key:
+                winning = self._standing(boards['teams'], winner_key)
+                losing = self._standing(boards['teams'], loser_key)
+                team_change = self.k_factor * (1 - expected_score(winning.rating, losing.rating))
+                teams[winner_key] = Standing(winning.rating + team_change, winning.wins + 1, winning.losses, winner_name)
+                teams[loser_key] = Standing(losing.rating - team_change, losing.wins, losing.losses + 1, loser_name)
+            
+            # Players
+            winning_players = {user_id: self._standing(boards['players'], user_id) for user_id in winner_members}
+            losing_players = {user_id: self._standing(boards['players'], user_id) for user_id in loser_members}
+            player_change = self.k_factor * (1 - expected_score(
+                self._average(winning_players.values()), self._average(losing_players.values())
+            ))
+            players = {}
+            for user_id, standing in winning_players.items():
+                players[user_id] = Standing(standing.rating + player_change, standing.wins + 1, standing.losses)
+            for user_id, standing in losing_players.items():
+                players[user_id] = Standing(standing.rating - player_change, standing.wins, standing.losses + 1)
+            
+            async with self.database.transaction():
+                await self.database.save_standings(guild_id, players, teams)
+                await self.database.remove_match(guild_id, match_id)
+            
+            for key, standing in teams.items():
+                boards['teams'].put(key, standing)
+            for user_id, standing in players.items():
+                boards['players'].put(user_id, standing)
+        
+        return team_change
+    
+    async def page(self, guild_id: int, kind: str, offset: int, limit: int) -> Tuple[List[Tuple[int, object, Standing]], int]:
+        """One page of a leaderboard as ``(rank, key, standing)`` entries, and the leaderboard's size"""
+        board = await self._board(guild_id, kind)
+        return board.page(offset, limit), len(board)
+    
+    async def rank(self, guild_id: int, kind: str, key) -> Optional[Tuple[int, Standing]]:
+        """``(rank, standing)`` of a player or team, or None if it has no results"""
+        board = await self._board(guild_id, kind)
+        position = board.rank(key)
+        return (position, board.get(key)) if position is not None else None
@@ -1,117 +1,110 @@
+import asyncio
+import re
+from typing import Optional
+
 import discord
 from discord import ui
+from utils.records import Match
 from utils.translations import Translations
 
-class TranslationView(discord.ui.View):
-    """Translation buttons for private messages"""
+LANGUAGE_BUTTONS = {
+    'en': ('🇺🇸', 'English'),
+    'ar': ('🇸🇦', 'العربية'),
+    'pt': ('🇧🇷', 'Português')
+}
+
+# Single-letter kinds keep the custom_id short
+TEMPLATE_KINDS = {
+    'm': 'match',
+    'n': 'notification',
+    'c': 'cancellation',
+    'r': 'reminder'
+}
+
+
+class MatchTranslationButton(discord.ui.DynamicItem[discord.ui.Button], template=r'tr:(?P<kind>[mncr]):(?P<guild_id>\d+):(?P<match_id>[\w-]+):(?P<language>[a-z]{2})(?::s(?P<start>\d+))?(?::(?P<minutes>\d+))?'):
+    """Stateless translation button for match DMs.
     
-    def __init__(self, original_embed: discord.Embed, match_data: dict, current_language: str = 'en'):
-        super().__init__(timeout=300)  # 5 minutes timeout
-        self.original_embed = original_embed
-        self.match_data = match_data
-        self.current_language = current_language
-        self.translations = Translations()
-        
-    @discord.ui.button(label='🇺🇸 English', style=discord.ButtonStyle.secondary, custom_id='translate_en')
-    async def translate_english(self, interaction: discord.Interaction, button: discord.ui.Button):
-        """Translate to English"""
-        if self.current_language == 'en':
-            await interaction.response.send_message("Already in English!", ephemeral=True)
-            return
-            
-        new_embed = self._create_translated_embed('en')
-        await interaction.response.send_message(embed=new_embed, ephemeral=True)
+    Everything needed to answer a click is encoded in the ``custom_id``; the
+    match is loaded from storage when the button is pressed, or from the
+    match archive once it has been cancelled, ended or expired. The match
+    start in the ID points at the archive segment to read (buttons sent
+    before it was added search the guild's segments). Registered once with
+    ``bot.add_dynamic_items`` so buttons keep working after a restart.
+    """
     
-    @discord.ui.button(label='🇸🇦 العربية', style=discord.ButtonStyle.secondary, custom_id='translate_ar')
-    async def translate_arabic(self, interaction: discord.Interaction, button: discord.ui.Button):
-        """Translate to Arabic"""
-        if self.current_language == 'ar':
-            await interaction.response.send_message("الرسالة بالعربية بالفعل!", ephemeral=True)
-            return
-            
-        new_embed = self._create_translated_embed('ar')
-        await interaction.response.send_message(embed=new_embed, ephemeral=True)
+    def __init__(self, kind: str, guild_id: int, match_id: str, language: str, minutes: Optional[int] = None,
+                 start: Optional[int] = None):
+        emoji, label = LANGUAGE_BUTTONS[language]
+        custom_id = f"tr:{kind}:{guild_id}:{match_id}:{language}"
+        if start is not None:
+            custom_id += f":s{start}"
+        if minutes is not None:
+            custom_id += f":{minutes}"
+        
+        super().__init__(discord.ui.Button(emoji=emoji, label=label, style=discord.ButtonStyle.secondary, custom_id=custom_id))
+        self.kind = kind
+        self.guild_id = guild_id
+        self.match_id = match_id
+        self.language = language
+        self.minutes = minutes
+        self.start = start
     
-    @discord.ui.button(label='🇧🇷 Português', style=discord.ButtonStyle.secondary, custom_id='translate_pt')
-    async def translate_portuguese(self, interaction: discord.Interaction, button: discord.ui.Button):
-        """Translate to Portuguese"""
-        if self.current_language == 'pt':
-            await interaction.response.send_message("Já está em português!", ephemeral=True)
-            return
-            
-        new_embed = self._create_translated_embed('pt')
-        await interaction.response.send_message(embed=new_embed, ephemeral=True)
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Button, match: re.Match[str]):
+        minutes = match['minutes']
+        start = match['start']
+        return cls(match['kind'], int(match['guild_id']), match['match_id'], match['language'],
+                   int(minutes) if minutes is not None else None, int(start) if start is not None else None)
     
-    def _create_translated_embed(self, language: str) -> discord.Embed:
-        """Create a translated version of the embed"""
-        from datetime import datetime
-        
-        # Get translations
-        title = self.translations.get_text('match_info', language)
-        match_time_text = self.translations.get_text('match_time', language)
-        participants_text = self.translations.get_text('participants', language)
-        creator_text = self.translations.get_text('creator', language)
-        server_text = self.translations.get_text('server', language)
+    async def _load_match(self, bot) -> Optional[Match]:
+        """The match from storage, or its last archived copy once it has left the live store"""
+        match_data = await bot.db.get_match(self.guild_id, self.match_id)
+        if match_data is not None:
+            return match_data
         
-        # Create new embed
-        embed = discord.Embed(
-            title=f"⚔️ {title}",
-            description=self.match_data.get('title', 'Match'),
-            color=0x5865f2,
-            timestamp=datetime.utcnow()
+        loop = asyncio.get_running_loop()
+        entry = await loop.run_in_executor(
+            None, bot.match_archive.find, self.guild_id, self.match_id, self.start
         )
-        
-        # Match time with timezone
-        if self.match_data.get('time'):
-            match_time = datetime.fromisoformat(self.match_data['time'])
-            formatted_time = self.translations.format_time_for_language(match_time, language)
+        return Match.from_dict(entry) if entry is not None else None
+    
+    async def callback(self, interaction: discord.Interaction):
+        """Show translation as a separate message without deleting original"""
+        try:
+            bot = interaction.client
+            match_data = await self._load_match(bot)
+            if match_data is None:
+                return await interaction.response.send_message("This match is no longer available.", ephemeral=True)
             
-            embed.add_field(
-                name=f"🕒 {match_time_text}",
-                value=f"{formatted_time}\n<t:{int(match_time.timestamp())}:R>",
-                inline=False
+            embed = bot.embed_builder.render_match_embed(
+                TEMPLATE_KINDS[self.kind], self.guild_id, self.match_id, match_data, self.language, self.minutes
             )
-        
-        # Teams or participants
-        if self.match_data.get('team1_mentions') and self.match_data.get('team2_mentions'):
-            team1_text = "Team 1" if language == 'en' else "الفريق الأول" if language == 'ar' else "Equipe 1"
-            team2_text = "Team 2" if language == 'en' else "الفريق الثاني" if language == 'ar' else "Equipe 2"
             
-            embed.add_field(
-                name=f"🔴 {team1_text}",
-                value=self.match_data['team1_mentions'],
-                inline=True
-            )
-            embed.add_field(
-                name=f"🔵 {team2_text}",
-                value=self.match_data['team2_mentions'],
-                inline=True
-            )
-            embed.add_field(name="\u200b", value="\u200b", inline=True)
-        else:
-            embed.add_field(
-                name=f"👥 {participants_text}",
-                value=f"{len(self.match_data.get('participants', []))} members",
-                inline=True
-            )
-        
-        # Creator
-        embed.add_field(
-            name=f"👤 {creator_text}",
-            value=f"<@{self.match_data.get('creator_id', '')}>",
-            inline=True
-        )
-        
-        # Description if available
-        if self.match_data.get('description'):
-            desc_text = self.translations.get_text('description', language)
-            embed.add_field(
-                name=f"📝 {desc_text}",
-                value=self.match_data['description'],
-                inline=False
-            )
+            # Add translation indicator to title
+            if embed.title:
+                embed.title = f"[{LANGUAGE_BUTTONS[self.language][1]}] {embed.title}"
+            
+            await interaction.response.send_message(embed=embed, ephemeral=True)
         
-        return embed
+        except Exception as e:
+            await interaction.response.send_message(f"Translation error: {e}", ephemeral=True)
+
+
+def build_translation_view(kind: str, guild_id: int, match_id: str, current_language: str, minutes: Optional[int] = None,
+                           start: Optional[int] = None) -> discord.ui.View:
+    """Translation buttons for every language except the current one.
+    
+    The view is stopped before it is returned so discord.py doesn't keep a
+    copy per sent message; clicks are routed through the registered
+    ``MatchTranslationButton`` instead.
+    """
+    view = discord.ui.View(timeout=None)
+    for language in LANGUAGE_BUTTONS:
+        if language != current_language:
+            view.add_item(MatchTranslationButton(kind, guild_id, match_id, language, minutes, start))
+    view.stop()
+    return view
 
 class SimpleTranslationView(discord.ui.View):
     """Simple translation buttons for any embed"""
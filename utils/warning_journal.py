@@ -0,0 +1,297 @@
+import json
+import os
+import threading
+from typing import Dict, List, Optional
+
+from utils.records import MemberWarning
+
+
+class WarningJournal:
+    """In-memory warnings backed by per-guild snapshots plus an append-only log.
+    
+    Every ``add``/``remove`` appends one JSON line to ``journal.log`` instead of
+    rewriting the guild's warnings file. At startup the snapshots
+    (``<guild_id>.json``) are loaded and the journal is replayed over them.
+    
+    A background thread fsyncs the journal every ``fsync_interval_ms`` when
+    there are unsynced appends, and compacts it once it grows past
+    ``compact_bytes``: the live journal is rotated to ``journal.compacting``,
+    the guilds it touched are written out as fresh snapshots and the rotated
+    file is deleted. If a rotated file is still there (a compaction failed or
+    crashed) the live journal is appended to it instead of replacing it, so
+    its events stay on disk until a compaction succeeds. Replay is
+    idempotent, so a crash part-way through a compaction only means some
+    events are applied twice to the same result.
+    
+    Warning IDs come from a per-guild counter that only moves forward, so an
+    ID is never reused after a removal. The counters are saved to
+    ``counters.state`` on compaction and re-derived from the highest ID seen
+    on replay. Per-user, per-guild and total warning counts are maintained
+    as warnings are added and removed.
+    
+    Warnings are held as ``MemberWarning`` records and written in their
+    dict form to the journal and snapshots.
+    """
+    
+    JOURNAL = "journal.log"
+    COMPACTING = "journal.compacting"
+    COUNTERS = "counters.state"
+    
+    def __init__(self, store_dir: str, compact_bytes: int = 1024 * 1024, fsync_interval_ms: int = 1000):
+        self.store_dir = store_dir
+        self.compact_bytes = compact_bytes
+        self.fsync_interval = fsync_interval_ms / 1000
+        self.journal_path = os.path.join(store_dir, self.JOURNAL)
+        self.compacting_path = os.path.join(store_dir, self.COMPACTING)
+        self.counters_path = os.path.join(store_dir, self.COUNTERS)
+        
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._closed = False
+        self._unsynced = False
+        self._compacting = False
+        
+        # _dirty_guilds holds the guilds whose snapshot is behind the journal
+        self._warnings, self._dirty_guilds, self._next_ids = self._load(store_dir)
+        self._guild_counts: Dict[str, int] = {
+            guild_str: sum(len(user_warnings) for user_warnings in guild_warnings.values())
+            for guild_str, guild_warnings in self._warnings.items()
+        }
+        self._total = sum(self._guild_counts.values())
+        
+        self._truncate_torn_tail(self.journal_path)
+        self._file = open(self.journal_path, 'a', encoding='utf-8')
+        self._thread = threading.Thread(target=self._background_loop, name="warnings-journal", daemon=True)
+        self._thread.start()
+    
+    @classmethod
+    def read_state(cls, store_dir: str) -> Dict[str, Dict[str, List[MemberWarning]]]:
+        """Current warnings in ``store_dir`` without opening the journal for writing"""
+        return cls._load(store_dir)[0]
+    
+    # Startup
+    @classmethod
+    def _load(cls, store_dir: str):
+        """Load every snapshot, then replay a leftover rotated journal and the live one.
+        
+        Returns the warnings, the set of guilds touched by the replayed events
+        and the next warning ID for every guild.
+        """
+        warnings: Dict[str, Dict[str, List[MemberWarning]]] = {}
+        dirty_guilds = set()
+        
+        try:
+            with open(os.path.join(store_dir, cls.COUNTERS), 'r', encoding='utf-8') as f:
+                next_ids: Dict[str, int] = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            next_ids = {}
+        
+        if os.path.isdir(store_dir):
+            for filename in os.listdir(store_dir):
+                if filename.endswith(".json"):
+                    try:
+                        with open(os.path.join(store_dir, filename), 'r', encoding='utf-8') as f:
+                            warnings[filename[:-len(".json")]] = {
+                                user_str: [MemberWarning.from_dict(warning) for warning in user_warnings]
+                                for user_str, user_warnings in json.load(f).items()
+                            }
+                    except (FileNotFoundError, json.JSONDecodeError):
+                        continue
+        
+        for filename in (cls.COMPACTING, cls.JOURNAL):
+            try:
+                with open(os.path.join(store_dir, filename), 'r', encoding='utf-8') as f:
+                    for line in f:
+                        try:
+                            event = json.loads(line)
+                        except json.JSONDecodeError:
+                            break  # Torn final line from a crash mid-append
+                        cls._apply(warnings, event)
+                        dirty_guilds.add(event['guild'])
+                        if event['op'] == 'add':
+                            cls._advance(next_ids, event['guild'], event['warning']['id'])
+            except FileNotFoundError:
+                continue
+        
+        # Snapshots written before counters existed carry their own high-water marks
+        for guild_str, guild_warnings in warnings.items():
+            for user_warnings in guild_warnings.values():
+                for warning in user_warnings:
+                    cls._advance(next_ids, guild_str, warning.id)
+        
+        return warnings, dirty_guilds, next_ids
+    
+    @staticmethod
+    def _advance(next_ids: Dict[str, int], guild_str: str, warning_id: str):
+        """Move a guild's counter past an ID that is known to be used"""
+        if str(warning_id).isdigit():
+            next_ids[guild_str] = max(next_ids.get(guild_str, 1), int(warning_id) + 1)
+    
+    @staticmethod
+    def _apply(warnings: Dict[str, Dict[str, List[MemberWarning]]], event: dict,
+               warning: Optional[MemberWarning] = None) -> int:
+        """Apply one journal event to a warnings state (idempotent); returns the change in count"""
+        user_warnings = warnings.setdefault(event['guild'], {}).setdefault(event['user'], [])
+        
+        if event['op'] == 'add':
+            if not any(w.id == event['warning']['id'] for w in user_warnings):
+                user_warnings.append(warning or MemberWarning.from_dict(event['warning']))
+                return 1
+        elif event['op'] == 'remove':
+            before = len(user_warnings)
+            user_warnings[:] = [w for w in user_warnings if w.id != event['id']]
+            return len(user_warnings) - before
+        return 0
+    
+    @staticmethod
+    def _truncate_torn_tail(path: str):
+        """Cut a partial last line off a journal file so new appends start on a fresh line"""
+        try:
+            with open(path, 'rb+') as f:
+                data = f.read()
+                if data and not data.endswith(b"\n"):
+                    f.truncate(data.rfind(b"\n") + 1)
+        except FileNotFoundError:
+            pass
+    
+    # Appends
+    def _append(self, event: dict, warning: Optional[MemberWarning] = None):
+        """Apply an event and append it to the journal (caller holds the lock)"""
+        change = self._apply(self._warnings, event, warning)
+        self._guild_counts[event['guild']] = self._guild_counts.get(event['guild'], 0) + change
+        self._total += change
+        self._dirty_guilds.add(event['guild'])
+        self._file.write(json.dumps(event, ensure_ascii=False) + "\n")
+        self._file.flush()
+        self._unsynced = True
+    
+    def add(self, guild_id, user_id, moderator_id: int, reason: str, timestamp: int) -> str:
+        """Record a new warning under the guild's next ID and return that ID"""
+        guild_str = str(guild_id)
+        with self._lock:
+            warning_id = str(self._next_ids.get(guild_str, 1))
+            self._next_ids[guild_str] = int(warning_id) + 1
+            warning = MemberWarning(warning_id, moderator_id, reason, timestamp)
+            self._append({'op': 'add', 'guild': guild_str, 'user': str(user_id), 'warning': warning.to_dict()}, warning)
+        return warning_id
+    
+    def remove(self, guild_id, user_id, warning_id: str):
+        """Record a warning removal"""
+        with self._lock:
+            self._append({'op': 'remove', 'guild': str(guild_id), 'user': str(user_id), 'id': warning_id})
+    
+    # Reads
+    def get(self, guild_id, user_id) -> List[MemberWarning]:
+        """A copy of one user's warnings"""
+        with self._lock:
+            return list(self._warnings.get(str(guild_id), {}).get(str(user_id), []))
+    
+    def guild_ids(self) -> List[str]:
+        with self._lock:
+            return list(self._warnings)
+    
+    def user_count(self, guild_id, user_id) -> int:
+        """Number of warnings a user has in a guild"""
+        with self._lock:
+            return len(self._warnings.get(str(guild_id), {}).get(str(user_id), []))
+    
+    def guild_count(self, guild_id) -> int:
+        """Number of warnings in a guild"""
+        with self._lock:
+            return self._guild_counts.get(str(guild_id), 0)
+    
+    def count(self) -> int:
+        """Total number of warnings across every guild"""
+        with self._lock:
+            return self._total
+    
+    # Background work
+    def _sync(self):
+        """fsync pending appends (caller holds the lock)"""
+        if self._unsynced:
+            os.fsync(self._file.fileno())
+            self._unsynced = False
+    
+    def _background_loop(self):
+        with self._lock:
+            while not self._closed:
+                self._wakeup.wait(timeout=self.fsync_interval)
+                try:
+                    self._sync()
+                except OSError as e:
+                    print(f"Error syncing warnings journal: {e}")
+                
+                if self._file.tell() >= self.compact_bytes and not self._compacting:
+                    try:
+                        self._compact()
+                    except Exception as e:
+                        print(f"Error compacting warnings journal: {e}")
+    
+    def _compact(self):
+        """Rotate the journal and snapshot the guilds it touched (caller holds the lock)"""
+        self._compacting = True
+        self._sync()
+        self._file.close()
+        if os.path.exists(self.compacting_path):
+            # An earlier compaction didn't finish: keep its events and add these after them
+            self._truncate_torn_tail(self.compacting_path)
+            with open(self.journal_path, 'rb') as journal, open(self.compacting_path, 'ab') as compacting:
+                compacting.write(journal.read())
+                compacting.flush()
+                os.fsync(compacting.fileno())
+            os.remove(self.journal_path)
+        else:
+            os.replace(self.journal_path, self.compacting_path)
+        self._file = open(self.journal_path, 'a', encoding='utf-8')
+        
+        snapshots = {
+            guild_str: {
+                user_str: [warning.to_dict() for warning in user_warnings]
+                for user_str, user_warnings in self._warnings.get(guild_str, {}).items() if user_warnings
+            }
+            for guild_str in self._dirty_guilds
+        }
+        self._dirty_guilds.clear()
+        next_ids = dict(self._next_ids)
+        
+        # Appends can continue while the snapshots are written
+        self._lock.release()
+        try:
+            for guild_str, guild_warnings in snapshots.items():
+                self._write_snapshot(f"{guild_str}.json", guild_warnings)
+            self._write_snapshot(self.COUNTERS, next_ids)
+            os.remove(self.compacting_path)
+        except Exception:
+            # The rotated file keeps these events on disk; the next compaction
+            # appends to it and rewrites these guilds
+            with self._lock:
+                self._dirty_guilds.update(snapshots)
+            raise
+        finally:
+            self._lock.acquire()
+            self._compacting = False
+    
+    def _write_snapshot(self, filename: str, data: dict):
+        filepath = os.path.join(self.store_dir, filename)
+        tmp_path = f"{filepath}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, filepath)
+    
+    def compact(self):
+        """Compact the journal now (no-op if a compaction is already running)"""
+        with self._lock:
+            if not self._compacting:
+                self._compact()
+    
+    def close(self):
+        """Stop the background thread and sync the journal"""
+        with self._lock:
+            self._closed = True
+            self._wakeup.notify()
+        self._thread.join(timeout=5)
+        with self._lock:
+            self._sync()
+            self._file.close()